@@ -1,26 +1,311 @@
 #!/usr/bin/env python3
 
-from flask import Flask, request, make_response, jsonify
-from flask_migrate import Migrate
+import json
+import os
+from datetime import datetime, timezone
+
+from flask import Flask, Response, request, make_response, jsonify, stream_with_context
 from flask_restful import Api, Resource
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import configure_mappers, load_only
 
-from models import db, Camper, Activity, Signup
+from cache import (
+    ResponseCache, LRUBackend, track_writes, stale_on_commit,
+    CAMPERS_TAG, ACTIVITIES_TAG, camper_tag, activity_tag, signup_tags, read_tags,
+)
+import counters  # noqa: F401 - registers the signup counter triggers
+import schedules  # noqa: F401 - registers the camper schedule triggers
+from database import LazyMigrate, configure_database, install_sqlite_pragmas, is_busy, retry_on_busy
+from fieldsets import requested_fieldset
+from group_commit import GroupCommitter
+import idempotency
+from search import KINDS, search, include_object
+from filters import Ordering, filter_clauses, filter_names
+from metrics import install_metrics, timed
+from models import (
+    db, Camper, Activity, Signup, ActivityOccupancy, CamperSchedule,
+    CAMPER_LIST_LOADERS, CAMPER_DETAIL_LOADERS,
+    ACTIVITY_LIST_LOADERS, ACTIVITY_DETAIL_LOADERS, SIGNUP_DETAIL_LOADERS,
+)
+from output import json_provider_class, install_compression, content_codings
+import serializers
+from versions import VersionRegistry
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.json.compact = False
+configure_database(app)
+app.config.setdefault('RESPONSE_CACHE_TTL', int(os.environ.get('RESPONSE_CACHE_TTL', 30)))
+app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+app.config.setdefault('IDEMPOTENCY_KEY_TTL', int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)))
+# Opt-in batching of single-row POSTs into shared commits; see group_commit.py.
+app.config.setdefault('GROUP_COMMIT', os.environ.get('GROUP_COMMIT') == '1')
+app.config.setdefault('GROUP_COMMIT_INTERVAL_MS', float(os.environ.get('GROUP_COMMIT_INTERVAL_MS', 2)))
+app.config.setdefault('GROUP_COMMIT_MAX_ITEMS', int(os.environ.get('GROUP_COMMIT_MAX_ITEMS', 256)))
+# Compact JSON unless the app runs in debug mode, where output stays indented.
+app.json = json_provider_class()(app)
 
-migrate = Migrate(app, db)
+migrate = LazyMigrate(app, db, include_object=include_object, render_as_batch=True)
 db.init_app(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+metrics = install_metrics(app)
+install_compression(app)
+
+serialize_camper = timed('serialize', serializers.serialize_camper)
+serialize_activity = timed('serialize', serializers.serialize_activity)
+serialize_signup = timed('serialize', serializers.serialize_signup)
 
 api = Api(app)
 
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    response = app.json.response(data)
+    response.status_code = code
+    response.headers.extend(headers or {})
+    return response
+
+response_cache = ResponseCache(
+    LRUBackend(max_entries=app.config['RESPONSE_CACHE_MAX_ENTRIES']),
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+)
+versions = VersionRegistry(db.session)
+track_writes(db.session, response_cache, versions=versions)
+metrics.add_gauge('response_cache_hits', 'Responses served from the cache.', lambda: response_cache.hits)
+metrics.add_gauge('response_cache_misses', 'Responses built on a cache miss.', lambda: response_cache.misses)
+group_commit = GroupCommitter(
+    app, db,
+    interval=app.config['GROUP_COMMIT_INTERVAL_MS'] / 1000,
+    max_items=app.config['GROUP_COMMIT_MAX_ITEMS'],
+    retries=app.config['SQLITE_BUSY_RETRIES'],
+)
+
+def group_insert(model, row, tags):
+    '''Inserts `row` through the group committer and returns the committed row.'''
+    id = group_commit.submit(insert(model).returning(model.id), row, tags)
+    return db.session.get(model, id)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+MAX_BATCH_IDS = 500
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+def int_arg(args, name, default):
+    '''args.get(name, default, type=int) for any mapping of query arguments: unparsable values fall back to default.'''
+    try:
+        return int(args[name])
+    except (KeyError, ValueError):
+        return default
+
+def parse_ids(value):
+    try:
+        ids = [int(id) for id in value.split(',') if id.strip()]
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of integers")
+    if not (1 <= len(ids) <= MAX_BATCH_IDS):
+        raise ValueError(f"ids must list between 1 and {MAX_BATCH_IDS} ids")
+    return ids
+
+def batch_ids(model, args):
+    '''The ids a `?ids=` batch read asks for; raises ValueError if they are malformed or mixed with list parameters.'''
+    if {'limit', 'after', 'stream'} & set(args) or filter_names(model) & set(args):
+        raise ValueError("ids cannot be combined with pagination, streaming, filters or sort")
+    return parse_ids(args['ids'])
+
+def batch_payload(model, ids, rows, serialize):
+    '''Serializes `rows` in the order of `ids`, with a not-found marker for each missing id.'''
+    found = {row.id: row for row in rows}
+    not_found = f"{model.__name__} not found"
+    return {"data": [
+        serialize(found[id]) if id in found else {"id": id, "error": not_found}
+        for id in ids
+    ]}
+
+class CollectionRead:
+    '''A GET on a collection, planned from its query arguments alone so the WSGI and ASGI apps share it.
+
+    Serves a full list, a keyset page (`limit`/`after`), a stream (`stream`)
+    or the rows named by `ids`. Lists, pages and streams honour the filters
+    and `sort`; `fields`/`expand` replace the default loaders and serializer
+    with a sparse fieldset. Invalid arguments raise ValueError.
+
+    `statement` selects the rows and render() turns them into the payload,
+    except for a stream: `opening`, chunk() for each row, then `closing`.
+    '''
+
+    def __init__(self, model, loaders, serialize, args):
+        sparse = requested_fieldset(model, args)
+        if sparse:
+            loaders, serialize = sparse.loaders, timed('serialize', sparse.serialize)
+            if args.get('sort'):
+                # Keyset cursors read the sort column even when `fields` leaves it out.
+                loaders = (*loaders, load_only(Ordering(model, args['sort']).column))
+        self.model = model
+        self.serialize = serialize
+        self.ids = self.limit = self.stream = None
+        if 'ids' in args:
+            self.ids = batch_ids(model, args)
+            self.statement = db.select(model).options(*loaders).where(model.id.in_(set(self.ids)))
+            return
+        if 'stream' in args:
+            if args['stream'] not in STREAM_FORMATS:
+                raise ValueError(f"Stream format must be one of {', '.join(STREAM_FORMATS)}")
+            self.stream = args['stream']
+        elif 'limit' in args or 'after' in args:
+            self.limit = int_arg(args, 'limit', DEFAULT_PAGE_SIZE)
+            if not (1 <= self.limit <= MAX_PAGE_SIZE):
+                raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        self.ordering = Ordering(model, args.get('sort'))
+        statement = db.select(model).options(*loaders).where(*filter_clauses(model, args))
+        if args.get('after'):
+            statement = statement.where(self.ordering.after(args['after']))
+        statement = statement.order_by(*self.ordering.order_by())
+        if self.stream:
+            statement = statement.execution_options(yield_per=STREAM_BATCH_SIZE)
+        elif self.limit:
+            statement = statement.limit(self.limit + 1)
+        self.statement = statement
+        self.opening, self.closing = ('[', ']') if self.stream == 'json' else ('', '')
+
+    def render(self, rows):
+        '''The JSON payload for the statement's rows.'''
+        if self.ids is not None:
+            return batch_payload(self.model, self.ids, rows, self.serialize)
+        if self.limit is None:
+            return [self.serialize(row) for row in rows]
+        rows = list(rows)
+        page = rows[:self.limit]
+        next_cursor = self.ordering.cursor(page[-1]) if len(rows) > self.limit else None
+        return {"data": [self.serialize(row) for row in page], "next": next_cursor}
+
+    def chunk(self, row, first):
+        '''One streamed row, with the separator that follows the rows before it.'''
+        body = app.json.dumps(self.serialize(row))
+        if self.stream == 'ndjson':
+            return body + '\n'
+        return body if first else ',' + body
+
+class DetailRead:
+    '''A GET on one row, planned from its query arguments alone so the WSGI and ASGI apps share it.
+
+    `fields`/`expand` replace the default loaders and `render` with a sparse
+    fieldset; invalid ones raise ValueError. `statement` selects the row and
+    render(row) returns its payload with the tags that payload depends on.
+    '''
+
+    def __init__(self, model, id, loaders, render, args):
+        sparse = requested_fieldset(model, args)
+        if sparse:
+            loaders, serialize = sparse.loaders, timed('serialize', sparse.serialize)
+
+            def render(row):
+                return serialize(row), read_tags(row, sparse.expand)
+
+        self.statement = db.select(model).options(*loaders).filter_by(id=id)
+        self.render = render
+        self.not_found = f"{model.__name__} not found"
+
+def camper_detail(camper):
+    '''A camper with the activities they signed up for.'''
+    camper_dict = serialize_camper(camper)
+    camper_dict['activities'] = [serialize_activity(signup.activity) for signup in camper.signups]
+    # The embedded activities list every camper signed up for them; a change to
+    # one of those campers stamps the activity tag, so the activity tags cover it.
+    tags = {camper_tag(camper.id)}
+    tags.update(activity_tag(signup.activity_id) for signup in camper.signups)
+    return camper_dict, tags
+
+def activity_detail(activity):
+    '''An activity with its signups.'''
+    activity_dict = serialize_activity(activity)
+    activity_dict['signups'] = [serialize_signup(signup) for signup in activity.signups]
+    return activity_dict, {activity_tag(activity.id)}
+
+def fresh_etag(etag, last_modified):
+    '''The validator the client already holds for this representation, or None if it is stale.
+
+    Compressed bodies carry the ETag with a coding suffix, so each variant is checked.
+    '''
+    if request.if_none_match:
+        for candidate in (etag, *(f'{etag}-{coding}' for coding in content_codings())):
+            if request.if_none_match.contains(candidate):
+                return candidate
+        return None
+    if request.if_modified_since and int(last_modified) <= request.if_modified_since.timestamp():
+        return etag
+    return None
+
+def set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = datetime.fromtimestamp(int(last_modified), timezone.utc)
+    return response
+
+def conditional_get(build):
+    '''Answers a conditional GET from tag versions alone, else serves build() through the cache.
+
+    build() returns (response, tags); the tags become the response's ETag
+    dependencies for the next request to the same URL.
+    '''
+    url = request.full_path
+    known = versions.dependencies(url)
+    if known is not None and (request.if_none_match or request.if_modified_since):
+        etag, last_modified = versions.validators(known)
+        matched = fresh_etag(etag, last_modified)
+        if matched:
+            return set_validators(app.response_class(status=304), matched, last_modified)
+
+    response, tags, validators = response_cache.fetch(build, versions)
+    if validators:
+        versions.remember(url, tags)
+        # A worker that has not seen this URL yet still owes the client a 304 for a current ETag.
+        matched = fresh_etag(*validators)
+        if matched:
+            return set_validators(app.response_class(status=304), matched, validators[1])
+        set_validators(response, *validators)
+    return response
+
+def stream_response(read):
+    '''Streams every matching row as a JSON array or NDJSON without holding the table in memory.'''
+
+    def generate():
+        yield read.opening
+        for i, row in enumerate(db.session.scalars(read.statement)):
+            yield read.chunk(row, not i)
+        yield read.closing
+
+    return Response(stream_with_context(generate()), mimetype=STREAM_FORMATS[read.stream])
+
+def list_response(model, loaders, serialize):
+    '''Serves a collection GET as CollectionRead plans it.'''
+    try:
+        read = CollectionRead(model, loaders, serialize, request.args)
+    except ValueError as e:
+        return make_response({"errors": [str(e)]}, 400)
+    if read.stream:
+        return stream_response(read)
+    return make_response(read.render(db.session.scalars(read.statement)), 200)
+
+def detail_response(model, id, loaders, render):
+    '''Serves a GET on one row as DetailRead plans it; returns (response, tags).'''
+    try:
+        read = DetailRead(model, id, loaders, render, request.args)
+    except ValueError as e:
+        return make_response({"errors": [str(e)]}, 400), set()
+    row = db.session.scalar(read.statement)
+    if not row:
+        return make_response({"error": read.not_found}, 404), set()
+    payload, tags = read.render(row)
+    return make_response(payload, 200), tags
+
 class Campers(Resource):
     def get(self):
-        campers = [camper.to_dict() for camper in Camper.query.all()]
-        return make_response(campers, 200)
+        return conditional_get(lambda: (
+            list_response(Camper, CAMPER_LIST_LOADERS, serialize_camper), {CAMPERS_TAG}
+        ))
 
     def post(self):
         data = request.get_json()
@@ -29,20 +314,32 @@ class Campers(Resource):
                 name=data['name'],
                 age=data['age']
             )
-            db.session.add(camper)
-            db.session.commit()
-            return make_response(camper.to_dict(), 201)
+            if app.config['GROUP_COMMIT']:
+                camper = group_insert(Camper, {'name': camper.name, 'age': camper.age},
+                                      lambda id: {camper_tag(id), CAMPERS_TAG, ACTIVITIES_TAG})
+            else:
+                db.session.add(camper)
+                db.session.commit()
+            return make_response(serialize_camper(camper), 201)
         except ValueError as e:
             return make_response({"errors": [str(e)]}, 400)
 
+def stale_signup_partners(column, id):
+    '''Stales the rows on the far side of a camper's or activity's signups.
+
+    Deletes need it because with passive deletes the flush never loads the
+    signups ON DELETE CASCADE removes, so track_writes cannot see them. A
+    camper update needs it because activity details embed the camper and
+    are tagged by activity alone. The row's own tags come from the flush;
+    only the distinct far-side ids are read.
+    '''
+    other, tag = (Signup.activity_id, activity_tag) if column is Signup.camper_id else (Signup.camper_id, camper_tag)
+    ids = db.session.scalars(db.select(other).distinct().where(column == id))
+    stale_on_commit(db.session, {tag(other_id) for other_id in ids})
+
 class CamperById(Resource):
     def get(self, id):
-        camper = Camper.query.filter_by(id=id).first()
-        if not camper:
-            return make_response({"error": "Camper not found"}, 404)
-        camper_dict = camper.to_dict()
-        camper_dict['activities'] = [signup.activity.to_dict() for signup in camper.signups]
-        return make_response(camper_dict, 200)
+        return conditional_get(lambda: detail_response(Camper, id, CAMPER_DETAIL_LOADERS, camper_detail))
 
     def patch(self, id):
         camper = Camper.query.filter_by(id=id).first()
@@ -50,17 +347,10 @@ class CamperById(Resource):
             return make_response({"error": "Camper not found"}, 404)
         data = request.get_json()
         try:
-            if 'name' in data:
-                camper.name = data['name']
-            if 'age' in data:
-                camper.age = data['age']
-            # Validate
-            if not camper.name:
-                raise ValueError("Name cannot be empty")
-            if not (8 <= camper.age <= 18):
-                raise ValueError("Age must be between 8 and 18")
+            camper.apply_changes(data)
+            stale_signup_partners(Signup.camper_id, id)
             db.session.commit()
-            return make_response(camper.to_dict(), 200)
+            return make_response(serialize_camper(camper), 200)
         except ValueError as e:
             return make_response({"errors": [str(e)]}, 400)
 
@@ -68,14 +358,50 @@ class CamperById(Resource):
         camper = Camper.query.filter_by(id=id).first()
         if not camper:
             return make_response({"error": "Camper not found"}, 404)
+        stale_signup_partners(Signup.camper_id, id)
         db.session.delete(camper)
         db.session.commit()
         return make_response({}, 204)
 
+def camper_schedule(id):
+    '''A camper's materialized schedule, served as stored: one primary-key read, no serialization.
+
+    A schedule the triggers marked stale is recomputed and stored first, or
+    in snapshot mode computed from the snapshot without storing it.
+    '''
+    row = db.session.execute(
+        db.select(Camper.id, CamperSchedule.camper_id, CamperSchedule.schedule)
+        .outerjoin(CamperSchedule).where(Camper.id == id)
+    ).first()
+    if row is None:
+        return make_response({"error": "Camper not found"}, 404), set()
+    schedule = row.schedule
+    if row.camper_id is not None and schedule is None:
+        if app.config['DB_READ_MODE'] == 'snapshot':
+            # Storing it would read the primary, ahead of the snapshot this response's ETag comes from.
+            schedule = db.session.scalar(schedules.live_schedule(id))
+        else:
+            schedule = retry_on_busy(db.session, lambda: refresh_schedule(id), app.config['SQLITE_BUSY_RETRIES'])
+    # Campers get a row with their first signup.
+    schedule = schedule or '[]'
+    tags = {camper_tag(id)} | {activity_tag(entry['activity']['id']) for entry in json.loads(schedule)}
+    return Response(schedule, 200, mimetype='application/json'), tags
+
+def refresh_schedule(id):
+    stored = db.session.scalar(schedules.refresh(id))
+    db.session.commit()
+    # None when a concurrent request refreshed it first.
+    return stored if stored is not None else db.session.scalar(schedules.live_schedule(id))
+
+class CamperScheduleById(Resource):
+    def get(self, id):
+        return conditional_get(lambda: camper_schedule(id))
+
 class Activities(Resource):
     def get(self):
-        activities = [activity.to_dict() for activity in Activity.query.all()]
-        return make_response(activities, 200)
+        return conditional_get(lambda: (
+            list_response(Activity, ACTIVITY_LIST_LOADERS, serialize_activity), {ACTIVITIES_TAG}
+        ))
 
     def post(self):
         data = request.get_json()
@@ -84,54 +410,291 @@ class Activities(Resource):
                 name=data['name'],
                 difficulty=data['difficulty']
             )
-            db.session.add(activity)
-            db.session.commit()
-            return make_response(activity.to_dict(), 201)
+            if app.config['GROUP_COMMIT']:
+                activity = group_insert(Activity, {'name': activity.name, 'difficulty': activity.difficulty},
+                                        lambda id: {activity_tag(id), CAMPERS_TAG, ACTIVITIES_TAG})
+            else:
+                db.session.add(activity)
+                db.session.commit()
+            return make_response(serialize_activity(activity), 201)
         except ValueError as e:
             return make_response({"errors": [str(e)]}, 400)
 
 class ActivityById(Resource):
     def get(self, id):
-        activity = Activity.query.filter_by(id=id).first()
-        if not activity:
-            return make_response({"error": "Activity not found"}, 404)
-        activity_dict = activity.to_dict()
-        activity_dict['signups'] = [signup.to_dict() for signup in activity.signups]
-        return make_response(activity_dict, 200)
+        return conditional_get(lambda: detail_response(Activity, id, ACTIVITY_DETAIL_LOADERS, activity_detail))
 
     def delete(self, id):
         activity = Activity.query.filter_by(id=id).first()
         if not activity:
             return make_response({"error": "Activity not found"}, 404)
+        stale_signup_partners(Signup.activity_id, id)
         db.session.delete(activity)
         db.session.commit()
         return make_response({}, 204)
 
-class Signups(Resource):
-    def post(self):
-        data = request.get_json()
+HOURS = 24
+
+def activity_stats():
+    '''Signup totals and per-hour occupancy for every activity, read from the maintained counters.'''
+    occupancy = {}
+    for activity_id, time, count in db.session.execute(
+        db.select(ActivityOccupancy.activity_id, ActivityOccupancy.time, ActivityOccupancy.count)
+    ):
+        if 0 <= time < HOURS:
+            occupancy.setdefault(activity_id, [0] * HOURS)[time] = count
+    activities = db.session.execute(
+        db.select(Activity.id, Activity.name, Activity.signup_count).order_by(Activity.id)
+    )
+    return [
+        {"id": id, "name": name, "signup_count": signup_count, "occupancy": occupancy.get(id, [0] * HOURS)}
+        for id, name, signup_count in activities
+    ]
+
+class ActivityStats(Resource):
+    def get(self):
+        return conditional_get(lambda: (make_response(activity_stats(), 200), {ACTIVITIES_TAG}))
+
+MAX_BULK_SIGNUPS = 10000
+
+def parse_signups(items):
+    '''Runs Signup validation on each item; returns ([(index, row)], per-item errors).'''
+    pending, errors = [], []
+    for index, item in enumerate(items):
         try:
             signup = Signup(
-                time=data['time'],
-                camper_id=data['camper_id'],
-                activity_id=data['activity_id']
+                time=item['time'],
+                camper_id=item['camper_id'],
+                activity_id=item['activity_id']
             )
-            db.session.add(signup)
-            db.session.commit()
-            signup_dict = signup.to_dict()
-            signup_dict['camper'] = signup.camper.to_dict()
-            signup_dict['activity'] = signup.activity.to_dict()
-            return make_response(signup_dict, 201)
+            pending.append((index, {
+                'time': signup.time,
+                'camper_id': signup.camper_id,
+                'activity_id': signup.activity_id,
+            }))
+        except KeyError as e:
+            errors.append({"index": index, "errors": [f"Missing field {e}"]})
+        except TypeError:
+            errors.append({"index": index, "errors": ["Signup must be a JSON object"]})
         except ValueError as e:
-            return make_response({"errors": [str(e)]}, 400)
-        except IntegrityError:
-            return make_response({"errors": ["Invalid camper_id or activity_id"]}, 400)
+            errors.append({"index": index, "errors": [str(e)]})
+    return pending, errors
+
+def resolve_signups(pending, errors, known_campers, known_activities):
+    '''Drops items that reference unknown ids; returns (rows, errors sorted by index).'''
+    rows = []
+    for index, row in pending:
+        if row['camper_id'] in known_campers and row['activity_id'] in known_activities:
+            rows.append(row)
+        else:
+            errors.append({"index": index, "errors": ["Invalid camper_id or activity_id"]})
+    errors.sort(key=lambda error: error['index'])
+    return rows, errors
+
+def known_ids_query(model, ids):
+    return db.select(model.id).where(model.id.in_(ids))
+
+def validate_signups(items):
+    '''Validates a batch of signups with one id lookup per referenced table.'''
+    pending, errors = parse_signups(items)
+    known_campers = set(db.session.scalars(known_ids_query(Camper, {row['camper_id'] for _, row in pending})))
+    known_activities = set(db.session.scalars(known_ids_query(Activity, {row['activity_id'] for _, row in pending})))
+    return resolve_signups(pending, errors, known_campers, known_activities)
+
+SIGNUP_KEY = ('camper_id', 'activity_id', 'time')
+
+def insert_signup():
+    '''INSERT INTO signups that leaves an existing signup for the same camper, activity and time alone.'''
+    return insert(Signup).on_conflict_do_nothing(index_elements=SIGNUP_KEY)
+
+def upsert_signups():
+    '''INSERT INTO signups returning the id of the new row, or of the existing one it duplicates.
+
+    The no-op DO UPDATE touches no counter trigger column; it only makes
+    RETURNING report existing rows too.
+    '''
+    return (
+        insert(Signup)
+        .on_conflict_do_update(index_elements=SIGNUP_KEY, set_={'id': Signup.id})
+        .returning(Signup.id, *(getattr(Signup, name) for name in SIGNUP_KEY))
+    )
+
+def create_signup(data, committer=None):
+    '''Inserts one signup: 201 with it, or 200 with the existing one for the same camper, activity and time.
+
+    With a GroupCommitter the insert is committed in its next batch rather
+    than in this request's transaction.
+    '''
+    try:
+        signup = Signup(
+            time=data['time'],
+            camper_id=data['camper_id'],
+            activity_id=data['activity_id']
+        )
+        row = {name: getattr(signup, name) for name in SIGNUP_KEY}
+        tags = signup_tags(row['camper_id'], row['activity_id'])
+        statement = insert_signup().returning(Signup.id)
+        if committer is None:
+            id = db.session.scalar(statement, row)
+            if id is not None:
+                stale_on_commit(db.session, tags)
+        else:
+            id = committer.submit(statement, row, lambda id: tags if id is not None else set())
+    except KeyError as e:
+        return make_response({"errors": [f"Missing field {e}"]}, 400)
+    except TypeError:
+        return make_response({"errors": ["Signup must be a JSON object"]}, 400)
+    except ValueError as e:
+        return make_response({"errors": [str(e)]}, 400)
+    except IntegrityError:
+        return make_response({"errors": ["Invalid camper_id or activity_id"]}, 400)
+    created = id is not None
+    signup = Signup.query.options(*SIGNUP_DETAIL_LOADERS).filter_by(**row).one()
+    signup_dict = serialize_signup(signup)
+    signup_dict['camper'] = serialize_camper(signup.camper)
+    signup_dict['activity'] = serialize_activity(signup.activity)
+    return make_response(signup_dict, 201 if created else 200)
+
+def create_signups(items):
+    '''Validates a batch of signups and inserts all of them, or none.
+
+    Items that duplicate an existing signup, or each other, report the id of
+    that signup rather than a new one.
+    '''
+    if not items or len(items) > MAX_BULK_SIGNUPS:
+        return make_response({"errors": [f"Batch must contain between 1 and {MAX_BULK_SIGNUPS} signups"]}, 400)
+    rows, errors = validate_signups(items)
+    if errors:
+        return make_response({"errors": errors}, 400)
+    ids = {tuple(key): id for id, *key in db.session.execute(upsert_signups(), rows)}
+    for row in rows:
+        stale_on_commit(db.session, signup_tags(row['camper_id'], row['activity_id']))
+    return make_response([
+        {'id': ids[tuple(row[name] for name in SIGNUP_KEY)], **row} for row in rows
+    ], 201)
+
+class Signups(Resource):
+    def post(self):
+        '''Creates one signup or a batch, retrying the transaction while SQLite is busy.
+
+        A single signup without an Idempotency-Key goes through group commit when it is on.
+        '''
+        data = request.get_json()
+        key = request.headers.get('Idempotency-Key')
+        if key is not None and not 1 <= len(key) <= idempotency.MAX_KEY_LENGTH:
+            return make_response({"errors": [
+                f"Idempotency-Key must be between 1 and {idempotency.MAX_KEY_LENGTH} characters"
+            ]}, 400)
+        try:
+            if key is None and not isinstance(data, list) and app.config['GROUP_COMMIT']:
+                return create_signup(data, group_commit)
+            return retry_on_busy(db.session, lambda: self.create(data, key), app.config['SQLITE_BUSY_RETRIES'])
+        except OperationalError as e:
+            if not is_busy(e):
+                raise
+            response = make_response({"errors": ["Database is busy, try again"]}, 503)
+            response.headers['Retry-After'] = '1'
+            return response
+
+    def create(self, data, key):
+        '''One POST /signups transaction; only successful responses are committed and stored under `key`.'''
+        if key is not None:
+            try:
+                stored = idempotency.claim(
+                    db.session, key, idempotency.request_fingerprint(request.method, request.path, data),
+                    app.config['IDEMPOTENCY_KEY_TTL'],
+                )
+            except ValueError as e:
+                db.session.rollback()
+                return make_response({"errors": [str(e)]}, 422)
+            if stored is not None:
+                response = idempotency.replay(stored)
+                db.session.rollback()
+                return response
+        response = create_signups(data) if isinstance(data, list) else create_signup(data)
+        if response.status_code >= 400:
+            db.session.rollback()
+            return response
+        if key is not None:
+            idempotency.record(db.session, key, response)
+        db.session.commit()
+        return response
+
+    def delete(self):
+        '''Removes every signup for ?activity_id= in one statement.'''
+        activity_id = request.args.get('activity_id', type=int)
+        if activity_id is None:
+            return make_response({"errors": ["activity_id must be an integer"]}, 400)
+        camper_ids = db.session.scalars(
+            delete(Signup).where(Signup.activity_id == activity_id).returning(Signup.camper_id)
+        ).all()
+        if not camper_ids and db.session.get(Activity, activity_id) is None:
+            return make_response({"error": "Activity not found"}, 404)
+        for camper_id in set(camper_ids):
+            stale_on_commit(db.session, signup_tags(camper_id, activity_id))
+        db.session.commit()
+        return make_response({"deleted": len(camper_ids)}, 200)
+
+DEFAULT_SEARCH_LIMIT = 20
+
+def search_response():
+    '''One page of ranked prefix matches for `q` over camper and activity names.
+
+    `type` narrows the results to campers or activities; `after` is the
+    number of results already seen, as returned in `next`.
+    '''
+    limit = request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int)
+    after = request.args.get('after', 0, type=int)
+    kind = request.args.get('type')
+    try:
+        if not (1 <= limit <= MAX_PAGE_SIZE):
+            raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+        if after < 0:
+            raise ValueError("after must not be negative")
+        if kind is not None and kind not in KINDS:
+            raise ValueError(f"type must be one of {', '.join(KINDS)}")
+        rows = search(db.session.connection(), request.args.get('q'), kind, limit, after)
+    except ValueError as e:
+        return make_response({"errors": [str(e)]}, 400)
+    page = rows[:limit]
+    return make_response({
+        "data": [{"type": kind, "id": id, "name": name} for kind, id, name in page],
+        "next": after + limit if len(rows) > limit else None,
+    }, 200)
+
+class Search(Resource):
+    def get(self):
+        return conditional_get(lambda: (search_response(), {CAMPERS_TAG, ACTIVITIES_TAG}))
+
+class CacheStats(Resource):
+    def get(self):
+        return make_response(response_cache.stats(), 200)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 api.add_resource(Campers, '/campers')
 api.add_resource(CamperById, '/campers/<int:id>')
+api.add_resource(CamperScheduleById, '/campers/<int:id>/schedule')
 api.add_resource(Activities, '/activities')
 api.add_resource(ActivityById, '/activities/<int:id>')
+api.add_resource(ActivityStats, '/activities/stats')
 api.add_resource(Signups, '/signups')
+api.add_resource(Search, '/search')
+api.add_resource(CacheStats, '/cache/stats')
+
+def create_app():
+    '''The app, ready to serve: the entry point for WSGI servers and launcher.py.
+
+    The app is built when this module is imported, since the resources and
+    tests use it directly; create_app() also makes sure every mapper is
+    configured, so no request, and no forked worker, pays for that. Flask-Migrate
+    loads only when a `flask db` command runs (see LazyMigrate) and debug.py
+    is never imported.
+    '''
+    configure_mappers()
+    return app
 
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
\ No newline at end of file
+    create_app().run(port=5555, debug=True)
\ No newline at end of file
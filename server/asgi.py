@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+'''ASGI entry point serving the app.py routes, with reads on SQLAlchemy's asyncio extension.
+
+GETs on /campers, /activities and their /<id> routes run on one event loop
+and wait on SQLite through aiosqlite instead of blocking a worker thread.
+They run the statements and payloads app.py's CollectionRead and DetailRead
+plan for the Flask-RESTful resources, so the collection filters, `sort`
+with its keyset cursors, `ids` batch reads and `fields`/`expand` behave the
+same; the response cache, ETags and compression stay on the WSGI app.
+
+Every other request, writes included, runs through the Flask app itself in
+a worker thread, so it retries while SQLite is busy, honours
+Idempotency-Key and stamps the tag versions and response cache every WSGI
+worker revalidates against.
+
+    uvicorn asgi:application --port 5555
+'''
+
+import asyncio
+import functools
+import io
+import re
+import sys
+from urllib.parse import parse_qs
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import (
+    create_app, CollectionRead, DetailRead, STREAM_FORMATS,
+    camper_detail, activity_detail, serialize_camper, serialize_activity,
+)
+from database import install_sqlite_pragmas
+from models import (
+    db, Camper, Activity,
+    CAMPER_LIST_LOADERS, CAMPER_DETAIL_LOADERS, ACTIVITY_LIST_LOADERS, ACTIVITY_DETAIL_LOADERS,
+)
+
+app = create_app()
+
+def create_engine():
+    '''An aiosqlite engine on the Flask app's database, with the same pragmas and pool settings.'''
+    with app.app_context():
+        url = db.engine.url.set(drivername='sqlite+aiosqlite')
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    if url.database in (None, '', ':memory:'):
+        options = {}
+    engine = create_async_engine(url, **options)
+    install_sqlite_pragmas(engine.sync_engine, app.config['SQLITE_PRAGMAS'])
+    return engine
+
+engine = create_engine()
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+def json_response(payload, status):
+    return status, [(b'content-type', b'application/json')], app.json.dumps(payload).encode() + b'\n'
+
+def stream_response(session, read):
+    async def generate():
+        yield read.opening.encode()
+        first = True
+        async for row in await session.stream_scalars(read.statement):
+            yield read.chunk(row, first).encode()
+            first = False
+        yield read.closing.encode()
+
+    return 200, [(b'content-type', STREAM_FORMATS[read.stream].encode())], generate()
+
+async def list_response(model, loaders, serialize, session, args):
+    try:
+        read = CollectionRead(model, loaders, serialize, args)
+    except ValueError as e:
+        return json_response({"errors": [str(e)]}, 400)
+    if read.stream:
+        return stream_response(session, read)
+    return json_response(read.render((await session.scalars(read.statement)).all()), 200)
+
+async def detail_response(model, loaders, render, session, args, id):
+    try:
+        read = DetailRead(model, id, loaders, render, args)
+    except ValueError as e:
+        return json_response({"errors": [str(e)]}, 400)
+    row = await session.scalar(read.statement)
+    if not row:
+        return json_response({"error": read.not_found}, 404)
+    payload, _ = read.render(row)
+    return json_response(payload, 200)
+
+ROUTES = (
+    (re.compile(r'/campers'), functools.partial(list_response, Camper, CAMPER_LIST_LOADERS, serialize_camper)),
+    (re.compile(r'/campers/(\d+)'), functools.partial(detail_response, Camper, CAMPER_DETAIL_LOADERS, camper_detail)),
+    (re.compile(r'/activities'), functools.partial(list_response, Activity, ACTIVITY_LIST_LOADERS, serialize_activity)),
+    (re.compile(r'/activities/(\d+)'), functools.partial(detail_response, Activity, ACTIVITY_DETAIL_LOADERS, activity_detail)),
+)
+
+def match(path):
+    '''The async GET handler for `path` and the integer ids in it, or (None, ()) if the Flask app serves it.'''
+    for pattern, handler in ROUTES:
+        found = pattern.fullmatch(path)
+        if found:
+            return handler, tuple(int(id) for id in found.groups())
+    return None, ()
+
+def wsgi_environ(scope, body):
+    '''The PEP 3333 environ for an ASGI HTTP request whose body has been read.'''
+    host, port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': host,
+        'SERVER_PORT': str(port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1').upper().replace('-', '_'), value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+def call_flask(environ):
+    '''Runs one request through the Flask app; returns (status, headers, body).'''
+    started = []
+    chunks = app(environ, lambda status, headers, exc_info=None: started.append((status, headers)))
+    try:
+        body = b''.join(chunks)
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+    status, headers = started[-1]
+    return int(status.split()[0]), [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers], body
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+async def send_response(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    if isinstance(body, bytes):
+        await send({'type': 'http.response.body', 'body': body if status != 204 else b''})
+        return
+    async for chunk in body:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    handler, ids = match(scope['path']) if scope['method'] == 'GET' else (None, ())
+    if handler is None:
+        # Writes, and the routes only the Flask app serves, keep its caching, retries and error handling.
+        environ = wsgi_environ(scope, await read_body(receive))
+        return await send_response(send, *await asyncio.get_running_loop().run_in_executor(None, call_flask, environ))
+
+    args = {name: values[0] for name, values in parse_qs(scope['query_string'].decode(), keep_blank_values=True).items()}
+    # The session stays open until a streamed body has been sent.
+    async with Session() as session:
+        try:
+            response = await handler(session, args, *ids)
+        except Exception:
+            await session.rollback()
+            response = json_response({"message": "Internal server error"}, 500)
+        await send_response(send, *response)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, port=5555)
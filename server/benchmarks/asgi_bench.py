@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+'''Compare the threaded WSGI Flask-RESTful app with the asyncio ASGI app under concurrency.
+
+Seeds a scratch database through seed.py, serves it with werkzeug's threaded
+server and with uvicorn running asgi.application, then drives every
+load_bench scenario over HTTP at each --concurrency level against both.
+The response cache is off so both servers hit SQLite on every request.
+
+Run from server/:
+    python -m benchmarks.asgi_bench --campers 10000 --concurrency 8 64 256
+'''
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from benchmarks.load_bench import QuietHandler, run_http, scenarios, seed
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_uvicorn(application):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(
+        application, host='127.0.0.1', port=free_port(), log_level='warning', access_log=False,
+        backlog=4096,
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, server.config.port
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campers', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario, server and level')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[8, 64])
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    from app import app, response_cache
+
+    response_cache.ttl = 0
+    activities = seed(args.campers, args.campers * 3)
+    plan = scenarios(args.campers, activities)
+
+    import asgi
+
+    wsgi_server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=wsgi_server.serve_forever, daemon=True).start()
+    asgi_server, asgi_port = start_uvicorn(asgi.application)
+    ports = {'wsgi': wsgi_server.server_port, 'asgi': asgi_port}
+
+    failed = []
+    print(f'{"server":<6} {"clients":>7} {"scenario":<22} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for concurrency in args.concurrency:
+        for name, make_request in plan.items():
+            for server, port in ports.items():
+                summary = run_http(port, make_request, args.requests, concurrency)
+                if summary['errors']:
+                    # Throughput over failing requests measures the error path, not the endpoint.
+                    failed.append(f'{server} {concurrency} {name}')
+                    print(f'{server:<6} {concurrency:>7} {name:<22} {"FAILED":>8} {"":>8} {"":>8} {"":>8} {summary["errors"]:>7}')
+                    continue
+                print(f'{server:<6} {concurrency:>7} {name:<22} {summary["rps"]:>8.0f} {summary["p50_ms"]:>8.2f} '
+                      f'{summary["p95_ms"]:>8.2f} {summary["p99_ms"]:>8.2f} {summary["errors"]:>7}')
+
+    asgi_server.should_exit = True
+    wsgi_server.shutdown()
+    tmp.cleanup()
+    for failure in failed:
+        print(f'FAILED {failure}')
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
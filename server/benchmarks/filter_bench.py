@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+'''Server-side filters versus fetching the full list and filtering on the client.
+
+Seeds a scratch database with --campers campers through seed.py, then times
+each query through app.test_client() both ways: GET /campers (or
+/activities) followed by the same filter in Python, and the equivalent
+filter parameters, in full and as a first page of --limit rows. Reports mean
+latency and response size. The response cache is off.
+
+Run from server/:
+    python -m benchmarks.filter_bench --campers 100000
+'''
+
+import argparse
+import os
+import tempfile
+import time
+
+QUERIES = (
+    ('campers aged 12-13', '/campers', 'age_min=12&age_max=13',
+     lambda row: 12 <= row['age'] <= 13),
+    ('campers named Ja*', '/campers', 'name_prefix=Ja&sort=name',
+     lambda row: row['name'].startswith('Ja')),
+    ('activities difficulty 7', '/activities', 'difficulty=7',
+     lambda row: row['difficulty'] == 7),
+)
+
+def timed(client, path, repeat):
+    '''Mean latency in ms, the response size and the parsed body of GET `path`.'''
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(path)
+    elapsed = (time.perf_counter() - started) / repeat * 1000
+    return elapsed, len(response.get_data()), response.get_json()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campers', type=int, default=20000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    from app import app, response_cache
+    from benchmarks.load_bench import seed
+
+    response_cache.ttl = 0
+    seed(args.campers, args.campers * 3)
+    client = app.test_client()
+
+    print(f'{"query":<24} {"mode":<20} {"ms":>9} {"KiB":>9} {"rows":>7}')
+    for name, path, query, keep in QUERIES:
+        elapsed, size, rows = timed(client, path, args.repeat)
+        started = time.perf_counter()
+        rows = [row for row in rows if keep(row)]
+        elapsed += (time.perf_counter() - started) * 1000
+        print(f'{name:<24} {"full list + client":<20} {elapsed:>9.1f} {size / 1024:>9.1f} {len(rows):>7}')
+
+        elapsed, size, rows = timed(client, f'{path}?{query}', args.repeat)
+        print(f'{name:<24} {"server filter":<20} {elapsed:>9.1f} {size / 1024:>9.1f} {len(rows):>7}')
+
+        elapsed, size, page = timed(client, f'{path}?{query}&limit={args.limit}', args.repeat)
+        print(f'{name:<24} {"server filter page":<20} {elapsed:>9.1f} {size / 1024:>9.1f} {len(page["data"]):>7}')
+    tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
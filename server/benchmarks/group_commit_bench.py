@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''Write throughput with and without group commit.
+
+Starts --threads threads that each POST --requests single rows (a mix of
+campers, activities and signups) through app.test_client() against a
+scratch database, once with one commit per request and once with
+GROUP_COMMIT on, and reports writes per second, latency and, for group
+commit, the mean batch size. --profile picks the SQLite pragmas; under
+"safe" (synchronous=FULL) every commit is an fsync, which is where sharing
+commits pays off most.
+
+Run from server/:
+    python -m benchmarks.group_commit_bench --threads 32 --profile safe
+'''
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+def writes(worker, requests):
+    for index in range(requests):
+        kind = index % 3
+        if kind == 0:
+            yield '/campers', {'name': f'Camper {worker}-{index}', 'age': 8 + index % 11}
+        elif kind == 1:
+            yield '/activities', {'name': f'Activity {worker}-{index}', 'difficulty': index % 10}
+        else:
+            yield '/signups', {'time': index % 24, 'camper_id': 1 + worker, 'activity_id': 1 + index}
+
+def run(app, threads, requests):
+    '''(writes per second, p50 ms, p95 ms, server errors) for one round of concurrent POSTs.'''
+    latencies, errors = [], []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(number):
+        client = app.test_client()
+        barrier.wait()
+        for path, body in writes(number, requests):
+            started = time.perf_counter()
+            response = client.post(path, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 500:
+                errors.append(response.status_code)
+
+    pool = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    cuts = statistics.quantiles(latencies, n=20)
+    return len(latencies) / elapsed, cuts[9], cuts[18], len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=150, help='POSTs per thread')
+    parser.add_argument('--profile', choices=('production', 'safe'), default='production')
+    parser.add_argument('--interval-ms', type=float, default=2)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    os.environ['DB_PROFILE'] = args.profile
+    from app import app, db, group_commit, response_cache
+    from seed import seed_database
+
+    response_cache.ttl = 0
+    group_commit.interval = args.interval_ms / 1000
+    with app.app_context():
+        db.create_all()
+    print(f'{args.threads} threads x {args.requests} POSTs, {args.profile} profile')
+    print(f'{"mode":<16} {"writes/s":>10} {"p50 ms":>9} {"p95 ms":>9} {"errors":>7} {"batch":>7}')
+    for mode in ('per-request', 'group commit'):
+        # One camper per thread and one activity per request for the signups to reference.
+        with app.app_context(), db.engine.begin() as conn:
+            seed_database(conn, args.threads, args.requests, 0)
+        app.config['GROUP_COMMIT'] = mode == 'group commit'
+        batches, items = group_commit.batches, group_commit.items
+        rate, p50, p95, errors = run(app, args.threads, args.requests)
+        committed = group_commit.batches - batches
+        batch = f'{(group_commit.items - items) / committed:.1f}' if committed else '-'
+        print(f'{mode:<16} {rate:>10.0f} {p50:>9.2f} {p95:>9.2f} {errors:>7} {batch:>7}')
+    tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
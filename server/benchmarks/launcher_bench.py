@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+'''Measure cold start and steady-state throughput of launcher.py per worker/thread count.
+
+Seeds a scratch database through seed.py, then for each --grid entry
+(WORKERSxTHREADS) starts launcher.py, times how long it takes to serve its
+first successful request, and drives the load_bench scenarios over HTTP with
+--concurrency clients.
+
+Run from server/:
+    python -m benchmarks.launcher_bench --campers 10000 --grid 1x1 1x8 2x4 4x4 4x8
+'''
+
+import argparse
+import http.client
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.asgi_bench import free_port
+from benchmarks.load_bench import run_http, scenarios, seed
+
+def wait_until_serving(port, path, timeout=30.0):
+    '''Seconds until `path` first answers 200.'''
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', path)
+            if conn.getresponse().status == 200:
+                return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.005)
+    raise RuntimeError(f'launcher did not serve {path} within {timeout}s')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campers', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=1000, help='requests per scenario and configuration')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--grid', nargs='+', default=['1x1', '1x8', '2x4', '4x4'])
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    from app import response_cache
+
+    response_cache.ttl = 0
+    activities = seed(args.campers, args.campers * 3)
+    plan = scenarios(args.campers, activities)
+    # Each worker has its own response cache; keep them out of the numbers.
+    env = {**os.environ, 'RESPONSE_CACHE_TTL': '0'}
+
+    print(f'{"workers":>7} {"threads":>7} {"cold ms":>8} {"scenario":<22} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for entry in args.grid:
+        workers, threads = (int(n) for n in entry.split('x'))
+        port = free_port()
+        launcher = subprocess.Popen(
+            [sys.executable, 'launcher.py', '--port', str(port), '--workers', str(workers), '--threads', str(threads)],
+            env=env, stderr=subprocess.DEVNULL,
+        )
+        try:
+            cold = wait_until_serving(port, '/campers/1')
+            for name, make_request in plan.items():
+                summary = run_http(port, make_request, args.requests, args.concurrency)
+                print(f'{workers:>7} {threads:>7} {cold * 1000:>8.0f} {name:<22} {summary["rps"]:>8.0f} '
+                      f'{summary["p50_ms"]:>8.2f} {summary["p95_ms"]:>8.2f} {summary["p99_ms"]:>8.2f} {summary["errors"]:>7}')
+        finally:
+            launcher.send_signal(signal.SIGTERM)
+            launcher.wait()
+    tmp.cleanup()
+
+if __name__ == '__main__':
+    main()
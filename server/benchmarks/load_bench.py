@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+'''Load-test every endpoint through the Flask test client and a real WSGI server.
+
+Seeds a scratch database with --campers campers (and --signups signups)
+through seed.py, then runs each scenario first in-process through
+app.test_client() and then over HTTP against a threaded local WSGI server
+with --concurrency workers.
+Reports p50/p95/p99 latency and requests per second. --save writes the
+results as a JSON baseline; --compare fails (exit status 1) when p95 latency
+or throughput is worse than the baseline by more than --threshold.
+
+Run from server/:
+    python -m benchmarks.load_bench --campers 100000 --save benchmarks/baseline.json
+    python -m benchmarks.load_bench --campers 100000 --compare benchmarks/baseline.json
+'''
+
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+def seed(campers, signups):
+    '''Fills the app database through the bulk seeder; returns the number of activities.'''
+    from app import app, db
+    from seed import seed_database
+
+    activities = max(10, campers // 100)
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            seed_database(conn, campers, activities, signups)
+    return activities
+
+def scenarios(campers, activities):
+    '''Maps scenario name to a factory for (method, path, json body) using its own RNG.'''
+    def signup(rng):
+        return {'time': rng.randrange(24), 'camper_id': rng.randrange(campers) + 1,
+                'activity_id': rng.randrange(activities) + 1}
+
+    return {
+        'GET /campers': lambda rng: ('GET', '/campers?limit=100', None),
+        'GET /campers/<id>': lambda rng: ('GET', f'/campers/{rng.randrange(campers) + 1}', None),
+        'GET /activities': lambda rng: ('GET', '/activities?limit=100', None),
+        'GET /activities/<id>': lambda rng: ('GET', f'/activities/{rng.randrange(activities) + 1}', None),
+        'POST /signups': lambda rng: ('POST', '/signups', signup(rng)),
+    }
+
+def summarize(latencies, elapsed, errors):
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': cuts[49] * 1000,
+        'p95_ms': cuts[94] * 1000,
+        'p99_ms': cuts[98] * 1000,
+    }
+
+def run_test_client(app, make_request, requests):
+    client = app.test_client()
+    rng = random.Random(1)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        method, path, body = make_request(rng)
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        latencies.append(time.perf_counter() - start)
+        errors += response.status_code >= 500
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+def run_http(port, make_request, requests, concurrency):
+    per_worker = max(1, requests // concurrency)
+
+    def worker(n):
+        rng = random.Random(n)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        latencies, errors = [], 0
+        for _ in range(per_worker):
+            method, path, body = make_request(rng)
+            payload = json.dumps(body) if body is not None else None
+            start = time.perf_counter()
+            conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            errors += response.status >= 500
+        conn.close()
+        return latencies, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+    return summarize(latencies, elapsed, sum(errors for _, errors in results))
+
+def compare(results, baseline, threshold):
+    '''Returns a description of each scenario that regressed beyond `threshold`.'''
+    regressions = []
+    for mode, by_scenario in baseline['results'].items():
+        for name, before in by_scenario.items():
+            after = results['results'].get(mode, {}).get(name)
+            if after is None:
+                continue
+            if after['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append(f'{mode} {name}: p95 {before["p95_ms"]:.2f} -> {after["p95_ms"]:.2f} ms')
+            if after['rps'] < before['rps'] * (1 - threshold):
+                regressions.append(f'{mode} {name}: rps {before["rps"]:.0f} -> {after["rps"]:.0f}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campers', type=int, default=1000)
+    parser.add_argument('--signups', type=int, help='defaults to 3 per camper')
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario and mode')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--cache', action='store_true', help='leave the response cache on')
+    parser.add_argument('--save', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to check against')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    from app import app, response_cache
+
+    if not args.cache:
+        response_cache.ttl = 0
+    signups = args.signups if args.signups is not None else args.campers * 3
+    activities = seed(args.campers, signups)
+    plan = scenarios(args.campers, activities)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = {
+        'dataset': {'campers': args.campers, 'activities': activities, 'signups': signups},
+        'results': {'test_client': {}, 'wsgi': {}},
+    }
+    print(f'{"mode":<12} {"scenario":<22} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for name, make_request in plan.items():
+        for mode, run in (
+            ('test_client', lambda: run_test_client(app, make_request, args.requests)),
+            ('wsgi', lambda: run_http(server.server_port, make_request, args.requests, args.concurrency)),
+        ):
+            summary = run()
+            results['results'][mode][name] = summary
+            print(f'{mode:<12} {name:<22} {summary["rps"]:>8.0f} {summary["p50_ms"]:>8.2f} '
+                  f'{summary["p95_ms"]:>8.2f} {summary["p99_ms"]:>8.2f} {summary["errors"]:>7}')
+    server.shutdown()
+    tmp.cleanup()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+'''Micro-benchmark: compiled serializers vs. SerializerMixin.to_dict().
+
+Run from server/:  python -m benchmarks.serializer_bench [--campers N] [--activities N]
+'''
+
+import argparse
+import timeit
+
+from models import Camper, Activity, Signup
+from serializers import serialize_camper, serialize_activity
+
+def build_rows(n_campers, n_activities):
+    '''Builds transient, fully linked rows so no database time is measured.'''
+    activities = []
+    for i in range(n_activities):
+        activity = Activity(name=f'Activity {i}', difficulty=i % 10)
+        activity.id = i + 1
+        activities.append(activity)
+    campers = []
+    for i in range(n_campers):
+        camper = Camper(name=f'Camper {i}', age=8 + i % 11)
+        camper.id = i + 1
+        for hour in range(3):
+            activity = activities[(i + hour) % n_activities]
+            signup = Signup(time=hour, camper_id=camper.id, activity_id=activity.id)
+            signup.id = i * 3 + hour + 1
+            signup.camper = camper
+            signup.activity = activity
+        campers.append(camper)
+    return campers, activities
+
+def measure(label, func, rows, repeat):
+    best = min(timeit.repeat(lambda: [func(row) for row in rows], number=1, repeat=repeat))
+    print(f'{label:<28} {best * 1000:9.2f} ms  {len(rows) / best:12.0f} rows/s')
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--campers', type=int, default=2000)
+    parser.add_argument('--activities', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    campers, activities = build_rows(args.campers, args.activities)
+    for name, rows, compiled in (
+        ('campers', campers, serialize_camper),
+        ('activities', activities, serialize_activity),
+    ):
+        mixin = measure(f'{name} SerializerMixin', lambda row: row.to_dict(), rows, args.repeat)
+        fast = measure(f'{name} compiled', compiled, rows, args.repeat)
+        print(f'{name} speedup: {mixin / fast:.1f}x\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+'''Detail-GET and delete latency on signups with and without its indexes.
+
+For each size, a scratch database is filled with that many signups and the
+statements behind GET /campers/<id>, GET /activities/<id> and the cascade
+deletes are timed, first with the indexes from models.py, then without them.
+
+Run from server/:  python -m benchmarks.signup_index_bench [--sizes 10000 100000 1000000]
+'''
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, delete, insert, select
+
+from database import SQLITE_PROFILES, install_sqlite_pragmas
+from models import db, Camper, Activity, Signup
+
+N_CAMPERS = 10000
+N_ACTIVITIES = 500
+BATCH = 50000
+
+def seed(engine, n_signups):
+    rng = random.Random(0)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Camper), [{'name': f'Camper {i}', 'age': 8 + i % 11} for i in range(N_CAMPERS)])
+        conn.execute(insert(Activity), [{'name': f'Activity {i}', 'difficulty': i % 10} for i in range(N_ACTIVITIES)])
+        for start in range(0, n_signups, BATCH):
+            conn.execute(insert(Signup), [
+                {'time': rng.randrange(24),
+                 'camper_id': rng.randrange(N_CAMPERS) + 1,
+                 'activity_id': rng.randrange(N_ACTIVITIES) + 1}
+                for _ in range(min(BATCH, n_signups - start))
+            ])
+
+def timed(engine, statements, fetch=True):
+    '''Returns the mean latency in ms of each statement; writes are rolled back.'''
+    start = time.perf_counter()
+    for statement in statements:
+        with engine.connect() as conn:
+            result = conn.execute(statement)
+            if fetch:
+                result.all()
+            conn.rollback()
+    return (time.perf_counter() - start) / len(statements) * 1000
+
+def measure(engine, samples):
+    ids = random.Random(1).sample(range(1, N_ACTIVITIES + 1), samples)
+    return {
+        'camper detail': timed(engine, [select(Signup).where(Signup.camper_id == i) for i in ids]),
+        'activity detail': timed(engine, [select(Signup).where(Signup.activity_id == i) for i in ids]),
+        'activity delete': timed(engine, [delete(Signup).where(Signup.activity_id == i) for i in ids], fetch=False),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'{"signups":>9}  {"query":<16} {"indexed ms":>11} {"unindexed ms":>13}')
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f'sqlite:///{os.path.join(tmp, "bench.db")}')
+            install_sqlite_pragmas(engine, SQLITE_PROFILES['production'])
+            seed(engine, size)
+            indexed = measure(engine, args.samples)
+            with engine.begin() as conn:
+                for index in Signup.__table__.indexes:
+                    index.drop(conn)
+            unindexed = measure(engine, args.samples)
+            engine.dispose()
+        for name in indexed:
+            print(f'{size:>9}  {name:<16} {indexed[name]:>11.3f} {unindexed[name]:>13.3f}')
+
+if __name__ == '__main__':
+    main()
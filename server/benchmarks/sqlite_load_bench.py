@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+'''Concurrent read/write load test for the SQLite engine profiles.
+
+Writer threads commit one signup per transaction (like POST /signups) while
+reader threads run the activity listing query (like GET /activities).
+Reader latency is reported per profile, showing whether reads stall behind
+commits.
+
+Run from server/:  python -m benchmarks.sqlite_load_bench [--seconds S] [--readers N] [--writers N]
+'''
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, insert, select
+
+from database import SQLITE_PROFILES, install_sqlite_pragmas
+from models import db, Camper, Activity, Signup
+
+def build_engine(path, profile, pool_size):
+    engine = create_engine(f'sqlite:///{path}', pool_size=pool_size, max_overflow=0)
+    install_sqlite_pragmas(engine, SQLITE_PROFILES[profile])
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Camper), [{'name': f'Camper {i}', 'age': 8 + i % 11} for i in range(200)])
+        conn.execute(insert(Activity), [{'name': f'Activity {i}', 'difficulty': i % 10} for i in range(20)])
+    return engine
+
+def run(profile, seconds, readers, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(os.path.join(tmp, 'load.db'), profile, readers + writers)
+        stop = threading.Event()
+        latencies, errors, writes = [], [], [0]
+        lock = threading.Lock()
+        listing = select(Activity, Signup).outerjoin(Signup, Signup.activity_id == Activity.id)
+
+        def read():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(listing).all()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+
+        def write(n):
+            i = 0
+            while not stop.is_set():
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(Signup).values(
+                            time=i % 24, camper_id=(n + i) % 200 + 1, activity_id=i % 20 + 1))
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                i += 1
+                with lock:
+                    writes[0] += 1
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        threads += [threading.Thread(target=write, args=(n,)) for n in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    print(f'{profile:<11} reads/s {len(latencies) / seconds:8.0f}  writes/s {writes[0] / seconds:7.0f}  '
+          f'read p50 {quantiles[49] * 1000:6.2f} ms  p99 {quantiles[98] * 1000:7.2f} ms  '
+          f'max {max(latencies, default=0) * 1000:7.2f} ms  errors {len(errors)}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+    for profile in ('safe', 'production'):
+        run(profile, args.seconds, args.readers, args.writers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+'''Cold-start cost of the serving app: imports and time to first request.
+
+Each --runs run starts a fresh interpreter against a scratch database and
+times `from app import create_app; create_app()` and then one GET /campers
+through the test client. One more run goes under `python -X importtime`
+so --top can list the slowest imports by cumulative time. The medians are
+checked against IMPORT_BUDGET_MS and FIRST_REQUEST_BUDGET_MS, the modules
+the app import brings in against MODULE_BUDGET, and the serving path must
+not import any of DEFERRED_MODULES (migration and debug tooling); the exit
+status is 1 otherwise. testing/startup_test.py checks the module budget and
+the deferred modules, which do not vary with the machine as wall-clock
+budgets do.
+
+Run from server/:
+    python -m benchmarks.startup_bench --runs 5 --top 15
+'''
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# About three times what a single-CPU machine measures, to stay clear of noise;
+# a new heavyweight import shows up in DEFERRED_MODULES or the --top list first.
+IMPORT_BUDGET_MS = 1500
+FIRST_REQUEST_BUDGET_MS = 2000
+
+# Modules `from app import create_app; create_app()` adds to sys.modules:
+# about 15% over the ~450 measured, well short of the 139 more Flask-Migrate,
+# Alembic and Mako brought in when app.py imported them.
+MODULE_BUDGET = 520
+
+# Loaded only by `flask db` commands and debug.py, never by serving.
+DEFERRED_MODULES = ('flask_migrate', 'alembic', 'mako', 'ipdb')
+
+COLD_START = '''
+import json, sys, time
+started = time.perf_counter()
+preloaded = len(sys.modules)
+from app import create_app
+app = create_app()
+imported = time.perf_counter()
+app_modules = len(sys.modules) - preloaded
+status = app.test_client().get('/campers?limit=1').status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_request_ms': (served - started) * 1000,
+    'status': status,
+    'modules': len(sys.modules),
+    'app_modules': app_modules,
+    'deferred_loaded': sorted({name.split('.')[0] for name in sys.modules} & set(%r)),
+}))
+''' % (DEFERRED_MODULES,)
+
+CREATE_TABLES = '''
+from app import app, db
+with app.app_context():
+    db.create_all()
+'''
+
+def python(code, env, *flags):
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+
+def scratch_env(directory):
+    '''The environment for a cold start against an empty database in `directory`.'''
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{os.path.join(directory, "startup.db")}'}
+    python(CREATE_TABLES, env)
+    return env
+
+def cold_start(env):
+    '''One fresh interpreter's import and first-request timings, as a dict.'''
+    return json.loads(python(COLD_START, env).stdout)
+
+def slowest_imports(env, top):
+    '''(cumulative ms, module) for the `top` slowest imports under `python -X importtime`.'''
+    stderr = python(COLD_START, env, '-X', 'importtime').stderr
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(timings, reverse=True)[:top]
+
+def measure(runs):
+    '''Medians over `runs` cold starts, plus the last run's module counts and deferred modules.'''
+    with tempfile.TemporaryDirectory() as directory:
+        env = scratch_env(directory)
+        results = [cold_start(env) for _ in range(runs)]
+    return {
+        'import_ms': statistics.median(result['import_ms'] for result in results),
+        'first_request_ms': statistics.median(result['first_request_ms'] for result in results),
+        'status': results[-1]['status'],
+        'modules': results[-1]['modules'],
+        'app_modules': results[-1]['app_modules'],
+        'deferred_loaded': results[-1]['deferred_loaded'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    args = parser.parse_args()
+
+    if args.top:
+        with tempfile.TemporaryDirectory() as directory:
+            imports = slowest_imports(scratch_env(directory), args.top)
+        print(f'{"cumulative ms":>14}  module')
+        for cumulative, name in imports:
+            print(f'{cumulative:>14.1f}  {name}')
+        print()
+
+    result = measure(args.runs)
+    print(f'{"":<18} {"median ms":>10} {"budget ms":>10}')
+    print(f'{"import":<18} {result["import_ms"]:>10.0f} {IMPORT_BUDGET_MS:>10}')
+    print(f'{"first request":<18} {result["first_request_ms"]:>10.0f} {FIRST_REQUEST_BUDGET_MS:>10}')
+    print(f'{"app modules":<18} {result["app_modules"]:>10} {MODULE_BUDGET:>10}')
+    print(f'modules loaded: {result["modules"]}, deferred modules loaded: {", ".join(result["deferred_loaded"]) or "none"}')
+    over = (result['import_ms'] > IMPORT_BUDGET_MS or result['first_request_ms'] > FIRST_REQUEST_BUDGET_MS
+            or result['app_modules'] > MODULE_BUDGET or result['deferred_loaded'] or result['status'] != 200)
+    sys.exit(1 if over else 0)
+
+if __name__ == '__main__':
+    main()
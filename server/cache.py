@@ -0,0 +1,208 @@
+import abc
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from sqlalchemy import event
+
+from models import Camper, Activity, Signup
+
+# Tags for cached collection responses; any write to the rows they embed evicts them.
+CAMPERS_TAG = 'campers'
+ACTIVITIES_TAG = 'activities'
+
+def camper_tag(id):
+    return f'camper:{id}'
+
+def activity_tag(id):
+    return f'activity:{id}'
+
+class CacheBackend(abc.ABC):
+    '''Storage interface for ResponseCache. Implement all four methods to plug in another store.'''
+
+    @abc.abstractmethod
+    def get(self, key):
+        pass
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl):
+        pass
+
+    @abc.abstractmethod
+    def delete(self, key):
+        pass
+
+    @abc.abstractmethod
+    def clear(self):
+        pass
+
+class LRUBackend(CacheBackend):
+    '''Thread-safe in-process store with per-entry expiry and least-recently-used eviction.'''
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class ResponseCache:
+    '''Read-through cache of GET response bodies, retired when a commit moves the version of a tag they embed.'''
+
+    def __init__(self, backend=None, ttl=30):
+        self.backend = backend or LRUBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, build, versions):
+        '''Returns (response, tags, validators) for this request, from the cache or from build() -> (response, tags).
+
+        validators is the body's (etag, last_modified) from `versions`, or
+        None when a commit raced build(). Entries keep the ETag they were
+        built under and are served only while `versions` still gives it, so
+        a write retires them whichever process or read snapshot it came
+        through. The backend alone bounds how many entries are kept.
+        '''
+        key = request.full_path
+        entry = self.backend.get(key)
+        if entry is not None:
+            body, status, mimetype, tags, etag = entry
+            validators = versions.validators(tags)
+            if validators[0] == etag:
+                with self._lock:
+                    self.hits += 1
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response, tags, validators
+            self.backend.delete(key)
+
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+        as_of = versions.clock()
+        response, tags = build()
+        validators = None
+        if response.status_code == 200 and not response.is_streamed:
+            validators = versions.validators(tags, as_of=as_of)
+        if validators:
+            entry = (response.get_data(), response.status_code, response.mimetype, frozenset(tags), validators[0])
+            with self._lock:
+                # A commit during build() may have made this body stale; don't keep it.
+                if generation == self._generation:
+                    self.backend.set(key, entry, self.ttl)
+        response.headers['X-Cache'] = 'MISS'
+        return response, tags, validators
+
+    def invalidate(self, tags):
+        '''Keeps bodies built before this commit out of the cache; stored entries retire on their next hit.'''
+        with self._lock:
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self.hits = self.misses = 0
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+def write_tags(obj):
+    '''Cache tags made stale when `obj` is inserted, updated or deleted.'''
+    if isinstance(obj, Camper):
+        return {camper_tag(obj.id), CAMPERS_TAG, ACTIVITIES_TAG}
+    if isinstance(obj, Activity):
+        return {activity_tag(obj.id), CAMPERS_TAG, ACTIVITIES_TAG}
+    if isinstance(obj, Signup):
+        return signup_tags(obj.camper_id, obj.activity_id)
+    return set()
+
+def read_tags(obj, expand):
+    '''Row tags of `obj` and of every camper and activity reached through the `expand` tree.
+
+    Signups carry no tag of their own: every signup write already stales the
+    camper and activity on either side of it.
+    '''
+    tags = set()
+    if isinstance(obj, Camper):
+        tags.add(camper_tag(obj.id))
+    elif isinstance(obj, Activity):
+        tags.add(activity_tag(obj.id))
+    for name, children in expand.items():
+        value = getattr(obj, name)
+        for related in value if isinstance(value, list) else [value] if value is not None else []:
+            tags |= read_tags(related, children)
+    return tags
+
+def signup_tags(camper_id, activity_id):
+    return {camper_tag(camper_id), activity_tag(activity_id), CAMPERS_TAG, ACTIVITIES_TAG}
+
+def stale_on_commit(session, tags):
+    '''Schedules `tags` for eviction when `session` commits; used by writes that bypass the ORM flush.'''
+    session.info.setdefault('stale_cache_tags', set()).update(tags)
+
+def track_writes(session, *listeners, versions=None):
+    '''Calls listener.invalidate(tags) for every row a committed flush on `session` touched.
+
+    With `versions`, the same tags are stamped inside the committing
+    transaction, so the new versions become visible together with the rows.
+    '''
+
+    @event.listens_for(session, 'after_flush')
+    def collect(session, flush_context):
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            stale_on_commit(session, write_tags(obj))
+
+    if versions is not None:
+        @event.listens_for(session, 'before_commit')
+        def stamp(session):
+            # commit() flushes only after this hook, so collect() would miss that flush.
+            session.flush()
+            tags = session.info.get('stale_cache_tags')
+            if tags:
+                versions.stamp(session, tags)
+
+    @event.listens_for(session, 'after_commit')
+    def evict(session):
+        tags = session.info.pop('stale_cache_tags', None)
+        if tags:
+            for listener in listeners:
+                listener.invalidate(tags)
+
+    @event.listens_for(session, 'after_rollback')
+    def discard(session):
+        session.info.pop('stale_cache_tags', None)
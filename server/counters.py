@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+'''Denormalized signup counters: Camper/Activity.signup_count and activity_occupancy.
+
+SQLite triggers on signups keep them in step with every insert, update and
+delete in the same transaction, whether it comes from an ORM flush, the bulk
+insert in Signups.post, a cascade delete or raw SQL. check_counters() lists
+drift against a full recount and rebuild_counters() recomputes everything.
+
+    python counters.py            # report drift, exit status 1 if any
+    python counters.py --rebuild  # recompute all counters
+'''
+
+import argparse
+import sys
+
+from sqlalchemy import text
+
+from cache import ACTIVITIES_TAG
+from database import SQLiteTriggers
+from models import db
+
+def _add(sign, row):
+    '''Statements applying one signup (`row` is NEW or OLD) to the counters with `sign`.'''
+    statements = [
+        f'UPDATE campers SET signup_count = signup_count {sign} 1 WHERE id = {row}.camper_id;',
+        f'UPDATE activities SET signup_count = signup_count {sign} 1 WHERE id = {row}.activity_id;',
+    ]
+    if sign == '+':
+        statements.append(
+            f'INSERT INTO activity_occupancy (activity_id, time, count) '
+            f'SELECT {row}.activity_id, {row}.time, 1 '
+            f'WHERE {row}.activity_id IS NOT NULL AND {row}.time IS NOT NULL '
+            f'ON CONFLICT (activity_id, time) DO UPDATE SET count = count + 1;'
+        )
+    else:
+        statements += [
+            f'UPDATE activity_occupancy SET count = count - 1 '
+            f'WHERE activity_id = {row}.activity_id AND time = {row}.time;',
+            f'DELETE FROM activity_occupancy '
+            f'WHERE activity_id = {row}.activity_id AND time = {row}.time AND count <= 0;',
+        ]
+    return '\n    '.join(statements)
+
+TRIGGERS = {
+    'signups_counters_insert': f'''CREATE TRIGGER IF NOT EXISTS signups_counters_insert AFTER INSERT ON signups
+BEGIN
+    {_add('+', 'NEW')}
+END''',
+    'signups_counters_delete': f'''CREATE TRIGGER IF NOT EXISTS signups_counters_delete AFTER DELETE ON signups
+BEGIN
+    {_add('-', 'OLD')}
+END''',
+    'signups_counters_update': f'''CREATE TRIGGER IF NOT EXISTS signups_counters_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    {_add('-', 'OLD')}
+    {_add('+', 'NEW')}
+END''',
+}
+
+REBUILD = (
+    'UPDATE campers SET signup_count = '
+    '(SELECT count(*) FROM signups WHERE signups.camper_id = campers.id)',
+    'UPDATE activities SET signup_count = '
+    '(SELECT count(*) FROM signups WHERE signups.activity_id = activities.id)',
+    'DELETE FROM activity_occupancy',
+    'INSERT INTO activity_occupancy (activity_id, time, count) '
+    'SELECT activity_id, time, count(*) FROM signups '
+    'WHERE activity_id IS NOT NULL AND time IS NOT NULL GROUP BY activity_id, time',
+)
+
+CHECKS = {
+    'campers.signup_count': '''
+        SELECT campers.id, campers.signup_count, count(signups.id) FROM campers
+        LEFT JOIN signups ON signups.camper_id = campers.id
+        GROUP BY campers.id HAVING campers.signup_count != count(signups.id)''',
+    'activities.signup_count': '''
+        SELECT activities.id, activities.signup_count, count(signups.id) FROM activities
+        LEFT JOIN signups ON signups.activity_id = activities.id
+        GROUP BY activities.id HAVING activities.signup_count != count(signups.id)''',
+    # Full outer join of stored and recounted slots, as two LEFT JOINs.
+    'activity_occupancy': '''
+        WITH actual AS (
+            SELECT activity_id, time, count(*) AS count FROM signups
+            WHERE activity_id IS NOT NULL AND time IS NOT NULL GROUP BY activity_id, time
+        )
+        SELECT stored.activity_id || ':' || stored.time, stored.count, coalesce(actual.count, 0)
+        FROM activity_occupancy AS stored
+        LEFT JOIN actual USING (activity_id, time)
+        WHERE stored.count != coalesce(actual.count, 0)
+        UNION ALL
+        SELECT actual.activity_id || ':' || actual.time, 0, actual.count
+        FROM actual
+        LEFT JOIN activity_occupancy AS stored USING (activity_id, time)
+        WHERE stored.activity_id IS NULL''',
+}
+
+triggers = SQLiteTriggers(db.metadata, TRIGGERS, backfill=REBUILD)
+
+def check_counters(conn):
+    '''Returns (counter, key, stored, actual) for every counter that disagrees with signups.'''
+    return [
+        (counter, key, stored, actual)
+        for counter, sql in CHECKS.items()
+        for key, stored, actual in conn.execute(text(sql))
+    ]
+
+def rebuild_counters(conn, versions):
+    '''Recomputes every counter and moves the /activities/stats ETag in the same transaction.'''
+    triggers.rebuild(conn)
+    versions.stamp(conn, {ACTIVITIES_TAG})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rebuild', action='store_true', help='recompute all counters from signups')
+    args = parser.parse_args()
+
+    from app import app, versions
+
+    with app.app_context(), db.engine.begin() as conn:
+        if args.rebuild:
+            rebuild_counters(conn, versions)
+            print('Rebuilt signup counters')
+            return
+        drift = check_counters(conn)
+    for counter, key, stored, actual in drift:
+        print(f'{counter} {key}: stored {stored}, actual {actual}')
+    if drift:
+        sys.exit(1)
+    print('Signup counters are consistent')
+
+if __name__ == '__main__':
+    main()
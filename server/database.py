@@ -0,0 +1,147 @@
+import os
+import random
+import sqlite3
+import time
+
+from sqlalchemy import DDL, event
+from sqlalchemy.exc import OperationalError
+
+# Pragmas applied to every pooled SQLite connection, selected with DB_PROFILE.
+SQLITE_PROFILES = {
+    # WAL lets readers proceed while a signup write commits; NORMAL sync is
+    # durable across application crashes and only fsyncs at checkpoints.
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    },
+    # SQLite's own defaults plus enforced foreign keys.
+    'safe': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'foreign_keys': 'ON',
+    },
+}
+
+# Where GET requests read from; see replica.py.
+READ_MODES = ('primary', 'readonly', 'snapshot')
+
+def configure_database(app):
+    '''Fills in database settings from the environment unless the app already set them.'''
+    app.config.setdefault('SQLALCHEMY_DATABASE_URI', os.environ.get('DATABASE_URL', 'sqlite:///app.db'))
+    app.config.setdefault('SQLALCHEMY_TRACK_MODIFICATIONS', False)
+    profile = os.environ.get('DB_PROFILE', 'production')
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"DB_PROFILE must be one of {', '.join(SQLITE_PROFILES)}")
+    app.config.setdefault('SQLITE_PRAGMAS', SQLITE_PROFILES[profile])
+    app.config.setdefault('SQLITE_BUSY_RETRIES', int(os.environ.get('DB_BUSY_RETRIES', 4)))
+    app.config.setdefault('DB_READ_MODE', os.environ.get('DB_READ_MODE', 'primary'))
+    if app.config['DB_READ_MODE'] not in READ_MODES:
+        raise ValueError(f"DB_READ_MODE must be one of {', '.join(READ_MODES)}")
+    app.config.setdefault('DB_SNAPSHOT_INTERVAL', float(os.environ.get('DB_SNAPSHOT_INTERVAL', 5)))
+    # In-memory databases use a single static connection; pool sizing does not apply.
+    if app.config['SQLALCHEMY_DATABASE_URI'] not in ('sqlite://', 'sqlite:///:memory:'):
+        app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        })
+
+def install_sqlite_pragmas(engine, pragmas):
+    '''Runs `pragmas` on each new DBAPI connection the engine opens.
+
+    Foreign keys are switched on whatever the profile says: deletes rely on
+    ON DELETE CASCADE to remove signups.
+    '''
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = {**pragmas, 'foreign_keys': 'ON'}
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+def is_busy(error):
+    '''Whether `error` is SQLite reporting SQLITE_BUSY ("database is locked").'''
+    if not isinstance(error, OperationalError):
+        return False
+    code = getattr(error.orig, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff == sqlite3.SQLITE_BUSY
+    return 'database is locked' in str(error.orig)
+
+def retry_on_busy(session, work, retries, backoff=0.05):
+    '''Runs `work()`, rolling back and retrying while SQLite reports busy.
+
+    `work` must run a whole transaction, commit included, so that a retry
+    starts over. Waits grow exponentially from `backoff` seconds, with
+    jitter; after `retries` retries the OperationalError propagates.
+    busy_timeout already waits for the write lock, but a deferred
+    transaction that read before writing fails at once when another writer
+    committed in between.
+    '''
+    for attempt in range(retries + 1):
+        try:
+            return work()
+        except OperationalError as e:
+            session.rollback()
+            if attempt == retries or not is_busy(e):
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+class LazyMigrate:
+    '''Stands in for Flask-Migrate in app.extensions['migrate'] until a `flask db` command uses it.
+
+    Importing flask_migrate pulls in Alembic and Mako, which the serving path
+    never needs. The `flask db` commands and migrations/env.py reach Flask-Migrate
+    only through app.extensions['migrate'], so the first attribute they read
+    installs the real extension in this one's place and answers from it.
+    '''
+
+    def __init__(self, app, db, **options):
+        self._app = app
+        self._db = db
+        self._options = options
+        app.extensions['migrate'] = self
+
+    def __getattr__(self, name):
+        from flask_migrate import Migrate
+
+        Migrate(self._app, self._db, **self._options)
+        return getattr(self._app.extensions['migrate'], name)
+
+class SQLiteTriggers:
+    '''Named CREATE TRIGGER statements that keep derived rows in step with their sources.
+
+    Tables made with create_all() (tests, scratch databases) get the triggers
+    too. create() and drop() install and remove them on an existing database,
+    around a bulk load for instance, and rebuild() runs the `backfill`
+    statements that recompute the derived rows from scratch. Each runs inside
+    the caller's transaction.
+    '''
+
+    def __init__(self, metadata, triggers, backfill=()):
+        self.triggers = triggers
+        self.backfill = backfill
+        for sql in triggers.values():
+            event.listen(metadata, 'after_create', DDL(sql).execute_if(dialect='sqlite'))
+
+    def create(self, conn):
+        for sql in self.triggers.values():
+            conn.exec_driver_sql(sql)
+
+    def drop(self, conn):
+        for name in self.triggers:
+            conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {name}')
+
+    def rebuild(self, conn):
+        for sql in self.backfill:
+            conn.exec_driver_sql(sql)
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
+'''An ipdb session inside the app context. Development only: nothing imports this module.'''
 
 from app import app
-from models import db, Newsletter
+from models import db, Camper, Activity, Signup  # noqa: F401 - for use at the prompt
 
 if __name__ == '__main__':
-    
+
     with app.app_context():
         import ipdb; ipdb.set_trace()
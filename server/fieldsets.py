@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from serializers import compile_serializer, serializable_columns
+
+MAX_EXPAND_DEPTH = 3
+
+class Fieldset:
+    '''A sparse representation of `model`: some of its columns plus opt-in relationships.
+
+    `columns` are the top-level columns to select and serialize (always
+    including id); `expand` is a tree of relationship names, each mapping to
+    the expansions of the related rows, which are serialized with all their
+    columns. `loaders` fetch exactly that; `serialize` renders it.
+    '''
+
+    def __init__(self, model, columns, expand):
+        self.model = model
+        self.columns = columns
+        self.expand = expand
+        self.loaders = (load_only(*(getattr(model, name) for name in columns)), *expand_loaders(model, expand))
+        self.serialize = compile_serializer(model, expand_serializers(model, expand), columns)
+
+def expand_loaders(model, expand):
+    '''Eager loads for each expanded relationship: selectin for collections, a join for many-to-one.'''
+    options = []
+    for name, children in expand.items():
+        related = model.__mapper__.relationships[name]
+        loader = selectinload if related.uselist else joinedload
+        columns = (getattr(related.mapper.class_, column) for column in serializable_columns(related.mapper.class_))
+        options.append(loader(getattr(model, name)).options(
+            load_only(*columns), *expand_loaders(related.mapper.class_, children),
+        ))
+    return options
+
+def expand_serializers(model, expand):
+    serializers = {}
+    for name, children in expand.items():
+        related = model.__mapper__.relationships[name].mapper.class_
+        serializers[name] = compile_serializer(related, expand_serializers(related, children))
+    return serializers
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+@lru_cache(maxsize=256)
+def fieldset(model, fields=None, expand=None):
+    '''The Fieldset for raw ?fields= and ?expand= values; raises ValueError for unknown names.
+
+    Without `fields` every column is included; without `expand` no
+    relationship is. Expansions are dotted relationship paths such as
+    signups.activity.
+    '''
+    known = serializable_columns(model)
+    requested = set(parse_names(fields)) or set(known)
+    unknown = sorted(requested - set(known))
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    columns = tuple(name for name in known if name in requested or name == 'id')
+
+    tree = {}
+    for path in parse_names(expand):
+        names = path.split('.')
+        if len(names) > MAX_EXPAND_DEPTH:
+            raise ValueError(f"Expansions can be at most {MAX_EXPAND_DEPTH} levels deep")
+        node, current = tree, model
+        for name in names:
+            relationship = current.__mapper__.relationships.get(name)
+            if relationship is None:
+                raise ValueError(f"Unknown expansion: {path}")
+            node = node.setdefault(name, {})
+            current = relationship.mapper.class_
+    return Fieldset(model, columns, tree)
+
+def requested_fieldset(model, args):
+    '''The Fieldset for the `fields`/`expand` query parameters in `args`, or None for the default representation.'''
+    if 'fields' not in args and 'expand' not in args:
+        return None
+    return fieldset(model, args.get('fields'), args.get('expand'))
@@ -0,0 +1,112 @@
+import base64
+import json
+
+from sqlalchemy import and_, or_
+
+from models import Camper, Activity
+
+MAX_CODE_POINT = 0x10FFFF
+SURROGATES = range(0xD800, 0xE000)
+
+def prefix_range(column, prefix):
+    '''`column` starts with `prefix` (case-sensitively), as a range an index on `column` can serve.
+
+    The upper bound is the shortest string after every string starting with
+    `prefix`: its last character that is not U+10FFFF, moved to the next code
+    point that is not a surrogate (SQLite compares UTF-8, in code point order).
+    '''
+    if not prefix:
+        return column.isnot(None)
+    stem = prefix.rstrip(chr(MAX_CODE_POINT))
+    if not stem:
+        return column >= prefix
+    code = ord(stem[-1]) + 1
+    if code in SURROGATES:
+        code = SURROGATES.stop
+    return and_(column >= prefix, column < stem[:-1] + chr(code))
+
+# Query parameter -> (parser, clause builder), per collection.
+FILTERS = {
+    Camper: {
+        'age_min': (int, lambda value: Camper.age >= value),
+        'age_max': (int, lambda value: Camper.age <= value),
+        'name_prefix': (str, lambda value: prefix_range(Camper.name, value)),
+    },
+    Activity: {
+        'difficulty': (int, lambda value: Activity.difficulty == value),
+    },
+}
+
+SORT_KEYS = {
+    Camper: ('id', 'name', 'age'),
+    Activity: ('id', 'name', 'difficulty'),
+}
+
+def filter_clauses(model, args):
+    '''WHERE clauses for the filter parameters present in `args`; raises ValueError on bad values.'''
+    clauses = []
+    for name, (parse, build) in FILTERS[model].items():
+        if name in args:
+            try:
+                value = parse(args[name])
+            except ValueError:
+                raise ValueError(f"{name} must be an integer") from None
+            clauses.append(build(value))
+    return clauses
+
+def filter_names(model):
+    return set(FILTERS[model]) | {'sort'}
+
+class Ordering:
+    '''A `sort` parameter ("age", "-name") as ORDER BY columns, keyset conditions and cursors.
+
+    Every order ends with id, so it is total. Sorting by id keeps plain
+    integer cursors; any other key uses an opaque token holding the sort
+    value and the id. SQLite puts NULLs first ascending and last descending,
+    which the keyset conditions follow.
+    '''
+
+    def __init__(self, model, sort=None):
+        sort = sort or 'id'
+        self.descending = sort.startswith('-')
+        self.key = sort.lstrip('-')
+        if self.key not in SORT_KEYS[model]:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS[model])}, optionally prefixed with -")
+        self.id = model.id
+        self.column = getattr(model, self.key)
+
+    def order_by(self):
+        columns = (self.column,) if self.key == 'id' else (self.column, self.id)
+        return [column.desc() for column in columns] if self.descending else list(columns)
+
+    def cursor(self, row):
+        if self.key == 'id':
+            return row.id
+        token = json.dumps([getattr(row, self.key), row.id]).encode()
+        return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+    def after(self, cursor):
+        '''The condition selecting rows that sort after `cursor`; raises ValueError if it is malformed.'''
+        if self.key == 'id':
+            try:
+                id = int(cursor)
+            except ValueError:
+                raise ValueError("Invalid cursor") from None
+            return self.id < id if self.descending else self.id > id
+        try:
+            token = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor") from None
+        # Tokens come from clients: only [sort value, id] as cursor() writes it may reach the query.
+        if not (isinstance(token, list) and len(token) == 2
+                and (token[0] is None or type(token[0]) in (str, int, float)) and type(token[1]) is int):
+            raise ValueError("Invalid cursor")
+        value, id = token
+        column = self.column
+        if self.descending:
+            if value is None:
+                return and_(column.is_(None), self.id < id)
+            return or_(column < value, and_(column == value, self.id < id), column.is_(None))
+        if value is None:
+            return or_(column.isnot(None), and_(column.is_(None), self.id > id))
+        return or_(column > value, and_(column == value, self.id > id))
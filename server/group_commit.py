@@ -0,0 +1,114 @@
+'''Group commit: single-row inserts from concurrent requests share one transaction.
+
+With GROUP_COMMIT on, Campers.post, Activities.post and Signups.post (a
+single signup without an Idempotency-Key) validate in the request thread and
+hand their INSERT to a GroupCommitter. One writer thread takes inserts off
+the queue and runs them in a single transaction once GROUP_COMMIT_MAX_ITEMS
+are waiting or GROUP_COMMIT_INTERVAL_MS has passed since the first, then
+commits once. Each request blocks until its own batch has committed, so it
+still answers with the real id, and only for a committed row.
+
+SQLite backs out just the statement that violates a constraint, so one bad
+row (an unknown camper_id, say) fails only its own request. The writer thread
+starts on first use, which keeps it out of the launcher's master process.
+'''
+
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from cache import stale_on_commit
+from database import retry_on_busy
+
+class Pending:
+    '''One queued insert and, once its batch is done, its outcome.'''
+
+    __slots__ = ('statement', 'row', 'tags', 'result', 'error', 'done')
+
+    def __init__(self, statement, row, tags):
+        self.statement = statement
+        self.row = row
+        self.tags = tags
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class GroupCommitter:
+    def __init__(self, app, db, interval=0.002, max_items=256, retries=4):
+        self.app = app
+        self.db = db
+        self.interval = interval
+        self.max_items = max_items
+        self.retries = retries
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, statement, row, tags):
+        '''Runs INSERT ... RETURNING `statement` with `row` in the next group commit.
+
+        Blocks until that batch has committed and returns the first returned
+        column, or None if the insert returned no row. Raises the
+        IntegrityError of this insert, or whatever failed the whole batch.
+        `tags(result)` are the cache tags the insert makes stale.
+        '''
+        self._start_writer()
+        pending = Pending(statement, row, tags)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _start_writer(self):
+        with self._lock:
+            # A forked worker inherits the attribute but not the thread.
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                retry_on_busy(session, lambda: self._write(session, batch), self.retries)
+                self.batches += 1
+                self.items += len(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.result, pending.error = None, e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def _write(self, session, batch):
+        for pending in batch:
+            pending.result = pending.error = None
+            try:
+                pending.result = session.execute(pending.statement, pending.row).scalar()
+            except IntegrityError as e:
+                pending.error = e
+            else:
+                stale_on_commit(session, pending.tags(pending.result))
+        session.commit()
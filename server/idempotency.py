@@ -0,0 +1,60 @@
+'''Idempotency-Key support for POST /signups.
+
+The first request with a key claims it by inserting its idempotency_keys row,
+which takes SQLite's write lock; the response is stored in the same
+transaction as the write it describes, so a key is never recorded without its
+effect or the other way round. A retry with the same key and body gets the
+stored response back. A concurrent duplicate waits on the lock and then does
+the same. Failed requests roll their claim back, so the key can be retried.
+'''
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from flask import Response
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert
+
+from models import IdempotencyKey
+
+MAX_KEY_LENGTH = 255
+
+def request_fingerprint(method, path, body):
+    '''A digest of the request a key was first used for.'''
+    payload = json.dumps([method, path, body], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def claim(session, key, fingerprint, ttl):
+    '''Claims `key` inside the session's transaction; returns the stored IdempotencyKey to replay, or None.
+
+    Keys older than `ttl` seconds are purged first. Raises ValueError if `key`
+    was first used for a different request.
+    '''
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < now - timedelta(seconds=ttl)))
+    claimed = session.scalar(
+        insert(IdempotencyKey)
+        .values(key=key, fingerprint=fingerprint, created_at=now)
+        .on_conflict_do_nothing()
+        .returning(IdempotencyKey.key)
+    )
+    if claimed is not None:
+        return None
+    stored = session.get(IdempotencyKey, key, populate_existing=True)
+    if stored.fingerprint != fingerprint:
+        raise ValueError("Idempotency-Key was already used for a different request")
+    return stored
+
+def record(session, key, response):
+    '''Stores `response` under the key claimed in this transaction.'''
+    session.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.key == key)
+        .values(status=response.status_code, body=response.get_data(as_text=True))
+    )
+
+def replay(stored):
+    response = Response(stored.body, stored.status, mimetype='application/json')
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+'''Pre-forking production server for the Flask app.
+
+The master binds the listening socket and imports app, db and the models
+once, then forks --workers processes that share that memory copy-on-write.
+Each worker drops the SQLAlchemy pool it inherited and serves requests
+from a pool of --threads threads.
+
+    python launcher.py --workers 4 --threads 8 --port 5555
+
+Signals to the master:
+    HUP          graceful restart: boot a new set of workers, then drain the old ones
+    TERM, INT    graceful shutdown: workers finish in-flight requests and exit
+    TTIN, TTOU   add or remove one worker
+
+Code is imported before the fork, so a HUP recycles workers but does not
+pick up code changes; restart the master for those.
+
+Each worker keeps its own response cache, but ETags and cache hits are
+checked against the tag versions every commit stamps in the database (see
+versions.py), so a write through one worker retires the other workers'
+cached bodies and validators on their next request.
+'''
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+class QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+class PooledWSGIServer(BaseWSGIServer):
+    '''Werkzeug's server with requests handed to a fixed pool of threads.'''
+
+    def __init__(self, *args, threads, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='request')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self):
+        '''Stops accepting connections and waits for in-flight requests.'''
+        self.shutdown()
+        self.pool.shutdown(wait=True)
+
+def log(message):
+    print(f'[{os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+def run_worker(app, db, sock, threads, access_log):
+    from app import response_cache
+
+    # Pooled connections were opened (if at all) by the master; close=False
+    # drops them from this process without touching the master's sockets.
+    with app.app_context():
+        db.engine.dispose(close=False)
+    response_cache.clear()
+    for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, signal.SIG_IGN)
+
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(
+        host, port, app, handler=WSGIRequestHandler if access_log else QuietHandler,
+        fd=sock.fileno(), threads=threads,
+    )
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever(), which this thread is running.
+        threading.Thread(target=server.drain).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.serve_forever()
+    server.pool.shutdown(wait=True)
+
+class Master:
+    def __init__(self, app, db, sock, workers, threads, graceful_timeout, access_log):
+        self.app = app
+        self.db = db
+        self.sock = sock
+        self.size = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.access_log = access_log
+        self.workers = set()
+        self.retiring = {}
+        self.signals = []
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                run_worker(self.app, self.db, self.sock, self.threads, self.access_log)
+            except BaseException:
+                status = 1
+                import traceback
+                traceback.print_exc()
+            finally:
+                os._exit(status)
+        self.workers.add(pid)
+        log(f'booted worker {pid}')
+
+    def retire(self, pids):
+        '''Asks `pids` to drain; they are killed if still running after the graceful timeout.'''
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.workers.discard(pid)
+            self.retiring[pid] = deadline
+            self.kill(pid, signal.SIGTERM)
+
+    def kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def enforce_timeouts(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                self.kill(pid, signal.SIGKILL)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                log(f'worker {pid} exited unexpectedly ({status}); replacing it')
+                self.workers.discard(pid)
+            self.retiring.pop(pid, None)
+
+    def handle(self, signum):
+        if signum == signal.SIGHUP:
+            log('graceful restart')
+            old = set(self.workers)
+            for _ in range(self.size):
+                self.spawn()
+            self.retire(old)
+        elif signum == signal.SIGTTIN:
+            self.size += 1
+        elif signum == signal.SIGTTOU:
+            self.size = max(1, self.size - 1)
+            if len(self.workers) > self.size:
+                self.retire([max(self.workers)])
+        else:
+            return False
+        return True
+
+    def run(self):
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU):
+            signal.signal(signum, lambda signum, frame: self.signals.append(signum))
+        log(f'listening on http://{self.sock.getsockname()[0]}:{self.sock.getsockname()[1]} '
+            f'with {self.size} workers x {self.threads} threads')
+
+        while True:
+            while self.signals:
+                if not self.handle(self.signals.pop(0)):
+                    return self.stop()
+            self.reap()
+            while len(self.workers) < self.size:
+                self.spawn()
+            self.enforce_timeouts()
+            time.sleep(0.1)
+
+    def stop(self):
+        log('shutting down')
+        self.retire(set(self.workers))
+        while self.retiring:
+            self.reap()
+            self.enforce_timeouts()
+            time.sleep(0.05)
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0)
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    sock = socket.create_server((args.host, args.port), backlog=args.backlog)
+    sock.set_inheritable(True)
+
+    # Imported once here, before the fork, so workers share it.
+    from app import create_app, db
+
+    app = create_app()
+    Master(app, db, sock, args.workers, args.threads, args.graceful_timeout, args.access_log).run()
+
+if __name__ == '__main__':
+    main()
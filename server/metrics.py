@@ -0,0 +1,145 @@
+import functools
+import threading
+import time
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds in seconds, as in the Prometheus client defaults.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    '''Cumulative bucket counts, sum and count for one label set.'''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+class RequestMetrics:
+    '''Per-route aggregates of request duration, SQL statements, serialization and encoding time.'''
+
+    def __init__(self):
+        self.latency = {}
+        self.sql_statements = {}
+        self.sql_seconds = {}
+        self.serialize_seconds = {}
+        self.encode_seconds = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def record(self, labels, duration, sql_statements, sql_seconds, serialize_seconds, encode_seconds):
+        with self._lock:
+            self.latency.setdefault(labels, Histogram()).observe(duration)
+            self.sql_statements[labels] = self.sql_statements.get(labels, 0) + sql_statements
+            self.sql_seconds[labels] = self.sql_seconds.get(labels, 0.0) + sql_seconds
+            self.serialize_seconds[labels] = self.serialize_seconds.get(labels, 0.0) + serialize_seconds
+            self.encode_seconds[labels] = self.encode_seconds.get(labels, 0.0) + encode_seconds
+
+    def add_gauge(self, name, help, read):
+        '''Exposes read() as a gauge on every scrape.'''
+        self.gauges[name] = (help, read)
+
+    def render(self):
+        '''Prometheus text exposition format (version 0.0.4).'''
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by route.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            for labels, histogram in sorted(self.latency.items()):
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'http_request_duration_seconds_bucket{{{format_labels(labels, le=bound)}}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{format_labels(labels, le="+Inf")}}} {histogram.count}')
+                lines.append(f'http_request_duration_seconds_sum{{{format_labels(labels)}}} {histogram.sum}')
+                lines.append(f'http_request_duration_seconds_count{{{format_labels(labels)}}} {histogram.count}')
+            for name, help, kind, values in (
+                ('sql_statements_total', 'SQL statements executed by route.', 'counter', self.sql_statements),
+                ('sql_duration_seconds_total', 'Time spent in SQL by route.', 'counter', self.sql_seconds),
+                ('serialize_duration_seconds_total', 'Time spent serializing rows by route.', 'counter', self.serialize_seconds),
+                ('encode_duration_seconds_total', 'Time spent encoding response bodies by route.', 'counter', self.encode_seconds),
+            ):
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                lines += [f'{name}{{{format_labels(labels)}}} {value}' for labels, value in sorted(values.items())]
+        for name, (help, read) in sorted(self.gauges.items()):
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} gauge', f'{name} {read()}']
+        return '\n'.join(lines) + '\n'
+
+def format_labels(labels, **extra):
+    method, route = labels
+    pairs = {'method': method, 'route': route, **extra}
+    return ','.join(f'{key}="{value}"' for key, value in pairs.items())
+
+def add_time(phase, seconds):
+    '''Adds `seconds` to the current request's total for `phase`, if there is a request.'''
+    if has_app_context() and 'timings' in g:
+        g.timings[phase] = g.timings.get(phase, 0.0) + seconds
+
+def timed(phase, func):
+    '''Wraps `func` so each call's duration counts towards `phase` for the current request.'''
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            add_time(phase, time.perf_counter() - start)
+
+    return wrapper
+
+def install_metrics(app):
+    '''Times every request and SQL statement, adds Server-Timing and returns the aggregates.
+
+    Statements are timed on every engine, so reads that replica.py sends to
+    the read engine count towards their request like those on the primary.
+    '''
+    metrics = RequestMetrics()
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info['statement_started'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def end_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('statement_started')
+        if has_app_context() and 'timings' in g:
+            g.sql_statements += 1
+            add_time('db', elapsed)
+
+    @app.before_request
+    def start_request():
+        g.request_started = time.perf_counter()
+        g.sql_statements = 0
+        g.timings = {}
+
+    @app.after_request
+    def finish_request(response):
+        if 'request_started' not in g:
+            return response
+        duration = time.perf_counter() - g.request_started
+        timings = g.timings
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={timings.get("db", 0.0) * 1000:.2f};desc="{g.sql_statements} queries"',
+            f'serialize;dur={timings.get("serialize", 0.0) * 1000:.2f}',
+            f'encode;dur={timings.get("encode", 0.0) * 1000:.2f}',
+            f'total;dur={duration * 1000:.2f}',
+        ])
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.record(
+            (request.method, route), duration, g.sql_statements,
+            timings.get('db', 0.0), timings.get('serialize', 0.0), timings.get('encode', 0.0),
+        )
+        return response
+
+    app.json.response = timed('encode', app.json.response)
+    return metrics
@@ -0,0 +1,68 @@
+"""add camper schedules
+
+Revision ID: b7d2e4f8a1c3
+Revises: a9e3f7c2d460
+Create Date: 2026-10-18 02:41:37.205918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e4f8a1c3'
+down_revision = 'a9e3f7c2d460'
+branch_labels = None
+depends_on = None
+
+# Copies of schedules.REBUILD and schedules.TRIGGERS as of this revision.
+REBUILD = (
+    'DELETE FROM camper_schedules',
+    "INSERT INTO camper_schedules (camper_id, schedule) SELECT id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = campers.id ORDER BY signups.time, signups.id)) FROM campers WHERE id IN (SELECT camper_id FROM signups)",
+)
+
+TRIGGERS = {
+    'signups_schedule_insert': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_insert AFTER INSERT ON signups
+BEGIN
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = NEW.camper_id ORDER BY signups.time, signups.id))) ON CONFLICT (camper_id) DO UPDATE SET schedule = excluded.schedule;
+END''',
+    'signups_schedule_delete': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_delete AFTER DELETE ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = OLD.camper_id ORDER BY signups.time, signups.id)) WHERE camper_id = OLD.camper_id;
+END''',
+    'signups_schedule_update': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = OLD.camper_id ORDER BY signups.time, signups.id)) WHERE camper_id = OLD.camper_id;
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = NEW.camper_id ORDER BY signups.time, signups.id))) ON CONFLICT (camper_id) DO UPDATE SET schedule = excluded.schedule;
+END''',
+    'activities_schedule_update': '''CREATE TRIGGER IF NOT EXISTS activities_schedule_update
+AFTER UPDATE OF name, difficulty ON activities
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = camper_schedules.camper_id ORDER BY signups.time, signups.id))
+    WHERE camper_id IN (SELECT camper_id FROM signups WHERE activity_id = NEW.id);
+END''',
+}
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('camper_schedules',
+    sa.Column('camper_id', sa.Integer(), nullable=False),
+    sa.Column('schedule', sa.Text(), server_default='[]', nullable=False),
+    sa.ForeignKeyConstraint(['camper_id'], ['campers.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('camper_id')
+    )
+    # ### end Alembic commands ###
+    for sql in REBUILD:
+        op.execute(sql)
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('camper_schedules')
+    # ### end Alembic commands ###
@@ -0,0 +1,81 @@
+"""add signup counters
+
+Revision ID: c3b9e5d2a614
+Revises: a47d2e9c1f83
+Create Date: 2026-10-17 23:05:12.481230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3b9e5d2a614'
+down_revision = 'a47d2e9c1f83'
+branch_labels = None
+depends_on = None
+
+# Copies of counters.REBUILD and counters.TRIGGERS as of this revision.
+REBUILD = (
+    'UPDATE campers SET signup_count = (SELECT count(*) FROM signups WHERE signups.camper_id = campers.id)',
+    'UPDATE activities SET signup_count = (SELECT count(*) FROM signups WHERE signups.activity_id = activities.id)',
+    'DELETE FROM activity_occupancy',
+    'INSERT INTO activity_occupancy (activity_id, time, count) SELECT activity_id, time, count(*) FROM signups WHERE activity_id IS NOT NULL AND time IS NOT NULL GROUP BY activity_id, time',
+)
+
+TRIGGERS = {
+    'signups_counters_insert': '''CREATE TRIGGER IF NOT EXISTS signups_counters_insert AFTER INSERT ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count + 1 WHERE id = NEW.camper_id;
+    UPDATE activities SET signup_count = signup_count + 1 WHERE id = NEW.activity_id;
+    INSERT INTO activity_occupancy (activity_id, time, count) SELECT NEW.activity_id, NEW.time, 1 WHERE NEW.activity_id IS NOT NULL AND NEW.time IS NOT NULL ON CONFLICT (activity_id, time) DO UPDATE SET count = count + 1;
+END''',
+    'signups_counters_delete': '''CREATE TRIGGER IF NOT EXISTS signups_counters_delete AFTER DELETE ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count - 1 WHERE id = OLD.camper_id;
+    UPDATE activities SET signup_count = signup_count - 1 WHERE id = OLD.activity_id;
+    UPDATE activity_occupancy SET count = count - 1 WHERE activity_id = OLD.activity_id AND time = OLD.time;
+    DELETE FROM activity_occupancy WHERE activity_id = OLD.activity_id AND time = OLD.time AND count <= 0;
+END''',
+    'signups_counters_update': '''CREATE TRIGGER IF NOT EXISTS signups_counters_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count - 1 WHERE id = OLD.camper_id;
+    UPDATE activities SET signup_count = signup_count - 1 WHERE id = OLD.activity_id;
+    UPDATE activity_occupancy SET count = count - 1 WHERE activity_id = OLD.activity_id AND time = OLD.time;
+    DELETE FROM activity_occupancy WHERE activity_id = OLD.activity_id AND time = OLD.time AND count <= 0;
+    UPDATE campers SET signup_count = signup_count + 1 WHERE id = NEW.camper_id;
+    UPDATE activities SET signup_count = signup_count + 1 WHERE id = NEW.activity_id;
+    INSERT INTO activity_occupancy (activity_id, time, count) SELECT NEW.activity_id, NEW.time, 1 WHERE NEW.activity_id IS NOT NULL AND NEW.time IS NOT NULL ON CONFLICT (activity_id, time) DO UPDATE SET count = count + 1;
+END''',
+}
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('activity_occupancy',
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('time', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['activity_id'], ['activities.id'], ),
+    sa.PrimaryKeyConstraint('activity_id', 'time')
+    )
+    op.add_column('activities', sa.Column('signup_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('campers', sa.Column('signup_count', sa.Integer(), server_default='0', nullable=False))
+    # ### end Alembic commands ###
+    for sql in REBUILD:
+        op.execute(sql)
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('campers') as batch_op:
+        batch_op.drop_column('signup_count')
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.drop_column('signup_count')
+    op.drop_table('activity_occupancy')
+    # ### end Alembic commands ###
@@ -0,0 +1,94 @@
+"""mark camper schedules stale on write
+
+Revision ID: c8f1a5e3d972
+Revises: b7d2e4f8a1c3
+Create Date: 2026-10-19 09:12:44.503817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f1a5e3d972'
+down_revision = 'b7d2e4f8a1c3'
+branch_labels = None
+depends_on = None
+
+# Copy of schedules.TRIGGERS as of this revision.
+TRIGGERS = {
+    'signups_schedule_insert': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_insert AFTER INSERT ON signups
+BEGIN
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, NULL) ON CONFLICT (camper_id) DO UPDATE SET schedule = NULL;
+END''',
+    'signups_schedule_delete': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_delete AFTER DELETE ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = NULL WHERE camper_id = OLD.camper_id;
+END''',
+    'signups_schedule_update': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = NULL WHERE camper_id = OLD.camper_id;
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, NULL) ON CONFLICT (camper_id) DO UPDATE SET schedule = NULL;
+END''',
+    'activities_schedule_update': '''CREATE TRIGGER IF NOT EXISTS activities_schedule_update
+AFTER UPDATE OF name, difficulty ON activities
+BEGIN
+    UPDATE camper_schedules SET schedule = NULL
+    WHERE camper_id IN (SELECT camper_id FROM signups WHERE activity_id = NEW.id);
+END''',
+}
+
+# Copies of b7d2e4f8a1c3's REBUILD and TRIGGERS, for the downgrade.
+PREVIOUS_REBUILD = (
+    'DELETE FROM camper_schedules',
+    "INSERT INTO camper_schedules (camper_id, schedule) SELECT id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = campers.id ORDER BY signups.time, signups.id)) FROM campers WHERE id IN (SELECT camper_id FROM signups)",
+)
+
+PREVIOUS_TRIGGERS = {
+    'signups_schedule_insert': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_insert AFTER INSERT ON signups
+BEGIN
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = NEW.camper_id ORDER BY signups.time, signups.id))) ON CONFLICT (camper_id) DO UPDATE SET schedule = excluded.schedule;
+END''',
+    'signups_schedule_delete': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_delete AFTER DELETE ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = OLD.camper_id ORDER BY signups.time, signups.id)) WHERE camper_id = OLD.camper_id;
+END''',
+    'signups_schedule_update': '''CREATE TRIGGER IF NOT EXISTS signups_schedule_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = OLD.camper_id ORDER BY signups.time, signups.id)) WHERE camper_id = OLD.camper_id;
+    INSERT INTO camper_schedules (camper_id, schedule) VALUES (NEW.camper_id, (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = NEW.camper_id ORDER BY signups.time, signups.id))) ON CONFLICT (camper_id) DO UPDATE SET schedule = excluded.schedule;
+END''',
+    'activities_schedule_update': '''CREATE TRIGGER IF NOT EXISTS activities_schedule_update
+AFTER UPDATE OF name, difficulty ON activities
+BEGIN
+    UPDATE camper_schedules SET schedule = (SELECT json_group_array(json(entry)) FROM (SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry FROM signups JOIN activities ON activities.id = signups.activity_id WHERE signups.camper_id = camper_schedules.camper_id ORDER BY signups.time, signups.id))
+    WHERE camper_id IN (SELECT camper_id FROM signups WHERE activity_id = NEW.id);
+END''',
+}
+
+
+
+def drop_triggers():
+    # The triggers name camper_schedules, which the batch rename would trip over.
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+
+def upgrade():
+    drop_triggers()
+    with op.batch_alter_table('camper_schedules') as batch_op:
+        batch_op.alter_column('schedule', existing_type=sa.Text(), nullable=True, server_default=None)
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def downgrade():
+    drop_triggers()
+    for sql in PREVIOUS_REBUILD:
+        op.execute(sql)
+    with op.batch_alter_table('camper_schedules') as batch_op:
+        batch_op.alter_column('schedule', existing_type=sa.Text(), nullable=False, server_default='[]')
+    for sql in PREVIOUS_TRIGGERS.values():
+        op.execute(sql)
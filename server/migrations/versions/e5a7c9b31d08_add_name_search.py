@@ -0,0 +1,69 @@
+"""add name search
+
+Revision ID: e5a7c9b31d08
+Revises: d81f4a6c2e57
+Create Date: 2026-10-18 00:21:44.107362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9b31d08'
+down_revision = 'd81f4a6c2e57'
+branch_labels = None
+depends_on = None
+
+# Copies of search.CREATE_TABLE, search.TRIGGERS and search.REBUILD as of this revision.
+CREATE_TABLE = "CREATE VIRTUAL TABLE IF NOT EXISTS name_search USING fts5(name, kind UNINDEXED, prefix='2 3')"
+
+TRIGGERS = {
+    'campers_search_insert': '''CREATE TRIGGER IF NOT EXISTS campers_search_insert AFTER INSERT ON campers
+BEGIN
+    INSERT INTO name_search (rowid, name, kind) VALUES (NEW.id * 2, NEW.name, 'camper');
+END''',
+    'campers_search_update': '''CREATE TRIGGER IF NOT EXISTS campers_search_update AFTER UPDATE OF id, name ON campers
+BEGIN
+    DELETE FROM name_search WHERE rowid = OLD.id * 2;
+    INSERT INTO name_search (rowid, name, kind) VALUES (NEW.id * 2, NEW.name, 'camper');
+END''',
+    'campers_search_delete': '''CREATE TRIGGER IF NOT EXISTS campers_search_delete AFTER DELETE ON campers
+BEGIN
+    DELETE FROM name_search WHERE rowid = OLD.id * 2;
+END''',
+    'activities_search_insert': '''CREATE TRIGGER IF NOT EXISTS activities_search_insert AFTER INSERT ON activities
+BEGIN
+    INSERT INTO name_search (rowid, name, kind) VALUES (NEW.id * 2 + 1, NEW.name, 'activity');
+END''',
+    'activities_search_update': '''CREATE TRIGGER IF NOT EXISTS activities_search_update AFTER UPDATE OF id, name ON activities
+BEGIN
+    DELETE FROM name_search WHERE rowid = OLD.id * 2 + 1;
+    INSERT INTO name_search (rowid, name, kind) VALUES (NEW.id * 2 + 1, NEW.name, 'activity');
+END''',
+    'activities_search_delete': '''CREATE TRIGGER IF NOT EXISTS activities_search_delete AFTER DELETE ON activities
+BEGIN
+    DELETE FROM name_search WHERE rowid = OLD.id * 2 + 1;
+END''',
+}
+
+REBUILD = (
+    'DELETE FROM name_search',
+    "INSERT INTO name_search (rowid, name, kind) SELECT campers.id * 2, name, 'camper' FROM campers",
+    "INSERT INTO name_search (rowid, name, kind) SELECT activities.id * 2 + 1, name, 'activity' FROM activities",
+    "INSERT INTO name_search (name_search) VALUES ('optimize')",
+)
+
+
+def upgrade():
+    op.execute(CREATE_TABLE)
+    for sql in REBUILD:
+        op.execute(sql)
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def downgrade():
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.execute('DROP TABLE IF EXISTS name_search')
@@ -0,0 +1,78 @@
+"""cascade signup deletes
+
+Revision ID: f2c6d8a4b915
+Revises: e5a7c9b31d08
+Create Date: 2026-10-17 23:58:40.117305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d8a4b915'
+down_revision = 'e5a7c9b31d08'
+branch_labels = None
+depends_on = None
+
+# The foreign keys were created unnamed; batch mode names them by this convention.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# (table, column, referred table) for every foreign key that gains ON DELETE CASCADE.
+FOREIGN_KEYS = (
+    ('signups', 'camper_id', 'campers'),
+    ('signups', 'activity_id', 'activities'),
+    ('activity_occupancy', 'activity_id', 'activities'),
+)
+
+# Copy of counters.TRIGGERS as of this revision. Recreating signups drops
+# its triggers, so they are put back afterwards.
+TRIGGERS = {
+    'signups_counters_insert': '''CREATE TRIGGER IF NOT EXISTS signups_counters_insert AFTER INSERT ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count + 1 WHERE id = NEW.camper_id;
+    UPDATE activities SET signup_count = signup_count + 1 WHERE id = NEW.activity_id;
+    INSERT INTO activity_occupancy (activity_id, time, count) SELECT NEW.activity_id, NEW.time, 1 WHERE NEW.activity_id IS NOT NULL AND NEW.time IS NOT NULL ON CONFLICT (activity_id, time) DO UPDATE SET count = count + 1;
+END''',
+    'signups_counters_delete': '''CREATE TRIGGER IF NOT EXISTS signups_counters_delete AFTER DELETE ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count - 1 WHERE id = OLD.camper_id;
+    UPDATE activities SET signup_count = signup_count - 1 WHERE id = OLD.activity_id;
+    UPDATE activity_occupancy SET count = count - 1 WHERE activity_id = OLD.activity_id AND time = OLD.time;
+    DELETE FROM activity_occupancy WHERE activity_id = OLD.activity_id AND time = OLD.time AND count <= 0;
+END''',
+    'signups_counters_update': '''CREATE TRIGGER IF NOT EXISTS signups_counters_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    UPDATE campers SET signup_count = signup_count - 1 WHERE id = OLD.camper_id;
+    UPDATE activities SET signup_count = signup_count - 1 WHERE id = OLD.activity_id;
+    UPDATE activity_occupancy SET count = count - 1 WHERE activity_id = OLD.activity_id AND time = OLD.time;
+    DELETE FROM activity_occupancy WHERE activity_id = OLD.activity_id AND time = OLD.time AND count <= 0;
+    UPDATE campers SET signup_count = signup_count + 1 WHERE id = NEW.camper_id;
+    UPDATE activities SET signup_count = signup_count + 1 WHERE id = NEW.activity_id;
+    INSERT INTO activity_occupancy (activity_id, time, count) SELECT NEW.activity_id, NEW.time, 1 WHERE NEW.activity_id IS NOT NULL AND NEW.time IS NOT NULL ON CONFLICT (activity_id, time) DO UPDATE SET count = count + 1;
+END''',
+}
+
+
+def replace_foreign_keys(ondelete):
+    for table in ('signups', 'activity_occupancy'):
+        with op.batch_alter_table(table, recreate='always', naming_convention=NAMING_CONVENTION) as batch_op:
+            for fk_table, column, referred in FOREIGN_KEYS:
+                if fk_table != table:
+                    continue
+                name = NAMING_CONVENTION['fk'] % {
+                    'table_name': table, 'column_0_name': column, 'referred_table_name': referred,
+                }
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+    for sql in TRIGGERS.values():
+        op.execute(sql)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    replace_foreign_keys(None)
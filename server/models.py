@@ -1,18 +1,24 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy_serializer import SerializerMixin
 
-db = SQLAlchemy()
+from replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Camper(db.Model, SerializerMixin):
     __tablename__ = 'campers'
 
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    age = db.Column(db.Integer)
+    name = db.Column(db.String, nullable=False, index=True)
+    age = db.Column(db.Integer, index=True)
+    # Maintained by the triggers in counters.py.
+    signup_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-    signups = db.relationship('Signup', backref='camper', cascade='all, delete-orphan')
+    # passive_deletes leaves removing the signups to ON DELETE CASCADE in one statement.
+    signups = db.relationship('Signup', back_populates='camper', cascade='all, delete-orphan', passive_deletes=True)
 
-    serialize_rules = ('-signups.camper',)
+    serialize_rules = ('-signups.camper', '-signup_count')
 
     def __init__(self, name, age):
         if not name:
@@ -22,6 +28,17 @@ class Camper(db.Model, SerializerMixin):
         self.name = name
         self.age = age
 
+    def apply_changes(self, data):
+        '''Applies the fields of a PATCH body, then validates the result like __init__.'''
+        if 'name' in data:
+            self.name = data['name']
+        if 'age' in data:
+            self.age = data['age']
+        if not self.name:
+            raise ValueError("Name cannot be empty")
+        if not (8 <= self.age <= 18):
+            raise ValueError("Age must be between 8 and 18")
+
     def __repr__(self):
         return f'<Camper {self.name}, age {self.age}.>'
 
@@ -30,11 +47,13 @@ class Activity(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
-    difficulty = db.Column(db.Integer)
+    difficulty = db.Column(db.Integer, index=True)
+    # Maintained by the triggers in counters.py.
+    signup_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
-    signups = db.relationship('Signup', backref='activity', cascade='all, delete-orphan')
+    signups = db.relationship('Signup', back_populates='activity', cascade='all, delete-orphan', passive_deletes=True)
 
-    serialize_rules = ('-signups.activity',)
+    serialize_rules = ('-signups.activity', '-signup_count')
 
     def __repr__(self):
         return f'<Activity {self.name}, difficulty {self.difficulty}.>'
@@ -44,12 +63,25 @@ class Signup(db.Model, SerializerMixin):
 
     id = db.Column(db.Integer, primary_key=True)
     time = db.Column(db.Integer)
-    camper_id = db.Column(db.Integer, db.ForeignKey('campers.id'))
-    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'))
+    camper_id = db.Column(db.Integer, db.ForeignKey('campers.id', ondelete='CASCADE'))
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id', ondelete='CASCADE'), index=True)
+
+    # A camper signs up for an activity at a given time once; writes resolve
+    # duplicates with ON CONFLICT against this index. It also serves camper_id
+    # lookups through its leftmost column.
+    __table_args__ = (
+        db.Index('uq_signups_camper_id_activity_id_time', 'camper_id', 'activity_id', 'time', unique=True),
+    )
+
+    camper = db.relationship('Camper', back_populates='signups')
+    activity = db.relationship('Activity', back_populates='signups')
 
     serialize_rules = ('-camper.signups', '-activity.signups')
 
     def __init__(self, time, camper_id, activity_id):
+        for name, value in (('time', time), ('camper_id', camper_id), ('activity_id', activity_id)):
+            if type(value) is not int:
+                raise ValueError(f"{name} must be an integer")
         if not (0 <= time <= 23):
             raise ValueError("Time must be between 0 and 23")
         self.time = time
@@ -58,4 +90,66 @@ class Signup(db.Model, SerializerMixin):
 
     def __repr__(self):
         return f'<Signup time {self.time}, camper {self.camper_id}, activity {self.activity_id}.>'
-        return rating
+
+class ActivityOccupancy(db.Model):
+    '''Signups per activity and hour; only non-zero slots have a row. Maintained by counters.py.'''
+    __tablename__ = 'activity_occupancy'
+
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id', ondelete='CASCADE'), primary_key=True)
+    time = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<ActivityOccupancy activity {self.activity_id}, time {self.time}: {self.count}.>'
+
+class CamperSchedule(db.Model):
+    '''A camper's signups in time order as a ready-to-serve JSON array, NULL while stale. Maintained by schedules.py.'''
+    __tablename__ = 'camper_schedules'
+
+    camper_id = db.Column(db.Integer, db.ForeignKey('campers.id', ondelete='CASCADE'), primary_key=True)
+    schedule = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<CamperSchedule camper {self.camper_id}.>'
+
+class IdempotencyKey(db.Model):
+    '''The stored response of a POST /signups sent with an Idempotency-Key header; see idempotency.py.'''
+    __tablename__ = 'idempotency_keys'
+
+    key = db.Column(db.String, primary_key=True)
+    fingerprint = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
+    status = db.Column(db.Integer)
+    body = db.Column(db.Text)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.key}: {self.status}.>'
+
+class TagVersion(db.Model):
+    '''The clock value of the last commit that touched a cache tag, behind ETags; see versions.py.'''
+    __tablename__ = 'tag_versions'
+
+    tag = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    modified = db.Column(db.Float, nullable=False)
+
+    def __repr__(self):
+        return f'<TagVersion {self.tag}: {self.version}.>'
+
+# Loader options matching what each endpoint serializes, so to_dict() never
+# falls back to one lazy SELECT per signup.
+CAMPER_LIST_LOADERS = (
+    selectinload(Camper.signups).joinedload(Signup.activity),
+)
+CAMPER_DETAIL_LOADERS = (
+    selectinload(Camper.signups).joinedload(Signup.activity)
+        .selectinload(Activity.signups).joinedload(Signup.camper),
+)
+ACTIVITY_LIST_LOADERS = (
+    selectinload(Activity.signups).joinedload(Signup.camper),
+)
+ACTIVITY_DETAIL_LOADERS = ACTIVITY_LIST_LOADERS
+SIGNUP_DETAIL_LOADERS = (
+    joinedload(Signup.camper).selectinload(Camper.signups).joinedload(Signup.activity),
+    joinedload(Signup.activity).selectinload(Activity.signups).joinedload(Signup.camper),
+)
@@ -0,0 +1,110 @@
+import gzip
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from cache import LRUBackend
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional speedup
+    brotli = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    '''JSON provider backed by orjson, with the same key order and pretty/compact rules as Flask's.'''
+
+    def dumps(self, obj, **kwargs):
+        '''Compact JSON for `obj`. `sort_keys`, `default` and an `indent` of 2 map to orjson options.
+
+        orjson has nothing like the other json.dumps arguments, or other
+        indents, so those raise TypeError rather than being ignored.
+        '''
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        default = kwargs.pop('default', self.default)
+        indent = kwargs.pop('indent', None)
+        if kwargs:
+            raise TypeError(f"OrjsonProvider.dumps() does not support {', '.join(sorted(kwargs))}")
+        if indent not in (None, 2):
+            raise TypeError("OrjsonProvider.dumps() only supports indent=2")
+        return self._encode(obj, indent == 2, sort_keys, default).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            self._encode(obj, pretty, self.sort_keys, self.default) + b'\n', mimetype=self.mimetype,
+        )
+
+    def _encode(self, obj, pretty, sort_keys, default):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+
+def json_provider_class():
+    '''The fastest available JSON provider: orjson when installed, the stdlib otherwise.'''
+    return OrjsonProvider if orjson is not None else DefaultJSONProvider
+
+def content_codings():
+    '''Supported Content-Encodings in order of preference.'''
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_coding():
+    '''The best content coding the client accepts, or None for identity.'''
+    accepted = request.accept_encodings
+    for coding in content_codings():
+        if accepted[coding]:
+            return coding
+    return None
+
+def compress(data, coding, level):
+    if coding == 'br':
+        return brotli.compress(data, quality=level)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+def install_compression(app):
+    '''Compresses JSON responses at least COMPRESS_MIN_SIZE bytes long with the negotiated coding.
+
+    A body with a strong ETag is compressed once per coding: the same URL
+    under the same ETag is the same body, so a response served from the
+    cache reuses the variant its first request compressed.
+    '''
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVELS', {'gzip': 6, 'br': 5})
+    app.config.setdefault('COMPRESS_CACHE_MAX_ENTRIES', 1024)
+    variants = LRUBackend(max_entries=app.config['COMPRESS_CACHE_MAX_ENTRIES'])
+
+    @app.after_request
+    def compress_response(response):
+        if response.status_code == 304:
+            # A 304 carries the Vary its 200 would have, so caches key it the same way.
+            response.vary.add('Accept-Encoding')
+            return response
+        if response.status_code != 200 or response.is_streamed \
+                or response.mimetype != 'application/json' \
+                or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        coding = negotiate_coding()
+        if coding is None or response.content_length < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        etag, weak = response.get_etag()
+        key = (request.full_path, etag, coding) if etag and not weak else None
+        data = variants.get(key) if key else None
+        if data is None:
+            data = compress(response.get_data(), coding, app.config['COMPRESS_LEVELS'][coding])
+            if key:
+                variants.set(key, data, float('inf'))
+        response.set_data(data)
+        response.headers['Content-Encoding'] = coding
+        if etag:
+            # Strong validators must differ per encoding of the same representation.
+            response.set_etag(f'{etag}-{coding}', weak)
+        return response
@@ -0,0 +1,151 @@
+'''Routes the reads of GET requests to a read-only engine.
+
+DB_READ_MODE picks where GET and HEAD handlers read from:
+
+    primary    the primary engine, like every other request (the default)
+    readonly   a second engine on the same SQLite file, opened with mode=ro
+               and PRAGMA query_only, with its own connection pool
+    snapshot   the same, but over a copy of the database refreshed with
+               SQLite's backup API about every DB_SNAPSHOT_INTERVAL seconds;
+               reads may be up to twice that stale
+
+GET handlers read tag versions (versions.py) through the same engine as the
+bodies they describe, so in snapshot mode ETags and cached responses follow
+the snapshot: a write keeps the old body and ETag until the refresh that
+brings it in, and then retires both.
+
+Every worker process shares one snapshot file. Each runs a refresher thread,
+but only the one holding the file lock copies the primary, and only when the
+snapshot is an interval old, so the database is copied about once per
+interval however many workers run. The copy is written to a temporary file
+and renamed over the snapshot, so a reader never sees a partial copy; every
+process reopens its read connections once it sees the new file.
+
+Flushes and INSERT/UPDATE/DELETE statements always go to the primary engine,
+whatever the request method, and query_only makes the read engine refuse any
+write that reaches it anyway. POST, PATCH and DELETE handlers, the CLI and
+anything outside a request use the primary engine throughout.
+'''
+
+import contextlib
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from sqlalchemy.sql.dml import UpdateBase
+
+from database import install_sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = ('GET', 'HEAD')
+
+class ReadReplica:
+    '''A read-only engine on the primary's SQLite file, or on a periodically refreshed snapshot of it.'''
+
+    def __init__(self, primary, snapshot, pragmas, engine_options, interval):
+        path = primary.url.database
+        if primary.dialect.name != 'sqlite' or not path or path == ':memory:':
+            raise ValueError("DB_READ_MODE needs a file-backed SQLite database")
+        self.pid = os.getpid()
+        self.primary = primary
+        self.path = f'{path}.snapshot' if snapshot else path
+        self.interval = interval
+        self._inode = None
+        if snapshot:
+            with self._snapshot_lock():
+                self._copy()
+            self._inode = os.stat(self.path).st_ino
+            threading.Thread(target=self._refresh_forever, name='read-snapshot', daemon=True).start()
+        self.engine = create_engine(f'sqlite:///file:{self.path}?mode=ro&uri=true', **engine_options)
+        # journal_mode is a property of the file, which only the primary may change.
+        read_pragmas = {name: value for name, value in pragmas.items() if name != 'journal_mode'}
+        install_sqlite_pragmas(self.engine, {**read_pragmas, 'query_only': 'ON'})
+
+    def refresh(self):
+        '''Replaces the snapshot with a fresh copy of the primary now, and reads from it.'''
+        with self._snapshot_lock():
+            self._copy()
+        self._follow()
+
+    @contextlib.contextmanager
+    def _snapshot_lock(self, blocking=True):
+        '''Holds the lock that makes one process at a time rewrite the snapshot; raises BlockingIOError if not `blocking`.'''
+        with open(f'{self.path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _copy(self):
+        '''Backs the primary up into a temporary file in one step, then renames it over the snapshot.'''
+        staging = f'{self.path}.{os.getpid()}.tmp'
+        source = self.primary.raw_connection()
+        target = sqlite3.connect(staging, timeout=30)
+        try:
+            source.driver_connection.backup(target)
+            # A WAL-mode copy would share -wal and -shm files with the snapshot it replaces.
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+        os.replace(staging, self.path)
+
+    def _follow(self):
+        '''Reopens the read connections once another copy has replaced the snapshot file.'''
+        inode = os.stat(self.path).st_ino
+        if inode != self._inode:
+            self._inode = inode
+            # Connections already checked out finish on the old file; the rest open the new one.
+            self.engine.dispose()
+
+    def _refresh_forever(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with contextlib.suppress(BlockingIOError), self._snapshot_lock(blocking=False):
+                    # Another worker may have refreshed it since this one last looked.
+                    if time.time() - os.stat(self.path).st_mtime >= self.interval:
+                        self._copy()
+                self._follow()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning('Snapshot refresh failed: %s', e)
+
+_replica_lock = threading.Lock()
+
+def read_engine(app):
+    '''The app's read engine, created on first use in each process.'''
+    # A forked worker builds its own rather than sharing the master's pool.
+    replica = app.extensions.get('read_replica')
+    if replica is None or replica.pid != os.getpid():
+        with _replica_lock:
+            replica = app.extensions.get('read_replica')
+            if replica is None or replica.pid != os.getpid():
+                replica = app.extensions['read_replica'] = ReadReplica(
+                    app.extensions['sqlalchemy'].engine,
+                    snapshot=app.config['DB_READ_MODE'] == 'snapshot',
+                    pragmas=app.config['SQLITE_PRAGMAS'],
+                    engine_options=app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+                    interval=app.config['DB_SNAPSHOT_INTERVAL'],
+                )
+    return replica.engine
+
+def reading_request():
+    '''Whether this is a GET or HEAD request and the app routes those to the read engine.'''
+    return (has_request_context() and request.method in READ_METHODS
+            and current_app.config['DB_READ_MODE'] != 'primary')
+
+class RoutingSession(Session):
+    '''db.session, with the reads of GET and HEAD requests sent to read_engine().'''
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and reading_request():
+            return read_engine(current_app)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+'''Materialized camper schedules for GET /campers/<id>/schedule.
+
+camper_schedules holds each camper's signups in time order as the JSON array
+the endpoint serves as is. SQLite triggers on signups and activities only
+mark the rows of the campers a write touches as stale (schedule NULL), in the
+same transaction, whether it comes from an ORM flush, a bulk insert, an ON
+DELETE CASCADE or raw SQL; that costs the same however many signups the
+camper has. The first read of a stale row recomputes and stores it with
+refresh(). A camper's row appears with its first signup and goes when the
+camper is deleted; a camper without a row has an empty schedule.
+check_schedules() lists drift against a full rebuild, skipping stale rows,
+and rebuild_schedules() recomputes every row.
+
+There is deliberately no trigger on camper inserts. Next to the search
+index's, a second AFTER INSERT trigger on campers makes SQLite 3.40 fail the
+first insert from a pooled connection that last read the schema before a
+DROP TABLE ("no such table: campers"), which the group commit writer runs
+into whenever the tables are recreated.
+
+    python schedules.py            # report drift, exit status 1 if any
+    python schedules.py --rebuild  # recompute every schedule
+'''
+
+import argparse
+import sys
+
+from sqlalchemy import literal_column, text, update
+
+from cache import camper_tag
+from database import SQLiteTriggers
+from models import db, CamperSchedule
+
+def schedule_of(camper_id):
+    '''SQL for the JSON schedule of the camper whose id is the expression `camper_id`.'''
+    # json() keeps each entry an object rather than a string inside the array.
+    return (
+        "(SELECT json_group_array(json(entry)) FROM ("
+        "SELECT json_object('signup_id', signups.id, 'time', signups.time, 'activity', "
+        "json_object('id', activities.id, 'name', activities.name, 'difficulty', activities.difficulty)) AS entry "
+        "FROM signups JOIN activities ON activities.id = signups.activity_id "
+        f"WHERE signups.camper_id = {camper_id} ORDER BY signups.time, signups.id))"
+    )
+
+def _mark_stale(camper_id):
+    return f'UPDATE camper_schedules SET schedule = NULL WHERE camper_id = {camper_id};'
+
+def _add_stale(camper_id):
+    return (f'INSERT INTO camper_schedules (camper_id, schedule) VALUES ({camper_id}, NULL) '
+            'ON CONFLICT (camper_id) DO UPDATE SET schedule = NULL;')
+
+# Deletes only update, so the cascade from a camper delete never re-inserts its row.
+TRIGGERS = {
+    'signups_schedule_insert': f'''CREATE TRIGGER IF NOT EXISTS signups_schedule_insert AFTER INSERT ON signups
+BEGIN
+    {_add_stale('NEW.camper_id')}
+END''',
+    'signups_schedule_delete': f'''CREATE TRIGGER IF NOT EXISTS signups_schedule_delete AFTER DELETE ON signups
+BEGIN
+    {_mark_stale('OLD.camper_id')}
+END''',
+    'signups_schedule_update': f'''CREATE TRIGGER IF NOT EXISTS signups_schedule_update
+AFTER UPDATE OF time, camper_id, activity_id ON signups
+BEGIN
+    {_mark_stale('OLD.camper_id')}
+    {_add_stale('NEW.camper_id')}
+END''',
+    'activities_schedule_update': '''CREATE TRIGGER IF NOT EXISTS activities_schedule_update
+AFTER UPDATE OF name, difficulty ON activities
+BEGIN
+    UPDATE camper_schedules SET schedule = NULL
+    WHERE camper_id IN (SELECT camper_id FROM signups WHERE activity_id = NEW.id);
+END''',
+}
+
+REBUILD = (
+    'DELETE FROM camper_schedules',
+    f'INSERT INTO camper_schedules (camper_id, schedule) SELECT id, {schedule_of("campers.id")} FROM campers '
+    'WHERE id IN (SELECT camper_id FROM signups)',
+)
+
+# A missing row stands for [], a NULL schedule for whatever the signups say.
+CHECK = f'''
+    SELECT campers.id, camper_schedules.schedule, {schedule_of("campers.id")} AS actual FROM campers
+    LEFT JOIN camper_schedules ON camper_schedules.camper_id = campers.id
+    WHERE CASE WHEN camper_schedules.camper_id IS NULL THEN '[]'
+               ELSE coalesce(camper_schedules.schedule, actual) END IS NOT actual'''
+
+def refresh(camper_id):
+    '''An UPDATE that recomputes and returns camper `camper_id`'s schedule if it is stale.
+
+    It returns no row when the schedule is already fresh or the camper has no
+    row; being an UPDATE, it runs on the primary whatever the read mode.
+    '''
+    return (
+        update(CamperSchedule)
+        .where(CamperSchedule.camper_id == camper_id, CamperSchedule.schedule.is_(None))
+        .values(schedule=literal_column(schedule_of('camper_schedules.camper_id')))
+        .returning(CamperSchedule.schedule)
+    )
+
+def live_schedule(camper_id):
+    '''A SELECT of camper `camper_id`'s schedule computed from signups, without storing it.'''
+    return text(f'SELECT {schedule_of(":camper_id")}').bindparams(camper_id=camper_id)
+
+triggers = SQLiteTriggers(db.metadata, TRIGGERS, backfill=REBUILD)
+
+def check_schedules(conn):
+    '''Returns (camper_id, stored, actual) for every schedule that disagrees with signups.'''
+    return [tuple(row) for row in conn.execute(text(CHECK))]
+
+def rebuild_schedules(conn, versions):
+    '''Recomputes every schedule and moves the ETags of those that changed, in the same transaction.'''
+    drift = check_schedules(conn)
+    triggers.rebuild(conn)
+    if drift:
+        versions.stamp(conn, {camper_tag(camper_id) for camper_id, _, _ in drift})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rebuild', action='store_true', help='recompute every schedule from signups')
+    args = parser.parse_args()
+
+    from app import app, versions
+
+    with app.app_context(), db.engine.begin() as conn:
+        if args.rebuild:
+            rebuild_schedules(conn, versions)
+            print('Rebuilt camper schedules')
+            return
+        drift = check_schedules(conn)
+    for camper_id, stored, actual in drift:
+        print(f'camper {camper_id}: stored {stored}, actual {actual}')
+    if drift:
+        sys.exit(1)
+    print('Camper schedules are consistent')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+'''Full-text search over camper and activity names with SQLite FTS5.
+
+name_search holds one row per camper (rowid id * 2) and activity (rowid
+id * 2 + 1). Triggers on campers and activities keep it in step with every
+insert, rename and delete, including cascades and raw SQL.
+
+    python search.py --rebuild   # repopulate the index from campers and activities
+'''
+
+import argparse
+import re
+
+from sqlalchemy import DDL, event, text
+
+from database import SQLiteTriggers
+from models import db
+
+CREATE_TABLE = ("CREATE VIRTUAL TABLE IF NOT EXISTS name_search "
+                "USING fts5(name, kind UNINDEXED, prefix='2 3')")
+
+# (table, kind, rowid expression in terms of the row's id)
+SOURCES = (
+    ('campers', 'camper', '{row}.id * 2'),
+    ('activities', 'activity', '{row}.id * 2 + 1'),
+)
+
+def _triggers():
+    triggers = {}
+    for table, kind, rowid in SOURCES:
+        insert = (f"INSERT INTO name_search (rowid, name, kind) "
+                  f"VALUES ({rowid.format(row='NEW')}, NEW.name, '{kind}');")
+        delete = f"DELETE FROM name_search WHERE rowid = {rowid.format(row='OLD')};"
+        triggers[f'{table}_search_insert'] = (
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_insert AFTER INSERT ON {table}\n'
+            f'BEGIN\n    {insert}\nEND')
+        triggers[f'{table}_search_update'] = (
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_update AFTER UPDATE OF id, name ON {table}\n'
+            f'BEGIN\n    {delete}\n    {insert}\nEND')
+        triggers[f'{table}_search_delete'] = (
+            f'CREATE TRIGGER IF NOT EXISTS {table}_search_delete AFTER DELETE ON {table}\n'
+            f'BEGIN\n    {delete}\nEND')
+    return triggers
+
+TRIGGERS = _triggers()
+
+REBUILD = (
+    'DELETE FROM name_search',
+    *(f"INSERT INTO name_search (rowid, name, kind) SELECT {rowid.format(row=table)}, name, '{kind}' FROM {table}"
+      for table, kind, rowid in SOURCES),
+    "INSERT INTO name_search (name_search) VALUES ('optimize')",
+)
+
+KINDS = tuple(kind for _, kind, _ in SOURCES)
+
+def match_expression(q):
+    '''An FTS5 query matching every word of `q` as a prefix, or None if `q` has no words.'''
+    words = re.findall(r'\w+', q or '')
+    return ' '.join(f'"{word}"*' for word in words) or None
+
+def search(conn, q, kind=None, limit=20, offset=0):
+    '''Up to `limit` + 1 matches for `q`, best first: (kind, id, name) tuples.'''
+    expression = match_expression(q)
+    if expression is None:
+        raise ValueError("q must contain at least one word")
+    sql = 'SELECT rowid, name, kind FROM name_search WHERE name_search MATCH :q'
+    if kind is not None:
+        sql += ' AND kind = :kind'
+    rows = conn.execute(
+        text(sql + ' ORDER BY rank, rowid LIMIT :limit OFFSET :offset'),
+        {'q': expression, 'kind': kind, 'limit': limit + 1, 'offset': offset},
+    )
+    return [(row_kind, rowid // 2, name) for rowid, name, row_kind in rows]
+
+def create_search_index(conn):
+    conn.exec_driver_sql(CREATE_TABLE)
+    triggers.create(conn)
+
+# The virtual table is not part of the ORM metadata; create and drop it alongside.
+event.listen(db.metadata, 'after_create', DDL(CREATE_TABLE).execute_if(dialect='sqlite'))
+triggers = SQLiteTriggers(db.metadata, TRIGGERS, backfill=REBUILD)
+event.listen(db.metadata, 'before_drop', DDL('DROP TABLE IF EXISTS name_search').execute_if(dialect='sqlite'))
+
+def include_object(object, name, type_, reflected, compare_to):
+    '''Alembic filter that keeps autogenerate from dropping name_search and its FTS5 shadow tables.'''
+    return not (type_ == 'table' and name.startswith('name_search'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rebuild', action='store_true', help='repopulate the index from campers and activities')
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error('nothing to do; pass --rebuild')
+
+    from app import app
+
+    with app.app_context(), db.engine.begin() as conn:
+        create_search_index(conn)
+        triggers.rebuild(conn)
+    print('Rebuilt the name search index')
+
+if __name__ == '__main__':
+    main()
@@ -1,53 +1,133 @@
 #!/usr/bin/env python3
+'''Seeds campers, activities and signups in bulk.
 
-from faker import Faker
+Rows are generated in batches from a seeded RNG, so the same arguments always
+produce the same database. Batches go straight to SQLite's executemany inside
+one transaction, with the secondary indexes of all three tables and the
+counter, schedule and search triggers dropped during the load; indexes, counters, schedules and the search
+index are rebuilt once at the end, and ETags issued before move to a new
+epoch. Signups that repeat a camper, activity and time are drawn again
+before the unique index comes back.
+
+    python seed.py                      # small dataset
+    python seed.py --scale large        # 1,000,000 campers / 3,000,000 signups
+    python seed.py --campers 50000 --signups 200000 --seed 7
+'''
+
+import argparse
 import random
+import time
+
+from faker import Faker
 
 from app import app
-from models import db, Episode, Guest, Appearance
+import counters
+import schedules
+import search
+from models import db, Camper, Activity, Signup, ActivityOccupancy, CamperSchedule, IdempotencyKey
+from versions import new_epoch
 
-with app.app_context():
-    
+# campers, activities, signups
+SCALES = {
+    'small': (1000, 20, 3000),
+    'medium': (10000, 100, 30000),
+    'large': (1000000, 1000, 3000000),
+    'xlarge': (3000000, 2000, 10000000),
+}
+BATCH_SIZE = 50000
+NAME_POOL = 500
+ACTIVITY_KINDS = (
+    'Archery', 'Canoeing', 'Hiking', 'Swimming', 'Crafts', 'Climbing',
+    'Fishing', 'Kayaking', 'Orienteering', 'Drama', 'Soccer', 'Astronomy',
+)
+
+def name_pool(seed):
+    '''First and last names drawn once from Faker; rows combine them instead of calling Faker each time.'''
     fake = Faker()
+    fake.seed_instance(seed)
+    return [fake.first_name() for _ in range(NAME_POOL)], [fake.last_name() for _ in range(NAME_POOL)]
+
+def camper_batches(rng, count, first_names, last_names, batch_size):
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        firsts = rng.choices(first_names, k=size)
+        lasts = rng.choices(last_names, k=size)
+        ages = rng.choices(range(8, 19), k=size)
+        yield [(f'{first} {last}', age) for first, last, age in zip(firsts, lasts, ages)]
+
+def activity_rows(rng, count):
+    difficulties = rng.choices(range(1, 11), k=count)
+    return [(f'{ACTIVITY_KINDS[i % len(ACTIVITY_KINDS)]} {i // len(ACTIVITY_KINDS) + 1}', difficulty)
+            for i, difficulty in enumerate(difficulties)]
+
+def signup_batches(rng, count, campers, activities, batch_size):
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        times = rng.choices(range(24), k=size)
+        camper_ids = rng.choices(range(1, campers + 1), k=size)
+        activity_ids = rng.choices(range(1, activities + 1), k=size)
+        yield list(zip(times, camper_ids, activity_ids))
+
+DELETE_DUPLICATE_SIGNUPS = ('DELETE FROM signups WHERE id NOT IN '
+                            '(SELECT min(id) FROM signups GROUP BY camper_id, activity_id, time)')
+
+def seed_database(conn, campers, activities, signups, seed=0, batch_size=BATCH_SIZE):
+    '''Replaces all rows with generated ones over `conn`, inside the caller's transaction.'''
+    if campers and activities and signups > campers * activities * 24:
+        raise ValueError("More signups than distinct camper, activity and time combinations")
+    rng = random.Random(seed)
+    first_names, last_names = name_pool(seed)
+    indexes = [index for model in (Camper, Activity, Signup) for index in model.__table__.indexes]
+
+    for module in (counters, schedules, search):
+        module.triggers.drop(conn)
+    # Stored idempotent responses name ids the new rows reuse, so they go too.
+    for table in (IdempotencyKey.__table__, Signup.__table__, ActivityOccupancy.__table__,
+                  CamperSchedule.__table__, Activity.__table__, Camper.__table__):
+        conn.execute(table.delete())
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+
+    for batch in camper_batches(rng, campers, first_names, last_names, batch_size):
+        conn.exec_driver_sql('INSERT INTO campers (name, age) VALUES (?, ?)', batch)
+    conn.exec_driver_sql('INSERT INTO activities (name, difficulty) VALUES (?, ?)', activity_rows(rng, activities))
+    if campers and activities:
+        missing = signups
+        while missing:
+            for batch in signup_batches(rng, missing, campers, activities, batch_size):
+                conn.exec_driver_sql('INSERT INTO signups (time, camper_id, activity_id) VALUES (?, ?, ?)', batch)
+            missing = conn.exec_driver_sql(DELETE_DUPLICATE_SIGNUPS).rowcount
+
+    for index in indexes:
+        index.create(conn)
+    for module in (counters, schedules, search):
+        module.triggers.rebuild(conn)
+        module.triggers.create(conn)
+    # Every row changed without a version stamp; retire all ETags at once.
+    new_epoch(conn)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=SCALES, default='small')
+    parser.add_argument('--campers', type=int, help='overrides the scale preset')
+    parser.add_argument('--activities', type=int, help='overrides the scale preset')
+    parser.add_argument('--signups', type=int, help='overrides the scale preset')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    campers, activities, signups = SCALES[args.scale]
+    campers = args.campers if args.campers is not None else campers
+    activities = args.activities if args.activities is not None else activities
+    signups = args.signups if args.signups is not None else signups
+
+    started = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        with db.engine.begin() as conn:
+            seed_database(conn, campers, activities, signups, args.seed, args.batch_size)
+    print(f'Seeded {campers} campers, {activities} activities and {signups} signups '
+          f'in {time.perf_counter() - started:.1f}s')
 
-    # Clear existing data
-    Appearance.query.delete()
-    Guest.query.delete()
-    Episode.query.delete()
-
-    # Create episodes
-    episodes = []
-    for i in range(10):
-        episode = Episode(
-            date=fake.date(),
-            number=i+1
-        )
-        episodes.append(episode)
-
-    db.session.add_all(episodes)
-    db.session.commit()
-
-    # Create guests
-    guests = []
-    for i in range(20):
-        guest = Guest(
-            name=fake.name(),
-            occupation=fake.job()
-        )
-        guests.append(guest)
-
-    db.session.add_all(guests)
-    db.session.commit()
-
-    # Create appearances
-    appearances = []
-    for i in range(50):
-        appearance = Appearance(
-            rating=random.randint(1, 5),
-            episode_id=random.choice(episodes).id,
-            guest_id=random.choice(guests).id
-        )
-        appearances.append(appearance)
-
-    db.session.add_all(appearances)
-    db.session.commit()
+if __name__ == '__main__':
+    main()
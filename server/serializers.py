@@ -0,0 +1,58 @@
+from operator import attrgetter
+
+from models import Camper, Activity, Signup
+
+def serializable_columns(model):
+    '''Column names in mapper order, less the column exclusions in serialize_rules ('-signup_count').'''
+    excluded = {rule[1:] for rule in getattr(model, 'serialize_rules', ()) if rule.startswith('-') and '.' not in rule}
+    return tuple(attr.key for attr in model.__mapper__.column_attrs if attr.key not in excluded)
+
+def compile_serializer(model, nested=None, columns=None):
+    '''Builds a to_dict() replacement for `model` once, up front.
+
+    `nested` maps a relationship name to a serializer for the related row(s);
+    `columns` restricts the output to those columns (all serializable ones by
+    default). Column names, the attribute getter and the relationship list are
+    all resolved here, so serializing a row is a zip plus one call per relationship.
+    '''
+    columns = tuple(columns) if columns is not None else serializable_columns(model)
+    getter = attrgetter(*columns)
+    if len(columns) == 1:
+        # attrgetter of a single name returns the bare value, not a 1-tuple.
+        getter = lambda obj, get=getter: (get(obj),)
+    relationships = tuple(
+        (name, serializer, model.__mapper__.relationships[name].uselist)
+        for name, serializer in (nested or {}).items()
+    )
+
+    def serialize(obj):
+        row = dict(zip(columns, getter(obj)))
+        for name, serializer, many in relationships:
+            value = getattr(obj, name)
+            if many:
+                row[name] = [serializer(item) for item in value]
+            else:
+                row[name] = serializer(value) if value is not None else None
+        return row
+
+    return serialize
+
+# Flat column-only builders, the leaves of every nesting rule below.
+camper_columns = compile_serializer(Camper)
+activity_columns = compile_serializer(Activity)
+
+# Mirrors Camper.serialize_rules ('-signups.camper',).
+serialize_camper = compile_serializer(Camper, {
+    'signups': compile_serializer(Signup, {'activity': activity_columns}),
+})
+
+# Mirrors Activity.serialize_rules ('-signups.activity',).
+serialize_activity = compile_serializer(Activity, {
+    'signups': compile_serializer(Signup, {'camper': camper_columns}),
+})
+
+# Mirrors Signup.serialize_rules ('-camper.signups', '-activity.signups').
+serialize_signup = compile_serializer(Signup, {
+    'camper': camper_columns,
+    'activity': activity_columns,
+})
@@ -1,18 +1,10 @@
-import pytest
+import json
 from faker import Faker
 from random import randint
-from app import app, db, Camper, Activity, Signup
-
-@pytest.fixture
-def client():
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-            db.session.execute(db.text("PRAGMA foreign_keys = ON"))
-            db.session.commit()
-        yield client
-        with app.app_context():
-            db.drop_all()
+from app import app, db, response_cache, versions, Camper, Activity, Signup
+from cache import ACTIVITIES_TAG
+from metrics import RequestMetrics
+from versions import VersionRegistry
 
 def test_gets_campers(client):
     '''retrieves campers with GET requests to /campers.'''
@@ -216,4 +208,398 @@ def test_400_for_signup_validation_error(client):
         )
         assert response.status_code == 400
         data = response.get_json()
-        assert 'errors' in data
\ No newline at end of file
+        assert 'errors' in data
+
+def test_paginates_campers_with_keyset_cursor(client):
+    '''pages through campers with limit and after parameters on GET /campers.'''
+    with app.app_context():
+        fake = Faker()
+        db.session.add_all([Camper(name=fake.name(), age=10) for _ in range(5)])
+        db.session.commit()
+
+    response = client.get('/campers?limit=2')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [c['id'] for c in data['data']] == [1, 2]
+    assert data['next'] == 2
+
+    data = client.get(f"/campers?limit=2&after={data['next']}").get_json()
+    assert [c['id'] for c in data['data']] == [3, 4]
+
+    data = client.get(f"/campers?limit=2&after={data['next']}").get_json()
+    assert [c['id'] for c in data['data']] == [5]
+    assert data['next'] is None
+
+def test_400_for_invalid_page_limit(client):
+    '''returns a 400 status code if the page limit on GET /activities is out of range.'''
+    response = client.get('/activities?limit=0')
+    assert response.status_code == 400
+    assert 'errors' in response.get_json()
+
+def test_streams_activities(client):
+    '''streams activities as a JSON array or NDJSON with GET /activities?stream=.'''
+    with app.app_context():
+        fake = Faker()
+        db.session.add_all([Activity(name=fake.sentence(), difficulty=randint(1, 10)) for _ in range(3)])
+        db.session.commit()
+
+    full = client.get('/activities').get_json()
+
+    response = client.get('/activities?stream=json')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert json.loads(response.get_data()) == full
+
+    response = client.get('/activities?stream=ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == full
+
+MAX_DETAIL_QUERIES = 4
+
+def seed_schedule(campers=5, activities=5):
+    fake = Faker()
+    camper_rows = [Camper(name=fake.name(), age=randint(8, 18)) for _ in range(campers)]
+    activity_rows = [Activity(name=fake.sentence(), difficulty=randint(1, 10)) for _ in range(activities)]
+    db.session.add_all(camper_rows + activity_rows)
+    db.session.commit()
+    db.session.add_all([
+        Signup(time=randint(0, 23), camper_id=camper.id, activity_id=activity.id)
+        for camper in camper_rows for activity in activity_rows
+    ])
+    db.session.commit()
+    return camper_rows[0].id, activity_rows[0].id
+
+def test_camper_detail_query_count(client, body_queries):
+    '''loads a camper with its activities in a fixed number of queries regardless of signups.'''
+    with app.app_context():
+        camper_id, _ = seed_schedule()
+
+    body_queries.clear()
+    response = client.get(f'/campers/{camper_id}')
+    assert response.status_code == 200
+    assert len(response.get_json()['activities']) == 5
+    assert len(body_queries) <= MAX_DETAIL_QUERIES
+
+def test_activity_detail_query_count(client, body_queries):
+    '''loads an activity with its signups in a fixed number of queries regardless of signups.'''
+    with app.app_context():
+        _, activity_id = seed_schedule()
+
+    body_queries.clear()
+    response = client.get(f'/activities/{activity_id}')
+    assert response.status_code == 200
+    assert len(response.get_json()['signups']) == 5
+    assert len(body_queries) <= MAX_DETAIL_QUERIES
+
+def test_list_query_count(client, body_queries):
+    '''lists campers and activities in a fixed number of queries regardless of signups.'''
+    with app.app_context():
+        seed_schedule()
+
+    for path in ('/campers', '/activities'):
+        body_queries.clear()
+        assert client.get(path).status_code == 200
+        assert len(body_queries) <= MAX_DETAIL_QUERIES
+
+def test_deletes_camper_signups_in_one_statement(client, query_counter):
+    '''deletes a camper's signups through ON DELETE CASCADE rather than one DELETE per signup.'''
+    with app.app_context():
+        camper_id, _ = seed_schedule()
+
+    query_counter.clear()
+    assert client.delete(f'/campers/{camper_id}').status_code == 204
+    assert [sql for sql in query_counter if sql.startswith('DELETE')] == ['DELETE FROM campers WHERE campers.id = ?']
+    assert not any('FROM signups' in sql and 'DISTINCT' not in sql for sql in query_counter)
+    with app.app_context():
+        assert Signup.query.filter_by(camper_id=camper_id).count() == 0
+        assert Signup.query.count() == 20
+
+def test_camper_delete_evicts_activities_it_signed_up_for(client):
+    '''evicts cached activities whose signups the cascade removed.'''
+    with app.app_context():
+        camper_id, activity_id = seed_schedule()
+
+    client.get(f'/activities/{activity_id}?expand=signups')
+    client.delete(f'/campers/{camper_id}')
+    response = client.get(f'/activities/{activity_id}?expand=signups')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert camper_id not in [signup['camper_id'] for signup in response.get_json()['signups']]
+
+def test_activity_delete_reads_only_camper_ids(client, query_counter):
+    '''evicts the campers of an activity's cascaded signups from their distinct ids alone.'''
+    with app.app_context():
+        camper_id, activity_id = seed_schedule()
+
+    client.get(f'/campers/{camper_id}')
+    query_counter.clear()
+    assert client.delete(f'/activities/{activity_id}').status_code == 204
+    reads = [sql for sql in query_counter if 'FROM signups' in sql]
+    assert len(reads) == 1
+    assert reads[0].startswith('SELECT DISTINCT signups.camper_id \nFROM signups')
+    assert client.get(f'/campers/{camper_id}').headers['X-Cache'] == 'MISS'
+
+def test_deletes_signups_for_an_activity(client):
+    '''deletes every signup for an activity with DELETE request to /signups?activity_id=.'''
+    with app.app_context():
+        camper_id, activity_id = seed_schedule()
+
+    client.get(f'/campers/{camper_id}?expand=signups')
+    response = client.delete(f'/signups?activity_id={activity_id}')
+    assert response.status_code == 200
+    assert response.get_json() == {'deleted': 5}
+    assert client.get(f'/activities/{activity_id}').get_json()['signups'] == []
+    camper = client.get(f'/campers/{camper_id}?expand=signups')
+    assert camper.headers['X-Cache'] == 'MISS'
+    assert len(camper.get_json()['signups']) == 4
+
+def test_bulk_signup_delete_errors(client):
+    '''returns 400 without an integer activity_id and 404 for an unknown activity.'''
+    assert client.delete('/signups').status_code == 400
+    assert client.delete('/signups?activity_id=x').status_code == 400
+    response = client.delete('/signups?activity_id=999')
+    assert response.status_code == 404
+    assert response.get_json()['error'] == "Activity not found"
+
+def test_batch_reads_campers_by_id(client, body_queries):
+    '''returns campers for GET /campers?ids= in request order, marking ids that do not exist.'''
+    with app.app_context():
+        seed_schedule(campers=3, activities=2)
+
+    body_queries.clear()
+    response = client.get('/campers?ids=3,99,1,3')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert [row['id'] for row in data] == [3, 99, 1, 3]
+    assert data[1] == {'id': 99, 'error': 'Camper not found'}
+    assert len(data[0]['signups']) == 2
+    assert len(body_queries) == 2
+
+    data = client.get('/activities?ids=2&fields=name').get_json()['data']
+    assert data == [{'id': 2, 'name': data[0]['name']}]
+
+def test_400_for_invalid_batch_ids(client):
+    '''returns a 400 status code for malformed, empty or oversized id batches.'''
+    too_many = ','.join(str(i) for i in range(1, 502))
+    for query in ('ids=1,x', 'ids=', f'ids={too_many}', 'ids=1&limit=5'):
+        response = client.get(f'/activities?{query}')
+        assert response.status_code == 400
+        assert 'errors' in response.get_json()
+
+def test_creates_signups_in_bulk(client):
+    '''creates many signups in one transaction with a JSON array POST to /signups.'''
+    with app.app_context():
+        fake = Faker()
+        camper = Camper(name=fake.name(), age=randint(8, 18))
+        activity = Activity(name=fake.sentence(), difficulty=randint(1, 10))
+        db.session.add_all([camper, activity])
+        db.session.commit()
+        camper_id, activity_id = camper.id, activity.id
+
+    response = client.post(
+        '/signups',
+        json=[{'time': hour, 'camper_id': camper_id, 'activity_id': activity_id} for hour in range(3)]
+    )
+    assert response.status_code == 201
+    data = response.get_json()
+    assert [signup['time'] for signup in data] == [0, 1, 2]
+    assert all(signup['id'] for signup in data)
+    with app.app_context():
+        assert Signup.query.count() == 3
+
+def test_bulk_signups_report_errors_per_item(client):
+    '''rejects a bulk POST to /signups and reports each invalid item by index.'''
+    with app.app_context():
+        fake = Faker()
+        camper = Camper(name=fake.name(), age=randint(8, 18))
+        activity = Activity(name=fake.sentence(), difficulty=randint(1, 10))
+        db.session.add_all([camper, activity])
+        db.session.commit()
+        camper_id, activity_id = camper.id, activity.id
+
+    response = client.post(
+        '/signups',
+        json=[
+            {'time': 10, 'camper_id': camper_id, 'activity_id': activity_id},
+            {'time': 25, 'camper_id': camper_id, 'activity_id': activity_id},
+            {'time': 11, 'camper_id': 0, 'activity_id': activity_id},
+            {'camper_id': camper_id, 'activity_id': activity_id},
+        ]
+    )
+    assert response.status_code == 400
+    assert [error['index'] for error in response.get_json()['errors']] == [1, 2, 3]
+    with app.app_context():
+        assert Signup.query.count() == 0
+
+def test_caches_get_responses(client):
+    '''serves repeated GET requests from the response cache and counts hits and misses.'''
+    with app.app_context():
+        db.session.add(Activity(name=Faker().sentence(), difficulty=3))
+        db.session.commit()
+
+    first = client.get('/activities')
+    second = client.get('/activities')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    stats = client.get('/cache/stats').get_json()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+def test_signup_evicts_only_affected_entries(client):
+    '''evicts the cached camper and activity touched by a new signup and keeps unrelated entries.'''
+    with app.app_context():
+        fake = Faker()
+        camper = Camper(name=fake.name(), age=10)
+        bystander = Camper(name=fake.name(), age=12)
+        activity = Activity(name=fake.sentence(), difficulty=2)
+        db.session.add_all([camper, bystander, activity])
+        db.session.commit()
+        camper_id, bystander_id, activity_id = camper.id, bystander.id, activity.id
+
+    for path in (f'/campers/{camper_id}', f'/campers/{bystander_id}', f'/activities/{activity_id}'):
+        client.get(path)
+
+    response = client.post('/signups', json={'time': 9, 'camper_id': camper_id, 'activity_id': activity_id})
+    assert response.status_code == 201
+
+    camper_response = client.get(f'/campers/{camper_id}')
+    assert camper_response.headers['X-Cache'] == 'MISS'
+    assert len(camper_response.get_json()['activities']) == 1
+    activity_response = client.get(f'/activities/{activity_id}')
+    assert activity_response.headers['X-Cache'] == 'MISS'
+    assert len(activity_response.get_json()['signups']) == 1
+    assert client.get(f'/campers/{bystander_id}').headers['X-Cache'] == 'HIT'
+
+def test_patch_evicts_cached_camper(client):
+    '''evicts a cached camper when it is updated with PATCH.'''
+    with app.app_context():
+        camper = Camper(name=Faker().name(), age=10)
+        db.session.add(camper)
+        db.session.commit()
+        camper_id = camper.id
+
+    client.get(f'/campers/{camper_id}')
+    client.patch(f'/campers/{camper_id}', json={'age': 11})
+    response = client.get(f'/campers/{camper_id}')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['age'] == 11
+
+def test_returns_304_for_matching_etag(client, query_counter):
+    '''answers GET /campers/<int:id> with 304 from one version lookup when If-None-Match matches the current ETag.'''
+    with app.app_context():
+        camper = Camper(name=Faker().name(), age=10)
+        db.session.add(camper)
+        db.session.commit()
+        camper_id = camper.id
+
+    response = client.get(f'/campers/{camper_id}')
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    query_counter.clear()
+    response = client.get(f'/campers/{camper_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert len(query_counter) == 1 and 'FROM tag_versions' in query_counter[0]
+    assert response.headers['ETag'] == etag
+
+def test_returns_304_for_a_url_this_process_has_not_seen(client):
+    '''answers a matching If-None-Match with 304 even when the URL's dependencies are not known in this process.'''
+    etag = client.get('/activities').headers['ETag']
+
+    versions.clear()
+    response = client.get('/activities', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+
+def test_etag_changes_after_write(client):
+    '''issues a new ETag for GET /activities after an activity is created.'''
+    etag = client.get('/activities').headers['ETag']
+    client.post('/activities', json={'name': Faker().sentence(), 'difficulty': 2})
+
+    response = client.get('/activities', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 1
+
+def test_etags_come_from_the_database(client):
+    '''stamps versions in the database, so another process agrees on ETags and a new database never repeats them.'''
+    client.post('/activities', json={'name': Faker().sentence(), 'difficulty': 2})
+    etag = client.get('/activities').headers['ETag']
+    with app.test_request_context():
+        assert f'"{VersionRegistry(db.session).validators({ACTIVITIES_TAG})[0]}"' == etag
+
+    response_cache.clear()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    client.post('/activities', json={'name': Faker().sentence(), 'difficulty': 2})
+    assert client.get('/activities', headers={'If-None-Match': etag}).status_code == 200
+
+def test_etag_tracks_embedded_rows(client):
+    '''changes a camper's ETag when another camper in one of its activities is renamed.'''
+    with app.app_context():
+        camper_id, activity_id = seed_schedule(campers=2, activities=1)
+        other_id = camper_id + 1
+
+    etag = client.get(f'/campers/{camper_id}').headers['ETag']
+    activity_etag = client.get(f'/activities/{activity_id}').headers['ETag']
+    client.patch(f'/campers/{other_id}', json={'name': 'Renamed'})
+    response = client.get(f'/campers/{camper_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert client.get(f'/activities/{activity_id}', headers={'If-None-Match': activity_etag}).status_code == 200
+
+def test_detail_etags_depend_on_activities_not_co_campers(client):
+    '''tags a camper detail with its own row and its activities, and an activity detail with its own row only.'''
+    with app.app_context():
+        camper_id, activity_id = seed_schedule(campers=3, activities=2)
+
+    client.get(f'/campers/{camper_id}')
+    client.get(f'/activities/{activity_id}')
+    assert versions.dependencies(f'/campers/{camper_id}?') == {
+        f'camper:{camper_id}', f'activity:{activity_id}', f'activity:{activity_id + 1}',
+    }
+    assert versions.dependencies(f'/activities/{activity_id}?') == {f'activity:{activity_id}'}
+
+def test_returns_304_for_if_modified_since(client):
+    '''answers GET /activities with 304 when nothing changed since If-Modified-Since.'''
+    last_modified = client.get('/activities').headers['Last-Modified']
+    response = client.get('/activities', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+def test_reports_server_timing(client):
+    '''adds a Server-Timing header with SQL, serialization and total durations.'''
+    with app.app_context():
+        camper_id, _ = seed_schedule(campers=2, activities=2)
+
+    timing = client.get(f'/campers/{camper_id}').headers['Server-Timing']
+    assert 'db;dur=' in timing
+    # Three for the camper, two for its ETag.
+    assert '5 queries' in timing
+    assert 'serialize;dur=' in timing
+    assert 'total;dur=' in timing
+
+def test_exposes_prometheus_metrics(client):
+    '''aggregates request latency per route into histograms at /metrics.'''
+    client.get('/activities')
+    client.get('/activities/0')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/activities",le="+Inf"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/activities/<int:id>"}' in body
+    assert 'sql_statements_total{method="GET",route="/activities"}' in body
+    assert 'encode_duration_seconds_total{method="GET",route="/activities"}' in body
+    assert 'response_cache_misses' in body
+
+def test_counts_encoding_apart_from_serialization():
+    '''reports serialize and encode time as separate counters, like the Server-Timing phases.'''
+    metrics = RequestMetrics()
+    metrics.record(('GET', '/campers'), 1.0, 2, 0.125, 0.25, 0.5)
+    body = metrics.render()
+    assert 'serialize_duration_seconds_total{method="GET",route="/campers"} 0.25' in body
+    assert 'encode_duration_seconds_total{method="GET",route="/campers"} 0.5' in body
@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from app import app, db, Camper, Activity, Signup
+import asgi
+
+@pytest.fixture
+def rows():
+    return [
+        [Camper(name='Ada', age=12), Activity(name='Archery', difficulty=3), Camper(name='Bo', age=9)],
+        [Signup(time=9, camper_id=1, activity_id=1)],
+    ]
+
+@pytest.fixture
+def client(client):
+    yield client
+    asyncio.run(asgi.engine.dispose())
+
+def call(method, path, body=None, query='', headers=()):
+    '''Runs one request through the ASGI app; returns (status, content type, body bytes).
+
+    `body` is sent as JSON, or as is when it is already bytes.
+    '''
+    messages = []
+    if body is not None and not isinstance(body, bytes):
+        body = json.dumps(body).encode()
+    headers = [(name.encode(), value.encode()) for name, value in headers]
+    if body is not None:
+        headers.append((b'content-type', b'application/json'))
+
+    async def receive():
+        return {'type': 'http.request', 'body': body or b''}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query.encode(), 'headers': headers}
+    asyncio.run(asgi.application(scope, receive, send))
+    headers = dict(messages[0]['headers'])
+    return messages[0]['status'], headers[b'content-type'].decode(), b''.join(m.get('body', b'') for m in messages[1:])
+
+@pytest.mark.parametrize('path, query', [
+    ('/campers', ''),
+    ('/campers', 'limit=1'),
+    ('/campers', 'limit=0'),
+    ('/campers', 'stream=ndjson'),
+    ('/campers', 'stream=json&after=1'),
+    ('/campers/1', ''),
+    ('/campers/99', ''),
+    ('/activities', ''),
+    ('/activities/1', ''),
+    ('/activities/99', ''),
+    ('/campers', 'fields=name'),
+    ('/campers', 'fields=name&expand=signups.activity&limit=1'),
+    ('/campers', 'fields=nickname'),
+    ('/campers/1', 'fields=age&expand=signups.activity'),
+    ('/campers/99', 'fields=age'),
+    ('/activities', 'expand=signups.camper&stream=ndjson'),
+    ('/activities/1', 'fields=name&expand=signups'),
+    ('/activities/1', 'expand=campers'),
+    ('/campers', 'ids=2,99,1'),
+    ('/campers', 'ids=1&fields=name&expand=signups'),
+    ('/campers', 'ids=1,x'),
+    ('/campers', 'ids=1&limit=5'),
+    ('/activities', 'ids=1'),
+    ('/campers', 'age_min=10'),
+    ('/campers', 'age_max=10&name_prefix=B'),
+    ('/campers', 'age_min=ten'),
+    ('/campers', 'sort=-age&limit=1'),
+    ('/campers', 'sort=name&fields=id&limit=1'),
+    ('/campers', 'sort=nickname'),
+    ('/campers', 'after=abc'),
+    ('/campers', 'stream=ndjson&sort=-name'),
+    ('/activities', 'difficulty=3'),
+    ('/activities', 'ids=1&difficulty=3'),
+    ('/campers/1/schedule', ''),
+    ('/activities/stats', ''),
+    ('/search', 'q=ad'),
+])
+def test_reads_match_flask(client, path, query):
+    '''serves the same status and JSON as the Flask-RESTful resources for GET requests.'''
+    flask_response = client.get(f'{path}?{query}')
+    status, content_type, body = call('GET', path, query=query)
+    assert status == flask_response.status_code
+    assert content_type == flask_response.mimetype
+    if content_type == 'application/x-ndjson':
+        assert body.splitlines() == flask_response.get_data().splitlines()
+    else:
+        assert json.loads(body) == flask_response.get_json()
+
+def test_follows_sorted_cursors(client):
+    '''pages through a sorted collection with the same opaque cursors as the Flask app.'''
+    names, after = [], ''
+    while after is not None:
+        query = f'sort=-name&limit=1&after={after}' if after else 'sort=-name&limit=1'
+        status, _, body = call('GET', '/campers', query=query)
+        page = json.loads(body)
+        assert status == 200
+        assert page == client.get(f'/campers?{query}').get_json()
+        names += [camper['name'] for camper in page['data']]
+        after = page['next']
+    assert names == ['Bo', 'Ada']
+
+def test_creates_and_validates_campers(client):
+    '''creates campers and rejects invalid ones with the model's validation message.'''
+    status, _, body = call('POST', '/campers', {'name': 'Cy', 'age': 10})
+    assert status == 201
+    assert json.loads(body) == {'id': 3, 'name': 'Cy', 'age': 10, 'signups': []}
+
+    status, _, body = call('POST', '/campers', {'name': 'Cy', 'age': 30})
+    assert status == 400
+    assert json.loads(body) == {'errors': ['Age must be between 8 and 18']}
+
+def test_patches_and_deletes_camper(client):
+    '''updates a camper with PATCH and removes it and its signups with DELETE.'''
+    status, _, body = call('PATCH', '/campers/1', {'age': 13})
+    assert status == 200
+    assert json.loads(body)['age'] == 13
+    assert call('PATCH', '/campers/1', {'name': ''})[0] == 400
+
+    status, _, body = call('DELETE', '/campers/1')
+    assert (status, body) == (204, b'')
+    with app.app_context():
+        assert db.session.get(Camper, 1) is None
+        assert Signup.query.count() == 0
+
+def test_creates_signups(client):
+    '''creates single and bulk signups, with the same errors as the Flask resource.'''
+    status, _, body = call('POST', '/signups', {'time': 10, 'camper_id': 2, 'activity_id': 1})
+    assert status == 201
+    data = json.loads(body)
+    assert data['camper']['name'] == 'Bo'
+    assert data['activity']['name'] == 'Archery'
+
+    status, _, body = call('POST', '/signups', {'time': 10, 'camper_id': 99, 'activity_id': 1})
+    assert (status, json.loads(body)) == (400, {'errors': ['Invalid camper_id or activity_id']})
+
+    status, _, body = call('POST', '/signups', [
+        {'time': 11, 'camper_id': 1, 'activity_id': 1},
+        {'time': 12, 'camper_id': 2, 'activity_id': 1},
+    ])
+    assert status == 201
+    assert [row['time'] for row in json.loads(body)] == [11, 12]
+
+    status, _, body = call('POST', '/signups', [{'time': 30, 'camper_id': 1, 'activity_id': 1}])
+    assert status == 400
+    assert json.loads(body)['errors'][0]['index'] == 0
+
+def test_writes_refresh_wsgi_validators(client):
+    '''stamps tag versions on writes, so the WSGI app stops answering 304 for what changed.'''
+    response = client.get('/campers')
+    assert call('POST', '/campers', {'name': 'Cy', 'age': 10})[0] == 201
+    response = client.get('/campers', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
+    assert [camper['name'] for camper in response.get_json()] == ['Ada', 'Bo', 'Cy']
+
+def test_replays_idempotent_signups(client):
+    '''stores and replays signups under their Idempotency-Key like the Flask resource.'''
+    signup = {'time': 10, 'camper_id': 2, 'activity_id': 1}
+    first = call('POST', '/signups', signup, headers=[('Idempotency-Key', 'abc')])
+    assert first[0] == 201
+    assert call('POST', '/signups', signup, headers=[('Idempotency-Key', 'abc')]) == first
+    status, _, body = call('POST', '/signups', {**signup, 'time': 11}, headers=[('Idempotency-Key', 'abc')])
+    assert status == 422
+
+def test_400_for_malformed_json(client):
+    '''rejects a request body that is not JSON with 400.'''
+    assert call('POST', '/campers', b'{"name": ')[0] == 400
+    assert call('POST', '/signups', b'[')[0] == 400
+
+def test_unrouted_requests(client):
+    '''serves the rest of the Flask app's routes, with its 404 and 405 responses.'''
+    assert call('GET', '/nowhere')[0] == 404
+    assert call('PUT', '/campers')[0] == 405
+    status, _, body = call('DELETE', '/signups', query='activity_id=1')
+    assert (status, json.loads(body)) == (200, {'deleted': 1})
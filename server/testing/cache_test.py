@@ -0,0 +1,29 @@
+import pytest
+
+from cache import CacheBackend, LRUBackend
+
+def test_evicts_least_recently_used():
+    '''drops the least recently used entry once the backend is full.'''
+    backend = LRUBackend(max_entries=2)
+    backend.set('a', 1, ttl=60)
+    backend.set('b', 2, ttl=60)
+    backend.get('a')
+    backend.set('c', 3, ttl=60)
+    assert backend.get('a') == 1
+    assert backend.get('b') is None
+    assert backend.get('c') == 3
+
+def test_expires_entries_after_ttl():
+    '''treats entries past their TTL as missing.'''
+    backend = LRUBackend()
+    backend.set('a', 1, ttl=-1)
+    assert backend.get('a') is None
+
+def test_incomplete_backend_fails_on_construction():
+    '''refuses to build a backend that leaves an interface method unimplemented.'''
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
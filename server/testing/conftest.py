@@ -1,9 +1,70 @@
 #!/usr/bin/env python3
 
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import event
+
+def pytest_configure(config):
+    # Set before any test module imports app, which reads it once; the dev
+    # database in instance/ is never touched.
+    config.database_dir = tempfile.mkdtemp(prefix='camp-tests-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(config.database_dir, "test.db")}'
+
+def pytest_unconfigure(config):
+    shutil.rmtree(config.database_dir, ignore_errors=True)
+
 def pytest_itemcollected(item):
     par = item.parent.obj
     node = item.obj
     pref = par.__doc__.strip() if par.__doc__ else par.__class__.__name__
     suf = node.__doc__.strip() if node.__doc__ else node.__name__
     if pref or suf:
-        item._nodeid = ' '.join((pref, suf))
\ No newline at end of file
+        item._nodeid = ' '.join((pref, suf))
+
+@pytest.fixture
+def rows():
+    '''Batches of rows the client fixture commits, one batch after another, before the test runs.'''
+    return []
+
+@pytest.fixture
+def client(rows):
+    '''A test client over freshly created tables holding `rows`, with empty response cache and URL dependencies.'''
+    from app import app, db, response_cache, versions
+    response_cache.clear()
+    versions.clear()
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            for batch in rows:
+                db.session.add_all(batch)
+                db.session.commit()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+def recorded_statements(keep):
+    from app import app, db
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if keep(statement):
+            statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
+
+@pytest.fixture
+def query_counter():
+    '''Records every SQL statement the app's engine executes while the test runs.'''
+    yield from recorded_statements(lambda statement: True)
+
+@pytest.fixture
+def body_queries():
+    '''Like query_counter, without the tag_versions reads and stamps behind ETags.'''
+    yield from recorded_statements(lambda statement: 'tag_versions' not in statement)
@@ -0,0 +1,78 @@
+import pytest
+
+from app import app, db, versions, Camper, Activity, Signup
+from counters import check_counters, rebuild_counters
+
+@pytest.fixture
+def rows():
+    return [[
+        Camper(name='Ada', age=12), Camper(name='Bo', age=9),
+        Activity(name='Archery', difficulty=3), Activity(name='Canoeing', difficulty=5),
+    ]]
+
+def occupancy(client, activity_id):
+    stats = {row['id']: row for row in client.get('/activities/stats').get_json()}
+    return stats[activity_id]['signup_count'], stats[activity_id]['occupancy']
+
+def assert_consistent():
+    with app.app_context(), db.engine.connect() as conn:
+        assert check_counters(conn) == []
+
+def test_counts_single_and_bulk_signups(client):
+    '''counts signups created one at a time and in bulk, per activity and per hour.'''
+    client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1})
+    client.post('/signups', json=[
+        {'time': 9, 'camper_id': 2, 'activity_id': 1},
+        {'time': 14, 'camper_id': 1, 'activity_id': 2},
+    ])
+
+    count, hours = occupancy(client, 1)
+    assert count == 2
+    assert len(hours) == 24
+    assert hours[9] == 2 and sum(hours) == 2
+    assert occupancy(client, 2)[1][14] == 1
+    with app.app_context():
+        assert db.session.get(Camper, 1).signup_count == 2
+    assert_consistent()
+
+def test_cascade_deletes_update_counts(client):
+    '''decrements counters when deleting a camper or an activity removes its signups.'''
+    client.post('/signups', json=[
+        {'time': 9, 'camper_id': 1, 'activity_id': 1},
+        {'time': 9, 'camper_id': 2, 'activity_id': 1},
+        {'time': 10, 'camper_id': 1, 'activity_id': 2},
+    ])
+
+    client.delete('/campers/1')
+    assert occupancy(client, 1) == (1, [0] * 9 + [1] + [0] * 14)
+    assert occupancy(client, 2) == (0, [0] * 24)
+
+    client.delete('/activities/1')
+    with app.app_context():
+        assert db.session.get(Camper, 2).signup_count == 0
+    assert_consistent()
+
+def test_stats_lists_every_activity(client):
+    '''lists activities without signups with zero counts.'''
+    response = client.get('/activities/stats')
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'id': 1, 'name': 'Archery', 'signup_count': 0, 'occupancy': [0] * 24},
+        {'id': 2, 'name': 'Canoeing', 'signup_count': 0, 'occupancy': [0] * 24},
+    ]
+
+def test_checker_reports_and_rebuild_repairs_drift(client):
+    '''reports counters that disagree with signups, recomputes them and moves the stats ETag.'''
+    etag = client.get('/activities/stats').headers['ETag']
+    with app.app_context():
+        db.session.add(Signup(time=8, camper_id=1, activity_id=1))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('UPDATE activities SET signup_count = 5 WHERE id = 1')
+            conn.exec_driver_sql('DELETE FROM activity_occupancy')
+            drift = check_counters(conn)
+            assert ('activities.signup_count', 1, 5, 1) in drift
+            assert ('activity_occupancy', '1:8', 0, 1) in drift
+            rebuild_counters(conn, versions)
+    assert_consistent()
+    assert client.get('/activities/stats', headers={'If-None-Match': etag}).status_code == 200
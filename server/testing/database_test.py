@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import app, db
+from database import SQLITE_PROFILES, install_sqlite_pragmas
+
+def test_applies_pragmas_to_app_connections():
+    '''enables WAL journaling and foreign keys on every connection of the app engine.'''
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert conn.execute(text('PRAGMA foreign_keys')).scalar() == 1
+            assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+@pytest.mark.parametrize('profile, blocked', [('production', False), ('safe', True)])
+def test_readers_do_not_wait_for_writers_in_wal(tmp_path, profile, blocked):
+    '''lets readers query while a writer holds an exclusive lock only in the production profile.'''
+    engine = create_engine(f'sqlite:///{tmp_path / "load.db"}', connect_args={'timeout': 0})
+    install_sqlite_pragmas(engine, dict(SQLITE_PROFILES[profile], busy_timeout=0))
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE signups (id INTEGER PRIMARY KEY, time INTEGER)'))
+        conn.execute(text('INSERT INTO signups (time) VALUES (1)'))
+
+    writer = engine.raw_connection()
+    writer.execute('BEGIN EXCLUSIVE')
+    writer.execute('INSERT INTO signups (time) VALUES (2)')
+    try:
+        if blocked:
+            with pytest.raises(OperationalError, match='locked'):
+                with engine.connect() as reader:
+                    reader.execute(text('SELECT count(*) FROM signups'))
+        else:
+            with engine.connect() as reader:
+                assert reader.execute(text('SELECT count(*) FROM signups')).scalar() == 1
+    finally:
+        writer.rollback()
+        writer.close()
+        engine.dispose()
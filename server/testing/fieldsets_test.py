@@ -0,0 +1,52 @@
+import pytest
+
+from app import app, db, Camper, Activity, Signup
+
+@pytest.fixture
+def rows():
+    return [[Camper(name='Ada', age=12), Activity(name='Archery', difficulty=3)], [Signup(time=9, camper_id=1, activity_id=1)]]
+
+def test_fields_restrict_columns_and_skip_relationships(client, body_queries):
+    '''returns only the requested columns plus id, from one column-restricted SELECT.'''
+    for path in ('/campers?fields=name', '/campers/1?fields=name'):
+        body_queries.clear()
+        data = client.get(path).get_json()
+        assert (data[0] if isinstance(data, list) else data) == {'id': 1, 'name': 'Ada'}
+        assert len(body_queries) == 1
+        assert 'campers.age' not in body_queries[0]
+        assert 'signups' not in body_queries[0]
+
+def test_expand_embeds_requested_relationships(client, body_queries):
+    '''embeds only the relationships named in expand, loaded eagerly.'''
+    data = client.get('/activities/1?fields=name&expand=signups.camper').get_json()
+    assert data == {
+        'id': 1, 'name': 'Archery',
+        'signups': [{'id': 1, 'time': 9, 'camper_id': 1, 'activity_id': 1,
+                     'camper': {'id': 1, 'name': 'Ada', 'age': 12}}],
+    }
+    assert len(body_queries) == 2
+
+    data = client.get('/campers?expand=signups&limit=10').get_json()
+    assert data['data'] == [{'id': 1, 'name': 'Ada', 'age': 12,
+                             'signups': [{'id': 1, 'time': 9, 'camper_id': 1, 'activity_id': 1}]}]
+
+def test_default_representation_is_unchanged(client):
+    '''keeps the full representation when neither parameter is given.'''
+    data = client.get('/campers/1').get_json()
+    assert set(data) == {'id', 'name', 'age', 'signups', 'activities'}
+
+def test_rejects_unknown_fields_and_expansions(client):
+    '''returns 400 for columns or relationships the resource does not have.'''
+    for path in ('/campers?fields=email', '/activities/1?expand=campers', '/campers/1?expand=signups.activity.signups.camper'):
+        response = client.get(path)
+        assert response.status_code == 400
+        assert response.get_json()['errors']
+
+def test_sparse_detail_is_invalidated_by_related_writes(client):
+    '''serves a fresh sparse response after a write to an embedded row.'''
+    path = '/campers/1?fields=name&expand=signups.activity'
+    assert client.get(path).get_json()['signups'][0]['activity']['name'] == 'Archery'
+    with app.app_context():
+        db.session.get(Activity, 1).name = 'Canoeing'
+        db.session.commit()
+    assert client.get(path).get_json()['signups'][0]['activity']['name'] == 'Canoeing'
@@ -0,0 +1,88 @@
+import base64
+
+import pytest
+
+from app import app, db, Camper, Activity
+from filters import prefix_range
+
+@pytest.fixture
+def rows():
+    return [[
+        Camper(name='Ada', age=12), Camper(name='Abe', age=9), Camper(name='Bea', age=15),
+        Camper(name='Al', age=12), Camper(name='Cy', age=17),
+        Activity(name='Archery', difficulty=3), Activity(name='Canoeing', difficulty=None),
+        Activity(name='Climbing', difficulty=3), Activity(name='Drama', difficulty=1),
+    ]]
+
+def names(rows):
+    return [row['name'] for row in rows]
+
+def token(text):
+    '''`text` encoded the way Ordering.cursor encodes its tokens.'''
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip('=')
+
+def test_filters_campers(client):
+    '''filters GET /campers by age range and name prefix.'''
+    assert names(client.get('/campers?age_min=12&age_max=15').get_json()) == ['Ada', 'Bea', 'Al']
+    assert names(client.get('/campers?name_prefix=A&sort=name').get_json()) == ['Abe', 'Ada', 'Al']
+    assert names(client.get('/campers?name_prefix=A&age_min=10').get_json()) == ['Ada', 'Al']
+
+def test_filters_activities_by_difficulty(client):
+    '''filters GET /activities by difficulty.'''
+    assert names(client.get('/activities?difficulty=3').get_json()) == ['Archery', 'Climbing']
+
+def test_sorts_in_both_directions(client):
+    '''sorts by a column with ties broken by id, descending with a leading -.'''
+    assert names(client.get('/campers?sort=age').get_json()) == ['Abe', 'Ada', 'Al', 'Bea', 'Cy']
+    assert names(client.get('/campers?sort=-age').get_json()) == ['Cy', 'Bea', 'Al', 'Ada', 'Abe']
+
+@pytest.mark.parametrize('sort', ['difficulty', '-difficulty', 'name', '-id'])
+def test_pages_through_sorted_results(client, sort):
+    '''visits every row once, in sort order, when paging a sorted collection with its cursor.'''
+    expected = names(client.get(f'/activities?sort={sort}').get_json())
+    seen, cursor = [], None
+    while True:
+        query = f'/activities?sort={sort}&limit=1' + (f'&after={cursor}' if cursor is not None else '')
+        page = client.get(query).get_json()
+        seen += names(page['data'])
+        cursor = page['next']
+        if cursor is None:
+            break
+    assert seen == expected
+    assert len(seen) == 4
+
+def test_400_for_invalid_filters(client):
+    '''returns a 400 status code for unparsable filters, unknown sort keys and bad cursors.'''
+    malformed = [token('[["a"],[1]]'), token('["a",1,2]'), token('{"a":1}'), token('["a","1"]'), token('[true,1.5]')]
+    for query in ('age_min=old', 'sort=email', 'sort=age&limit=2&after=garbage', 'ids=1&age_min=3',
+                  *(f'sort=name&limit=2&after={cursor}' for cursor in malformed)):
+        response = client.get(f'/campers?{query}')
+        assert response.status_code == 400
+        assert 'errors' in response.get_json()
+
+def test_filters_use_indexes(client):
+    '''serves age, name prefix and difficulty filters from their indexes.'''
+    with app.app_context():
+        for sql, index in (
+            ("SELECT id FROM campers WHERE age >= 10 AND age <= 12", 'ix_campers_age'),
+            ("SELECT id FROM campers WHERE name >= 'A' AND name < 'B'", 'ix_campers_name'),
+            ("SELECT id FROM activities WHERE difficulty = 3", 'ix_activities_difficulty'),
+        ):
+            plan = ' '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+            assert index in plan
+
+@pytest.mark.parametrize('prefix, upper', [
+    ('Ab', 'Ac'),
+    ('a\ud7ff', 'a\ue000'),
+    ('a\U0010ffff', 'b'),
+    ('\U0010ffff\U0010ffff', None),
+])
+def test_prefix_range_bounds(prefix, upper):
+    '''ends a name prefix range at the next valid code point, or leaves it open after U+10FFFF.'''
+    clause = prefix_range(Camper.name, prefix)
+    params = clause.compile().params
+    assert prefix in params.values()
+    if upper is None:
+        assert len(params) == 1
+    else:
+        assert sorted(params.values()) == sorted([prefix, upper])
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from app import app, group_commit, Camper, Activity, Signup
+
+@pytest.fixture
+def rows():
+    return [[Camper(name='Ada', age=12), Activity(name='Archery', difficulty=3)]]
+
+@pytest.fixture(autouse=True)
+def grouped(monkeypatch):
+    monkeypatch.setitem(app.config, 'GROUP_COMMIT', True)
+
+def post_concurrently(bodies):
+    '''POSTs each (path, body) from its own thread; returns the responses in order.'''
+    responses = [None] * len(bodies)
+
+    def post(index, path, body):
+        with app.test_client() as thread_client:
+            responses[index] = thread_client.post(path, json=body)
+
+    threads = [threading.Thread(target=post, args=(index, *item)) for index, item in enumerate(bodies)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+def test_creates_rows_through_group_commit(client):
+    '''answers group-committed POSTs with the stored rows, as the direct path does.'''
+    camper = client.post('/campers', json={'name': 'Bea', 'age': 10})
+    assert camper.status_code == 201
+    assert camper.get_json() == {'id': 2, 'name': 'Bea', 'age': 10, 'signups': []}
+    activity = client.post('/activities', json={'name': 'Canoeing', 'difficulty': 2})
+    assert activity.status_code == 201
+    assert activity.get_json()['id'] == 2
+    signup = client.post('/signups', json={'time': 9, 'camper_id': 2, 'activity_id': 2})
+    assert signup.status_code == 201
+    assert signup.get_json()['camper']['name'] == 'Bea'
+    assert client.post('/signups', json={'time': 9, 'camper_id': 2, 'activity_id': 2}).status_code == 200
+    assert client.post('/campers', json={'name': '', 'age': 10}).status_code == 400
+
+def test_batches_concurrent_writes(client, monkeypatch):
+    '''commits concurrent POSTs together and fails only the invalid one in a batch.'''
+    monkeypatch.setattr(group_commit, 'interval', 0.2)
+    batches = group_commit.batches
+    bodies = [('/campers', {'name': f'Camper {i}', 'age': 10}) for i in range(10)]
+    bodies.append(('/signups', {'time': 9, 'camper_id': 999, 'activity_id': 1}))
+    responses = post_concurrently(bodies)
+
+    assert [response.status_code for response in responses] == [201] * 10 + [400]
+    assert len({response.get_json()['id'] for response in responses[:10]}) == 10
+    assert group_commit.batches - batches < len(bodies)
+    with app.app_context():
+        assert Camper.query.count() == 11
+        assert Signup.query.count() == 0
+
+def test_group_commit_evicts_cached_collections(client):
+    '''evicts cached collections once the batch holding a new row commits.'''
+    client.get('/campers')
+    client.post('/campers', json={'name': 'Bea', 'age': 10})
+    response = client.get('/campers')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert [camper['name'] for camper in response.get_json()] == ['Ada', 'Bea']
@@ -0,0 +1,100 @@
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CREATE_TABLES = '''
+from app import app, db
+with app.app_context():
+    db.create_all()
+'''
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def get(port, path):
+    return send(port, 'GET', path).status
+
+def send(port, method, path, body=None, headers={}):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                 headers={'Content-Type': 'application/json', **headers})
+    response = conn.getresponse()
+    response.body = response.read()
+    conn.close()
+    return response
+
+def wait_for(predicate, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise AssertionError('timed out')
+
+def booted(log_path):
+    with open(log_path) as f:
+        return [line.split()[-1] for line in f if 'booted worker' in line]
+
+@pytest.fixture
+def launcher(tmp_path):
+    port = free_port()
+    log_path = tmp_path / 'launcher.log'
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{tmp_path / "launcher.db"}'}
+    subprocess.run([sys.executable, '-c', CREATE_TABLES], cwd=SERVER_DIR, env=env, check=True)
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(
+            [sys.executable, 'launcher.py', '--port', str(port), '--workers', '2', '--threads', '2'],
+            cwd=SERVER_DIR, env=env, stderr=log,
+        )
+    wait_for(lambda: get(port, '/metrics') == 200)
+    yield process, port, log_path
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+def test_serves_from_preforked_workers(launcher):
+    '''boots the configured number of workers and serves requests from them.'''
+    process, port, log_path = launcher
+    assert len(booted(log_path)) == 2
+    assert get(port, '/metrics') == 200
+
+def test_graceful_restart_replaces_workers(launcher):
+    '''replaces every worker on SIGHUP while continuing to serve.'''
+    process, port, log_path = launcher
+    old = set(booted(log_path))
+    process.send_signal(signal.SIGHUP)
+    wait_for(lambda: len(booted(log_path)) == 4)
+    assert not old & set(booted(log_path)[2:])
+    assert get(port, '/metrics') == 200
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=20) == 0
+
+def test_workers_share_versions(launcher):
+    '''serves a write made through one worker from every worker, with no stale 304 or cached body.'''
+    process, port, log_path = launcher
+    # Each new connection goes to whichever worker accepts it first, so enough
+    # of them warm both workers' caches.
+    etags = {send(port, 'GET', '/activities').getheader('ETag') for _ in range(20)}
+    assert len(etags) == 1
+    etag = etags.pop()
+
+    assert send(port, 'POST', '/activities', {'name': 'Archery', 'difficulty': 3}).status == 201
+    for _ in range(20):
+        response = send(port, 'GET', '/activities', headers={'If-None-Match': etag})
+        assert response.status == 200
+        assert [activity['name'] for activity in json.loads(response.body)] == ['Archery']
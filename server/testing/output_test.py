@@ -0,0 +1,94 @@
+import gzip
+import json
+
+import pytest
+from faker import Faker
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import Camper, Activity
+import output
+from output import OrjsonProvider
+
+@pytest.fixture
+def rows():
+    fake = Faker()
+    return [[*(Camper(name=fake.name(), age=10) for _ in range(50)), Activity(name='Archery', difficulty=3)]]
+
+PAYLOAD = {
+    'name': 'Zoë',
+    'id': 3,
+    'signups': [{'time': 9, 'activity': {'difficulty': None, 'name': 'Canoeing'}}],
+}
+
+@pytest.mark.parametrize('compact', [True, False])
+def test_orjson_matches_stdlib_encoder(compact):
+    '''decodes orjson output to the same payload as the stdlib provider, compact or indented.'''
+    pytest.importorskip('orjson')
+    flask_app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(flask_app), OrjsonProvider(flask_app)
+    stdlib.compact = fast.compact = compact
+    with flask_app.app_context():
+        stdlib_body = stdlib.response(PAYLOAD).get_data()
+        fast_body = fast.response(PAYLOAD).get_data()
+    assert json.loads(fast_body) == json.loads(stdlib_body) == PAYLOAD
+    assert (b'\n  ' in fast_body) is not compact
+    assert json.loads(fast.dumps(PAYLOAD)) == PAYLOAD
+
+def test_orjson_dumps_honours_supported_arguments():
+    '''maps sort_keys, indent=2 and default onto orjson and rejects arguments it cannot honour.'''
+    pytest.importorskip('orjson')
+    flask_app = Flask(__name__)
+    stdlib, fast = DefaultJSONProvider(flask_app), OrjsonProvider(flask_app)
+    fast.sort_keys = stdlib.sort_keys = False
+    for kwargs, separators in (({}, (',', ':')), ({'sort_keys': True}, (',', ':')), ({'sort_keys': True, 'indent': 2}, None)):
+        expected = stdlib.dumps(PAYLOAD, ensure_ascii=False, separators=separators, **kwargs)
+        assert fast.dumps(PAYLOAD, **kwargs) == expected
+    assert fast.dumps({'at': {1, 2}}, default=sorted) == '{"at":[1,2]}'
+    for kwargs in ({'indent': 4}, {'separators': (',', ': ')}, {'ensure_ascii': True}):
+        with pytest.raises(TypeError):
+            fast.dumps(PAYLOAD, **kwargs)
+
+def test_responses_are_compact_outside_debug(client):
+    '''emits compact JSON when the app is not in debug mode.'''
+    body = client.get('/campers').get_data()
+    assert b'\n  ' not in body
+
+@pytest.mark.parametrize('coding', ['gzip', 'br'])
+def test_compresses_large_responses(client, coding):
+    '''compresses large JSON bodies with the negotiated coding and decodes to the same payload.'''
+    if coding == 'br':
+        brotli = pytest.importorskip('brotli')
+    plain = client.get('/campers')
+    response = client.get('/campers', headers={'Accept-Encoding': coding})
+    assert response.headers['Content-Encoding'] == coding
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = gzip.decompress(response.get_data()) if coding == 'gzip' else brotli.decompress(response.get_data())
+    assert json.loads(body) == plain.get_json()
+    assert len(response.get_data()) < len(plain.get_data())
+
+def test_compresses_each_version_once(client, monkeypatch):
+    '''reuses the compressed body for repeated requests under one ETag and compresses again after a write.'''
+    calls = []
+    monkeypatch.setattr(output, 'compress', lambda data, coding, level: calls.append(coding) or gzip.compress(data))
+    bodies = [client.get('/campers', headers={'Accept-Encoding': 'gzip'}).get_data() for _ in range(3)]
+    assert calls == ['gzip'] and bodies[0] == bodies[1] == bodies[2]
+
+    client.patch('/campers/1', json={'age': 11})
+    response = client.get('/campers', headers={'Accept-Encoding': 'gzip'})
+    assert calls == ['gzip', 'gzip']
+    assert json.loads(gzip.decompress(response.get_data()))[0]['age'] == 11
+
+def test_leaves_small_responses_uncompressed(client):
+    '''skips compression for bodies under the size threshold.'''
+    response = client.get('/activities', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+
+def test_revalidates_compressed_etag(client):
+    '''answers If-None-Match with the ETag of a compressed variant with 304.'''
+    etag = client.get('/campers', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert etag.endswith('-gzip"')
+    response = client.get('/campers', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert 'Accept-Encoding' in response.headers['Vary']
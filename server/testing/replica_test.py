@@ -0,0 +1,147 @@
+import os
+
+import pytest
+from sqlalchemy import delete, event, text
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, Camper, Activity, Signup
+from replica import read_engine
+
+@pytest.fixture
+def rows():
+    return [[Camper(name='Ada', age=12), Activity(name='Archery', difficulty=3)], [Signup(time=9, camper_id=1, activity_id=1)]]
+
+@pytest.fixture(params=['readonly', 'snapshot'])
+def client(client, request, monkeypatch):
+    monkeypatch.setitem(app.config, 'DB_READ_MODE', request.param)
+    monkeypatch.setitem(app.config, 'DB_SNAPSHOT_INTERVAL', 3600)
+    yield client
+    with app.app_context():
+        replica = app.extensions.pop('read_replica', None)
+        if replica is not None:
+            replica.engine.dispose()
+            if replica.path != replica.primary.url.database:
+                for suffix in ('', '-wal', '-shm', '.lock'):
+                    if os.path.exists(replica.path + suffix):
+                        os.remove(replica.path + suffix)
+
+@pytest.fixture
+def statements():
+    '''Statements run on the primary and read engines, by engine.'''
+    with app.app_context():
+        engines = {'primary': db.engine}
+    with app.test_request_context('/campers', method='GET'):
+        engines['read'] = read_engine(app)
+    recorded = {name: [] for name in engines}
+    listeners = []
+    for name, engine in engines.items():
+        def record(conn, cursor, statement, parameters, context, executemany, name=name):
+            recorded[name].append(statement)
+        event.listen(engine, 'before_cursor_execute', record)
+        listeners.append((engine, record))
+    yield recorded
+    for engine, record in listeners:
+        event.remove(engine, 'before_cursor_execute', record)
+
+def test_routes_get_requests_to_the_read_engine(client, statements):
+    '''serves GET handlers, including search and stats, from the read engine alone.'''
+    for path in ('/campers', '/campers/1', '/activities?limit=1', '/activities/stats', '/search?q=ada'):
+        assert client.get(path).status_code == 200
+    assert statements['primary'] == []
+    assert statements['read']
+    assert all(sql.lstrip().upper().startswith(('SELECT', 'WITH')) for sql in statements['read'])
+
+def camper_sql_statements(client):
+    '''sql_statements_total for GET /campers/<id> so far.'''
+    prefix = 'sql_statements_total{method="GET",route="/campers/<int:id>"} '
+    lines = client.get('/metrics').get_data(as_text=True).splitlines()
+    return next((int(line[len(prefix):]) for line in lines if line.startswith(prefix)), 0)
+
+def test_times_statements_on_the_read_engine(client, statements):
+    '''counts the read engine's statements in Server-Timing and the per-route SQL metrics.'''
+    before = camper_sql_statements(client)
+    response = client.get('/campers/1')
+    assert statements['primary'] == []
+    assert statements['read']
+    assert f'desc="{len(statements["read"])} queries"' in response.headers['Server-Timing']
+    assert camper_sql_statements(client) - before == len(statements['read'])
+
+def test_writes_never_use_the_read_engine(client, statements):
+    '''sends every POST, PATCH and DELETE to the primary engine.'''
+    assert client.post('/campers', json={'name': 'Bea', 'age': 10}).status_code == 201
+    assert client.post('/activities', json={'name': 'Canoeing', 'difficulty': 2}).status_code == 201
+    assert client.post('/signups', json={'time': 10, 'camper_id': 2, 'activity_id': 2}).status_code == 201
+    assert client.post('/signups', json=[{'time': 11, 'camper_id': 2, 'activity_id': 1}]).status_code == 201
+    assert client.patch('/campers/2', json={'age': 11}).status_code == 200
+    assert client.delete('/signups?activity_id=2').status_code == 200
+    assert client.delete('/activities/2').status_code == 204
+    assert client.delete('/campers/2').status_code == 204
+    assert statements['read'] == []
+    assert any(sql.startswith('INSERT') for sql in statements['primary'])
+
+def test_writes_inside_a_get_go_to_the_primary(client, statements):
+    '''flushes and DML statements issued while handling a GET bypass the read engine.'''
+    with app.test_request_context('/campers', method='GET'):
+        assert db.session.get_bind() is read_engine(app)
+        db.session.add(Camper(name='Bea', age=10))
+        db.session.execute(delete(Signup).where(Signup.camper_id == 1))
+        db.session.commit()
+    with app.app_context():
+        assert Camper.query.count() == 2
+        assert Signup.query.count() == 0
+    assert not any(sql.startswith(('INSERT', 'DELETE')) for sql in statements['read'])
+
+def test_read_engine_refuses_writes(client):
+    '''opens the read engine read-only, so a write that reached it would fail.'''
+    with app.test_request_context('/campers', method='GET'):
+        engine = read_engine(app)
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA query_only')).scalar() == 1
+        with pytest.raises(OperationalError, match='readonly'):
+            conn.execute(text("INSERT INTO campers (name, age) VALUES ('Cy', 9)"))
+
+@pytest.mark.parametrize('client', ['snapshot'], indirect=True)
+def test_snapshot_reads_lag_until_refreshed(client):
+    '''serves the snapshot's rows, cached and with the snapshot's ETag, until the next refresh picks up new writes.'''
+    response = client.get('/campers')
+    assert len(response.get_json()) == 1
+    etag = response.headers['ETag']
+    client.post('/campers', json={'name': 'Bea', 'age': 10})
+
+    response = client.get('/campers', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response = client.get('/campers')
+    assert len(response.get_json()) == 1
+    assert response.headers['ETag'] == etag
+    assert client.get('/campers').headers['X-Cache'] == 'HIT'
+
+    app.extensions['read_replica'].refresh()
+    response = client.get('/campers', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 2
+    assert response.headers['ETag'] != etag
+    response = client.get('/campers')
+    assert response.headers['X-Cache'] == 'HIT'
+    assert len(response.get_json()) == 2
+
+@pytest.mark.parametrize('client', ['snapshot'], indirect=True)
+def test_snapshot_schedules_match_their_etag(client, statements):
+    '''computes a stale schedule from the snapshot, leaving the primary's row for the next refresh.'''
+    client.post('/signups', json={'time': 10, 'camper_id': 1, 'activity_id': 1})
+    app.extensions['read_replica'].refresh()
+    client.post('/signups', json={'time': 11, 'camper_id': 1, 'activity_id': 1})
+
+    statements['primary'].clear()
+    assert [entry['time'] for entry in client.get('/campers/1/schedule').get_json()] == [9, 10]
+    assert statements['primary'] == []
+
+@pytest.mark.parametrize('client', ['snapshot'], indirect=True)
+def test_snapshot_refresh_swaps_in_a_whole_file(client):
+    '''writes each copy beside the snapshot and renames it over, so readers never open a partial copy.'''
+    assert client.get('/campers').status_code == 200
+    replica = app.extensions['read_replica']
+    inode = os.stat(replica.path).st_ino
+    replica.refresh()
+    assert os.stat(replica.path).st_ino != inode
+    directory, name = os.path.split(replica.path)
+    assert sorted(f for f in os.listdir(directory) if f.startswith(name)) == [name, f'{name}.lock']
@@ -0,0 +1,125 @@
+import pytest
+
+from app import app, db, response_cache, versions, Camper, Activity, Signup, CamperSchedule
+from schedules import check_schedules, rebuild_schedules
+
+@pytest.fixture
+def rows():
+    return [[
+        Camper(name='Ada', age=12), Camper(name='Bo', age=9),
+        Activity(name='Archery', difficulty=3), Activity(name='Canoeing', difficulty=5),
+    ]]
+
+def schedule(client, camper_id):
+    return [(entry['time'], entry['activity']['name']) for entry in client.get(f'/campers/{camper_id}/schedule').get_json()]
+
+def assert_consistent():
+    with app.app_context(), db.engine.connect() as conn:
+        assert check_schedules(conn) == []
+
+def test_lists_signups_in_time_order(client):
+    '''serves a camper's signups ordered by time, with each activity embedded.'''
+    client.post('/signups', json={'time': 14, 'camper_id': 1, 'activity_id': 2})
+    client.post('/signups', json=[
+        {'time': 9, 'camper_id': 1, 'activity_id': 1},
+        {'time': 11, 'camper_id': 2, 'activity_id': 1},
+    ])
+
+    response = client.get('/campers/1/schedule')
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'signup_id': 2, 'time': 9, 'activity': {'id': 1, 'name': 'Archery', 'difficulty': 3}},
+        {'signup_id': 1, 'time': 14, 'activity': {'id': 2, 'name': 'Canoeing', 'difficulty': 5}},
+    ]
+    assert schedule(client, 2) == [(11, 'Archery')]
+    assert_consistent()
+
+def test_serves_empty_and_missing_schedules(client):
+    '''serves [] for a camper without signups and 404 for an unknown camper.'''
+    response = client.get('/campers/2/schedule')
+    assert response.status_code == 200
+    assert response.get_json() == []
+    response = client.get('/campers/99/schedule')
+    assert response.status_code == 404
+    assert response.get_json() == {'error': 'Camper not found'}
+
+def stored(camper_id):
+    with app.app_context():
+        return db.session.get(CamperSchedule, camper_id).schedule
+
+def test_reads_one_row(client, body_queries):
+    '''answers from the stored schedule in a single statement without touching signups.'''
+    client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1})
+    client.get('/campers/1/schedule')
+    response_cache.clear()
+
+    body_queries.clear()
+    assert client.get('/campers/1/schedule').status_code == 200
+    assert len(body_queries) == 1
+    assert 'camper_schedules' in body_queries[0] and 'FROM signups' not in body_queries[0]
+
+def test_writes_mark_stale_and_reads_refresh(client, body_queries):
+    '''marks a schedule stale on write without aggregating, and stores it again on the next read.'''
+    client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1})
+    client.get('/campers/1/schedule')
+    assert stored(1) is not None
+
+    body_queries.clear()
+    client.post('/signups', json={'time': 10, 'camper_id': 1, 'activity_id': 2})
+    assert not any('json_group_array' in sql for sql in body_queries)
+    assert stored(1) is None
+
+    assert schedule(client, 1) == [(9, 'Archery'), (10, 'Canoeing')]
+    assert stored(1) is not None
+    assert_consistent()
+
+def test_follows_cascades_and_activity_changes(client):
+    '''updates schedules when signups are deleted, activities renamed or activities deleted.'''
+    client.post('/signups', json=[
+        {'time': 9, 'camper_id': 1, 'activity_id': 1},
+        {'time': 10, 'camper_id': 1, 'activity_id': 2},
+        {'time': 9, 'camper_id': 2, 'activity_id': 2},
+    ])
+    with app.app_context():
+        db.session.get(Activity, 2).name = 'Kayaking'
+        db.session.commit()
+    assert schedule(client, 1) == [(9, 'Archery'), (10, 'Kayaking')]
+
+    client.delete('/activities/1')
+    assert schedule(client, 1) == [(10, 'Kayaking')]
+    client.delete('/signups?activity_id=2')
+    assert schedule(client, 1) == []
+    assert schedule(client, 2) == []
+
+    client.post('/signups', json={'time': 9, 'camper_id': 2, 'activity_id': 2})
+    client.delete('/campers/2')
+    assert client.get('/campers/2/schedule').status_code == 404
+    assert_consistent()
+
+def test_new_signup_evicts_cached_schedule(client):
+    '''serves a fresh schedule and ETag once a signup for the camper is created.'''
+    etag = client.get('/campers/1/schedule').headers['ETag']
+    client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1})
+
+    response = client.get('/campers/1/schedule', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()) == 1
+
+def test_checker_reports_and_rebuild_repairs_drift(client):
+    '''reports schedules that disagree with signups, recomputes them and moves the ETags of those that changed.'''
+    with app.app_context():
+        db.session.add(Signup(time=8, camper_id=1, activity_id=1))
+        db.session.commit()
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE camper_schedules SET schedule = '[]' WHERE camper_id = 1")
+    etag = client.get('/campers/1/schedule').headers['ETag']
+
+    with app.app_context(), db.engine.begin() as conn:
+        drift = check_schedules(conn)
+        assert [(camper_id, stored) for camper_id, stored, _ in drift] == [(1, '[]')]
+        rebuild_schedules(conn, versions)
+    assert_consistent()
+    response = client.get('/campers/1/schedule', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
@@ -0,0 +1,66 @@
+import pytest
+
+from app import app, db, response_cache, versions, Camper, Activity
+from search import match_expression, triggers
+
+@pytest.fixture
+def rows():
+    return [[
+        Camper(name='Ada Lovelace', age=12), Camper(name='Adam Ant', age=9),
+        Camper(name='Grace Hopper', age=15), Activity(name='Adventure Hike', difficulty=4),
+    ]]
+
+def results(client, query):
+    response = client.get(f'/search?{query}')
+    assert response.status_code == 200
+    return response.get_json()
+
+def test_matches_word_prefixes_across_campers_and_activities(client):
+    '''finds campers and activities whose name has a word starting with each query word.'''
+    data = results(client, 'q=ad')['data']
+    assert {(row['type'], row['name']) for row in data} == {
+        ('camper', 'Ada Lovelace'), ('camper', 'Adam Ant'), ('activity', 'Adventure Hike'),
+    }
+    assert results(client, 'q=ada lov')['data'] == [{'type': 'camper', 'id': 1, 'name': 'Ada Lovelace'}]
+    assert [row['name'] for row in results(client, 'q=ad&type=activity')['data']] == ['Adventure Hike']
+
+def test_paginates_ranked_results(client):
+    '''pages through results with limit and the next offset.'''
+    first = results(client, 'q=ad&limit=2')
+    assert len(first['data']) == 2
+    assert first['next'] == 2
+    second = results(client, f"q=ad&limit=2&after={first['next']}")
+    assert len(second['data']) == 1
+    assert second['next'] is None
+    assert {row['name'] for row in first['data'] + second['data']} == {'Ada Lovelace', 'Adam Ant', 'Adventure Hike'}
+
+def test_follows_renames_and_deletes(client):
+    '''reflects PATCH renames and deletes in the next search.'''
+    assert results(client, 'q=grace')['data']
+    client.patch('/campers/3', json={'name': 'Hedy Lamarr'})
+    assert results(client, 'q=grace')['data'] == []
+    assert results(client, 'q=hedy')['data'][0]['id'] == 3
+
+    client.delete('/campers/1')
+    assert [row['name'] for row in results(client, 'q=ada')['data']] == ['Adam Ant']
+
+def test_rebuild_restores_the_index(client):
+    '''repopulates the index from campers and activities.'''
+    with app.app_context(), db.engine.begin() as conn:
+        conn.exec_driver_sql('DELETE FROM name_search')
+    response_cache.clear()
+    assert results(client, 'q=ada')['data'] == []
+    with app.app_context(), db.engine.begin() as conn:
+        triggers.rebuild(conn)
+    response_cache.clear()
+    versions.clear()
+    assert len(results(client, 'q=ada')['data']) == 2
+
+def test_400_for_queries_without_words(client):
+    '''returns a 400 status code when q is missing or has no searchable words, or type is unknown.'''
+    for query in ('', 'q=', 'q=%22*', 'q=ada&type=staff'):
+        assert client.get(f'/search?{query}').status_code == 400
+
+def test_quotes_words_in_the_match_expression():
+    '''turns free text into quoted prefix terms, dropping FTS5 operators.'''
+    assert match_expression('ada "lov" OR x*') == '"ada"* "lov"* "OR"* "x"*'
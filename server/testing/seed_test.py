@@ -0,0 +1,76 @@
+from sqlalchemy import create_engine, event, text
+
+from counters import check_counters
+from models import db, Camper, Activity, Signup
+from seed import seed_database
+
+COLUMNS = {
+    'campers': 'id, name, age',
+    'activities': 'id, name, difficulty',
+    'signups': 'id, time, camper_id, activity_id',
+}
+
+def seeded_engine(seed):
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        seed_database(conn, campers=200, activities=5, signups=600, seed=seed, batch_size=64)
+    return engine
+
+def seeded_rows(seed):
+    with seeded_engine(seed).connect() as conn:
+        return {
+            table: conn.execute(text(f'SELECT {columns} FROM {table} ORDER BY id')).all()
+            for table, columns in COLUMNS.items()
+        }
+
+def test_seeds_requested_row_counts():
+    '''inserts the requested number of campers, activities and signups with valid values.'''
+    rows = seeded_rows(seed=0)
+    assert len(rows['campers']) == 200
+    assert len(rows['activities']) == 5
+    assert len(rows['signups']) == 600
+    assert all(8 <= age <= 18 for _, _, age in rows['campers'])
+    assert all(0 <= time <= 23 and 1 <= camper <= 200 and 1 <= activity <= 5
+               for _, time, camper, activity in rows['signups'])
+
+def test_seeding_is_deterministic():
+    '''produces identical rows for the same seed and different rows for another.'''
+    assert seeded_rows(seed=1) == seeded_rows(seed=1)
+    assert seeded_rows(seed=1) != seeded_rows(seed=2)
+
+def test_seeding_leaves_counters_consistent():
+    '''rebuilds the signup counters after loading with the triggers dropped.'''
+    with seeded_engine(seed=0).connect() as conn:
+        assert check_counters(conn) == []
+        assert conn.execute(text('SELECT sum(signup_count) FROM activities')).scalar() == 600
+        assert conn.execute(text(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'signups_counters_%'"
+        )).scalar() == 3
+
+def test_seeding_loads_without_secondary_indexes():
+    '''drops every campers, activities and signups index before inserting rows and recreates them after.'''
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+    with engine.begin() as conn:
+        seed_database(conn, campers=20, activities=3, signups=30, seed=0)
+    first_insert = next(i for i, statement in enumerate(statements) if statement.startswith('INSERT INTO campers'))
+    for index in (index for model in (Camper, Activity, Signup) for index in model.__table__.indexes):
+        dropped = next(i for i, statement in enumerate(statements) if f'DROP INDEX {index.name}' in statement)
+        created = next(i for i, statement in enumerate(statements) if f'INDEX {index.name} ' in statement
+                       and statement.startswith('CREATE'))
+        assert dropped < first_insert < created
+
+def test_reseeding_forgets_idempotency_keys():
+    '''deletes stored idempotent responses, whose ids would name different rows after a reseed.'''
+    engine = seeded_engine(seed=0)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO idempotency_keys (key, fingerprint, created_at, status, body) "
+            "VALUES ('retry', 'x', CURRENT_TIMESTAMP, 201, '{}')"
+        ))
+        seed_database(conn, campers=20, activities=3, signups=30, seed=1)
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT count(*) FROM idempotency_keys')).scalar() == 0
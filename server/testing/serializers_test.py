@@ -0,0 +1,32 @@
+from app import Camper, Activity, Signup
+from serializers import serialize_camper, serialize_activity, serialize_signup
+
+def build_schedule():
+    campers = [Camper(name=f'Camper {i}', age=8 + i) for i in range(3)]
+    activities = [Activity(id=i + 1, name=f'Activity {i}', difficulty=i) for i in range(2)]
+    for i, camper in enumerate(campers):
+        camper.id = i + 1
+        for hour, activity in enumerate(activities):
+            signup = Signup(time=hour, camper_id=camper.id, activity_id=activity.id)
+            signup.id = len(activity.signups) + 10 * activity.id
+            signup.camper = camper
+            signup.activity = activity
+    return campers, activities
+
+def test_camper_serializer_matches_mixin():
+    '''serializes campers exactly like Camper.to_dict().'''
+    campers, _ = build_schedule()
+    for camper in campers:
+        assert serialize_camper(camper) == camper.to_dict()
+
+def test_activity_serializer_matches_mixin():
+    '''serializes activities exactly like Activity.to_dict().'''
+    _, activities = build_schedule()
+    for activity in activities:
+        assert serialize_activity(activity) == activity.to_dict()
+
+def test_signup_serializer_matches_mixin():
+    '''serializes signups exactly like Signup.to_dict().'''
+    _, activities = build_schedule()
+    for signup in activities[0].signups:
+        assert serialize_signup(signup) == signup.to_dict()
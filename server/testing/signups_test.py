@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, Camper, Activity, Signup
+from counters import check_counters
+from database import retry_on_busy
+
+@pytest.fixture
+def rows():
+    return [[
+        *(Camper(name=f'Camper {i}', age=10) for i in range(1, 6)),
+        *(Activity(name=f'Activity {i}', difficulty=1) for i in range(1, 4)),
+    ]]
+
+def signup_count():
+    with app.app_context():
+        return Signup.query.count()
+
+def test_duplicate_signup_returns_the_existing_one(client):
+    '''answers a repeated camper, activity and time with 200 and the signup already stored.'''
+    body = {'time': 9, 'camper_id': 1, 'activity_id': 1}
+    first = client.post('/signups', json=body)
+    second = client.post('/signups', json=body)
+    assert (first.status_code, second.status_code) == (201, 200)
+    assert second.get_json()['id'] == first.get_json()['id']
+    assert signup_count() == 1
+
+@pytest.mark.parametrize('body, error', [
+    ({'time': '5', 'camper_id': 1, 'activity_id': 1}, 'time must be an integer'),
+    ({'time': 5.5, 'camper_id': 1, 'activity_id': 1}, 'time must be an integer'),
+    ({'time': 5, 'camper_id': '1', 'activity_id': 1}, 'camper_id must be an integer'),
+    ({'time': 5, 'camper_id': 1, 'activity_id': [1]}, 'activity_id must be an integer'),
+    ({'time': 5, 'camper_id': 1}, "Missing field 'activity_id'"),
+    ('5', 'Signup must be a JSON object'),
+])
+def test_400_for_malformed_signups(client, body, error):
+    '''rejects a signup with missing fields or values that are not integers.'''
+    response = client.post('/signups', json=body)
+    assert (response.status_code, response.get_json()) == (400, {'errors': [error]})
+    response = client.post('/signups', json=[body])
+    assert (response.status_code, response.get_json()) == (400, {'errors': [{'index': 0, 'errors': [error]}]})
+
+def test_bulk_signups_resolve_duplicates(client):
+    '''reports the existing id for batch items that repeat a stored signup or an earlier item.'''
+    existing = client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1}).get_json()['id']
+    response = client.post('/signups', json=[
+        {'time': 9, 'camper_id': 1, 'activity_id': 1},
+        {'time': 10, 'camper_id': 2, 'activity_id': 1},
+        {'time': 10, 'camper_id': 2, 'activity_id': 1},
+    ])
+    assert response.status_code == 201
+    ids = [row['id'] for row in response.get_json()]
+    assert ids[0] == existing
+    assert ids[1] == ids[2] != existing
+    assert signup_count() == 2
+    with app.app_context(), db.engine.connect() as conn:
+        assert check_counters(conn) == []
+
+def test_replays_idempotent_requests(client):
+    '''returns the stored response for a repeated Idempotency-Key without writing again.'''
+    headers = {'Idempotency-Key': 'abc'}
+    first = client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1}, headers=headers)
+    client.delete('/signups?activity_id=1')
+    again = client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1}, headers=headers)
+    assert first.status_code == again.status_code == 201
+    assert again.get_json() == first.get_json()
+    assert again.headers['Idempotent-Replayed'] == 'true'
+    assert signup_count() == 0
+
+def test_idempotency_key_errors(client):
+    '''rejects a key reused for another body with 422 and does not store failed requests.'''
+    headers = {'Idempotency-Key': 'abc'}
+    assert client.post('/signups', json={'time': 30, 'camper_id': 1, 'activity_id': 1}, headers=headers).status_code == 400
+    assert client.post('/signups', json={'time': 9, 'camper_id': 1, 'activity_id': 1}, headers=headers).status_code == 201
+    response = client.post('/signups', json={'time': 9, 'camper_id': 2, 'activity_id': 1}, headers=headers)
+    assert response.status_code == 422
+    assert client.post('/signups', json={}, headers={'Idempotency-Key': 'x' * 256}).status_code == 400
+
+def test_retries_busy_transactions():
+    '''retries work that fails with SQLITE_BUSY and gives up after the allowed retries.'''
+    busy = OperationalError('INSERT', {}, sqlite3.OperationalError('database is locked'))
+    calls = []
+
+    def work():
+        calls.append(1)
+        if len(calls) < 3:
+            raise busy
+        return 'done'
+
+    with app.app_context():
+        assert retry_on_busy(db.session, work, retries=2, backoff=0) == 'done'
+        calls.clear()
+        with pytest.raises(OperationalError):
+            retry_on_busy(db.session, work, retries=1, backoff=0)
+        assert len(calls) == 2
+
+@pytest.fixture
+def impatient_connections(monkeypatch):
+    '''Pooled connections that report SQLITE_BUSY at once instead of waiting, so writers have to retry.'''
+    with app.app_context():
+        engine = db.engine
+
+    def no_wait(dbapi_connection, connection_record):
+        dbapi_connection.execute('PRAGMA busy_timeout = 0')
+
+    engine.dispose()
+    event.listen(engine, 'connect', no_wait)
+    monkeypatch.setitem(app.config, 'SQLITE_BUSY_RETRIES', 12)
+    yield
+    event.remove(engine, 'connect', no_wait)
+    engine.dispose()
+
+def test_concurrent_signups_stay_unique(client, impatient_connections):
+    '''keeps one signup per camper, activity and time while threads post overlapping signups.'''
+    combos = [{'time': time, 'camper_id': camper, 'activity_id': activity}
+              for camper in range(1, 6) for activity in range(1, 4) for time in (9, 10)]
+    statuses = []
+
+    def hammer(worker):
+        with app.test_client() as thread_client:
+            for index, body in enumerate(combos):
+                if index % 3 == 0:
+                    response = thread_client.post('/signups', json=combos[index:index + 3])
+                else:
+                    headers = {'Idempotency-Key': f'combo-{index}'} if worker % 2 else {}
+                    response = thread_client.post('/signups', json=body, headers=headers)
+                statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=hammer, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(statuses) <= {200, 201}
+    assert len(statuses) == 8 * len(combos)
+    assert signup_count() == len(combos)
+    with app.app_context(), db.engine.connect() as conn:
+        assert check_counters(conn) == []
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.startup_bench import MODULE_BUDGET, SERVER_DIR, measure
+
+def test_cold_start_stays_within_its_import_budget():
+    '''serves a first request from a fresh interpreter within the module budget, without migration or debug tooling.'''
+    result = measure(runs=1)
+    assert result['status'] == 200
+    assert result['app_modules'] <= MODULE_BUDGET
+    assert result['deferred_loaded'] == []
+
+def test_flask_db_loads_migrations_on_demand(tmp_path):
+    '''still runs `flask db` commands, which load Flask-Migrate only when invoked.'''
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{tmp_path / "migrate.db"}'}
+    env.pop('FLASK_APP', None)
+    flask = [sys.executable, '-m', 'flask']
+    subprocess.run([*flask, 'db', 'upgrade'], cwd=SERVER_DIR, env=env, capture_output=True, check=True)
+    current = subprocess.run([*flask, 'db', 'current'], cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True)
+    assert '(head)' in current.stdout
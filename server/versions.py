@@ -0,0 +1,95 @@
+import secrets
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+
+from cache import LRUBackend
+from models import TagVersion
+
+# Reserved rows of tag_versions: the database-wide clock, and the epoch that
+# keeps this database's ETags apart from those of any database before it.
+CLOCK_TAG = ''
+EPOCH_TAG = 'epoch'
+
+def new_epoch(conn):
+    '''Forgets every version and draws a new epoch, inside the caller's transaction.
+
+    For a new tag_versions table, or after the rows behind every tag were replaced.
+    '''
+    now = time.time()
+    conn.execute(TagVersion.__table__.delete())
+    conn.execute(TagVersion.__table__.insert(), [
+        {'tag': EPOCH_TAG, 'version': secrets.randbits(31), 'modified': now},
+        {'tag': CLOCK_TAG, 'version': 0, 'modified': now},
+    ])
+
+class VersionRegistry:
+    '''Per-tag version counters behind strong ETags and Last-Modified, kept in tag_versions.
+
+    Tags are the same ones ResponseCache uses: one per table for collections
+    and one per camper/activity row. Every commit that touches a tag stamps it
+    with the next value of the database's clock, in the same transaction, so a
+    response's ETag is the database epoch plus the highest stamp among the
+    tags it was built from. Being rows in the database, versions are shared by
+    every worker process and survive restarts, and a GET reads them from the
+    same engine as the body it describes.
+
+    The tags each URL depended on last time are remembered per process, which
+    lets a matching If-None-Match be answered with one primary-key lookup,
+    before any other query or serialization runs.
+    '''
+
+    def __init__(self, session, max_urls=4096):
+        self.session = session
+        self._dependencies = LRUBackend(max_entries=max_urls)
+
+    def clock(self):
+        '''The clock value of the latest commit that stamped any tag.'''
+        return self.session.scalar(select(TagVersion.version).where(TagVersion.tag == CLOCK_TAG)) or 0
+
+    def stamp(self, session, tags):
+        '''Moves `tags` to the next clock value inside `session`'s transaction, before it commits.'''
+        now = time.time()
+        table = TagVersion.__table__
+        version = session.execute(
+            insert(table).values(tag=CLOCK_TAG, version=1, modified=now)
+            .on_conflict_do_update(index_elements=[table.c.tag], set_={'version': table.c.version + 1, 'modified': now})
+            .returning(table.c.version)
+        ).scalar_one()
+        upsert = insert(table)
+        session.execute(
+            upsert.on_conflict_do_update(
+                index_elements=[table.c.tag],
+                set_={'version': upsert.excluded.version, 'modified': upsert.excluded.modified},
+            ),
+            [{'tag': tag, 'version': version, 'modified': now} for tag in tags],
+        )
+
+    def validators(self, tags, as_of=None):
+        '''Returns (etag, last_modified) for a body built from `tags`.
+
+        With `as_of`, returns None when a tag moved past that clock value,
+        since the body may then mix rows from before and after the write.
+        '''
+        rows = {tag: (version, modified) for tag, version, modified in self.session.execute(
+            select(TagVersion.tag, TagVersion.version, TagVersion.modified)
+            .where(TagVersion.tag.in_({*tags, EPOCH_TAG}))
+        )}
+        epoch, created = rows.pop(EPOCH_TAG, (0, 0.0))
+        version = max((version for version, _ in rows.values()), default=0)
+        modified = max((modified for _, modified in rows.values()), default=created)
+        if as_of is not None and version > as_of:
+            return None
+        return f'{epoch:x}-{version}', modified
+
+    def remember(self, url, tags):
+        self._dependencies.set(url, frozenset(tags), float('inf'))
+
+    def dependencies(self, url):
+        return self._dependencies.get(url)
+
+    def clear(self):
+        self._dependencies.clear()
+
+event.listen(TagVersion.__table__, 'after_create', lambda target, connection, **kw: new_epoch(connection))